@@ -0,0 +1,209 @@
+"""
+Rule-based alerting for the what-if console.
+
+Rules are declarative: a metric, a threshold, a hysteresis band and a hold
+time. Facility metrics are scalars, per-rack metrics are arrays; both go
+through the same NumPy evaluation, so a rule over every rack costs a few
+array operations however many racks breach at once. A rule notifies when
+it becomes active (and optionally as a reminder while it stays active),
+never more often than its rate limit, and one notification summarizes all
+of its racks. Notifications land in a bounded history.
+"""
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+SEVERITIES = ("info", "good", "warning", "critical")
+
+
+class AlertRule(NamedTuple):
+    """
+    `message` is a format string with the fields value, count, new, rack
+    and racks (the worst offenders, e.g. "#12, #40 (+3 more)").
+    Rules sharing a `group` are listed most severe first; a rule leaves out
+    the elements (racks) a more severe rule of its group already reports.
+    """
+    name: str
+    metric: str
+    threshold: float
+    severity: str = "warning"
+    message: str = "{value:.2f}"
+    above: bool = True
+    hysteresis: float = 0.0 # Stays active until the value is back past threshold -/+ hysteresis
+    hold_s: float = 0.0 # Must be breached this long before it activates
+    min_interval_s: float = 30.0 # Rate limit between notifications of this rule
+    repeat_s: float = 0.0 # Reminder interval while active (0 = only on activation)
+    group: Optional[str] = None
+
+
+class Alert(NamedTuple):
+    time: float
+    severity: str
+    rule: str
+    message: str
+
+
+# --- Default rules (the console's former hard-coded thresholds, plus per-rack ones) ---
+DEFAULT_RULES = [
+    AlertRule("pue_critical", "pue", 2.0, "critical", "PUE critical at {value:.2f} - Cooling inefficient",
+              hysteresis=0.05, hold_s=3, repeat_s=300, group="pue"),
+    AlertRule("pue_elevated", "pue", 1.9, "warning", "PUE elevated at {value:.2f} - Review cooling",
+              hysteresis=0.05, hold_s=3, repeat_s=600, group="pue"),
+    AlertRule("rack_extreme", "rack_outlet_temp", 40.0, "critical",
+              "Extreme temperature: {value:.1f}°C on {racks} - Immediate action required",
+              hysteresis=0.5, repeat_s=120, group="rack_temp"),
+    AlertRule("rack_critical", "rack_outlet_temp", 37.0, "critical", "Critical temperature: {value:.1f}°C on {racks}",
+              hysteresis=0.5, hold_s=3, repeat_s=300, group="rack_temp"),
+    AlertRule("rack_elevated", "rack_outlet_temp", 35.5, "warning", "Temperature elevated: {value:.1f}°C on {racks}",
+              hysteresis=0.5, hold_s=10, min_interval_s=120, group="rack_temp"),
+    AlertRule("racks_overload", "critical_racks", 50, "critical", "{value:.0f} racks critical - System overload",
+              hysteresis=5, hold_s=3, repeat_s=300, group="critical_racks"),
+    AlertRule("racks_critical", "critical_racks", 20, "warning", "{value:.0f} racks in critical state",
+              hysteresis=3, hold_s=3, repeat_s=600, group="critical_racks"),
+    AlertRule("power_very_high", "power", 1800, "critical", "Power consumption very high: {value:.0f} kW",
+              hysteresis=25, hold_s=3, repeat_s=300, group="power"),
+    AlertRule("power_elevated", "power", 1600, "warning", "Power consumption elevated: {value:.0f} kW",
+              hysteresis=25, hold_s=3, repeat_s=600, group="power"),
+]
+
+
+class _RuleState:
+    """Per-element state of one rule (shape () for scalar metrics, (racks,) for per-rack ones)."""
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.active = np.zeros(shape, dtype=bool)
+        self.since = np.full(shape, np.nan) # Start of the current breach
+        self.pending = np.zeros(shape, dtype=bool) # Active but not notified yet (e.g. held back by the rate limit)
+        self.last_notified = -np.inf
+
+
+class AlertEngine:
+    """
+    Evaluates `rules` against a mapping of metric name -> scalar or per-rack
+    array once per tick and returns the alerts to show. `post()` adds ad-hoc
+    messages (ML insights, status changes) through the same history.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, history_size=1000, post_interval_s=30.0):
+        for rule in rules:
+            if rule.severity not in SEVERITIES:
+                raise ValueError(f"Alert rule '{rule.name}' has unknown severity '{rule.severity}'.")
+        self.rules = list(rules)
+        self.post_interval_s = post_interval_s
+        self.history = deque(maxlen=history_size)
+        self.stats = {"evaluations": 0, "fired": 0, "rate_limited": 0, "suppressed": 0, "eval_ms": 0.0}
+        self._states = {}
+        self._suppressed_until = {}
+        self._posted = {} # Ad-hoc alert key -> last post time
+
+    # --- Rule evaluation ---
+    def evaluate(self, metrics, now=None) -> List[Alert]:
+        """Updates every rule from `metrics` (missing metrics are skipped) and returns new alerts."""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        covered = {} # group -> elements already active in a more severe rule of the group
+        alerts = []
+
+        for rule in self.rules:
+            if rule.metric not in metrics:
+                continue
+            values = np.asarray(metrics[rule.metric], dtype=np.float64)
+            state = self._states.get(rule.name)
+            if state is None or state.shape != values.shape: # New rule or the rack count changed
+                state = self._states[rule.name] = _RuleState(values.shape)
+
+            # Compare as "above": flip the sign for rules on falling values; NaN never breaches
+            signed = values if rule.above else -values
+            limit = rule.threshold if rule.above else -rule.threshold
+            breached = signed > limit
+            state.since = np.where(breached, np.where(np.isnan(state.since), now, state.since), np.nan)
+            newly = breached & ~state.active & (now - state.since >= rule.hold_s)
+            state.active = (state.active & (signed > limit - rule.hysteresis)) | newly
+            state.pending = (state.pending | newly) & state.active
+
+            # Elements a more severe rule of the group already reports are not repeated here
+            own = state.active
+            if rule.group is not None:
+                shadow = covered.get(rule.group)
+                if shadow is not None and shadow.shape == own.shape:
+                    own = own & ~shadow
+                    covered[rule.group] = shadow | state.active
+                else:
+                    covered[rule.group] = state.active
+            if not own.any():
+                continue
+            fresh = state.pending & own
+            reminder = rule.repeat_s > 0 and now - state.last_notified >= rule.repeat_s
+            if not (fresh.any() or reminder):
+                continue
+            if now < self._suppressed_until.get(rule.name, -np.inf):
+                state.pending = state.pending & ~own # Silenced, not deferred
+                self.stats["suppressed"] += 1
+                continue
+            if now - state.last_notified < rule.min_interval_s:
+                self.stats["rate_limited"] += 1
+                continue
+
+            state.last_notified = now
+            state.pending = state.pending & ~own
+            fields = self._fields(signed, values, own, fresh)
+            alerts.append(Alert(now, rule.severity, rule.name, rule.message.format(**fields)))
+
+        self.history.extend(alerts)
+        self.stats["evaluations"] += 1
+        self.stats["fired"] += len(alerts)
+        self.stats["eval_ms"] = (time.perf_counter() - started) * 1000
+        return alerts
+
+    @staticmethod
+    def _fields(signed, values, active, fresh, shown=3):
+        """Message fields; for per-rack metrics the worst active racks come first."""
+        if values.ndim == 0:
+            return {"value": float(values), "count": 1, "new": int(fresh), "rack": "", "racks": ""}
+
+        idx = np.flatnonzero(active)
+        worst = -signed[idx]
+        if idx.size > shown: # Partial sort: storms with thousands of racks stay O(n)
+            part = np.argpartition(worst, shown)[:shown]
+            top = idx[part[np.argsort(worst[part], kind="stable")]]
+        else:
+            top = idx[np.argsort(worst, kind="stable")]
+        racks = ", ".join(f"#{i + 1}" for i in top)
+        if idx.size > shown:
+            racks += f" (+{idx.size - shown} more)"
+        return {"value": float(values[top[0]]), "count": int(idx.size), "new": int(np.count_nonzero(fresh)),
+                "rack": f"#{top[0] + 1}", "racks": racks}
+
+    # --- Ad-hoc alerts and suppression ---
+    def post(self, message, severity="info", rule="system", key=None, now=None) -> Optional[Alert]:
+        """
+        Records an ad-hoc alert. Posts with the same `key` (default: the
+        message) within `post_interval_s` of the last one are dropped.
+        """
+        now = time.time() if now is None else now
+        key = message if key is None else key
+        if now - self._posted.get(key, -np.inf) < self.post_interval_s:
+            self.stats["rate_limited"] += 1
+            return None
+        self._posted[key] = now
+        if len(self._posted) > self.history.maxlen: # Forget keys past their interval
+            self._posted = {k: t for k, t in self._posted.items() if now - t < self.post_interval_s}
+
+        alert = Alert(now, severity, rule, message)
+        self.history.append(alert)
+        self.stats["fired"] += 1
+        return alert
+
+    def suppress(self, rule_name, seconds, now=None):
+        """Silences one rule for `seconds` (its state keeps updating)."""
+        now = time.time() if now is None else now
+        if rule_name not in {rule.name for rule in self.rules}:
+            raise KeyError(f"No alert rule named '{rule_name}'.")
+        self._suppressed_until[rule_name] = now + seconds
+
+    def active_rules(self) -> Dict[str, int]:
+        """Rule name -> number of active elements (racks, or 1 for facility metrics)."""
+        return {name: int(np.count_nonzero(state.active)) for name, state in self._states.items() if state.active.any()}
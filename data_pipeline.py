@@ -2,6 +2,8 @@ import json
 import random
 from collections import defaultdict
 
+import numpy as np
+
 class ScenarioCombinator:
     """Creates random workload plans for all machines."""
     def __init__(self, num_machines=700, scenarios_per_machine=5):
@@ -13,9 +15,14 @@ class ScenarioCombinator:
         """Returns a list of random scenario choices (e.g., [3, 1, 5...])."""
         return [random.randint(1, self.scenarios_per_machine) for _ in range(self.num_machines)]
 
+    def generate_plan_array(self, rng):
+        """Same plan as an int array (1-based scenario choices) from a numpy Generator."""
+        return rng.integers(1, self.scenarios_per_machine + 1, self.num_machines)
+
 class DataIngestor:
     """Reads the data file and serves states based on the Combinator's plan."""
     def __init__(self, filepath='data/datacenter_full_state_list.json'):
+        self._scenario_arrays = None # Built on first use by scenario_arrays()
         try:
             with open(filepath, 'r') as f:
                 flat_data_list = json.load(f)
@@ -51,3 +58,34 @@ class DataIngestor:
             })
         return datacenter_state
 
+    PAYLOAD_FIELDS = ('server_workload_percent', 'inlet_temp_c', 'ambient_temp_c')
+    # Stand-ins for missing/None values, as in the twin's scalar compute_results
+    PAYLOAD_DEFAULTS = {'server_workload_percent': 0.0, 'inlet_temp_c': 22.0, 'ambient_temp_c': 25.0}
+
+    def scenario_arrays(self):
+        """
+        Payload fields of every scenario as (n_machines, max_scenarios) float
+        arrays (machine_ids order), plus each machine's scenario count.
+        Missing slots repeat the machine's scenarios, as the plan lookup would;
+        None or missing values take PAYLOAD_DEFAULTS.
+        """
+        if self._scenario_arrays is None:
+            machines = [m for m in self.machine_ids if self.scenarios.get(m)]
+            counts = np.array([len(self.scenarios[m]) for m in machines], dtype=np.intp)
+            width = int(counts.max())
+            arrays = {field: np.empty((len(machines), width)) for field in self.PAYLOAD_FIELDS}
+            for row, machine_id in enumerate(machines):
+                records = self.scenarios[machine_id]
+                for col in range(width):
+                    payload = records[col % len(records)]['payload']
+                    for field in self.PAYLOAD_FIELDS:
+                        arrays[field][row, col] = payload.get(field) or self.PAYLOAD_DEFAULTS[field]
+            self._scenario_arrays = (arrays, counts)
+        return self._scenario_arrays
+
+    def get_arrays_from_plan(self, combination_plan):
+        """Array version of get_state_from_plan: {payload field: (n_machines,) array}."""
+        arrays, counts = self.scenario_arrays()
+        index = (np.asarray(combination_plan) - 1) % counts
+        rows = np.arange(len(counts))
+        return {field: values[rows, index] for field, values in arrays.items()}
@@ -0,0 +1,171 @@
+"""
+Persistent tick history for the console's trend views.
+
+Every tick's facility metrics are rolled up into a pyramid of time buckets
+(1 s up to 1 day) in SQLite: one row per (level, bucket) holding the count
+and the sum, min and max of each metric, updated in place with an UPSERT.
+A query reads the coarsest level that still gives about one bucket per
+requested point, so a year and a single minute cost about the same.
+
+All database work runs on one background thread; queries return futures.
+Complete tiles of buckets are cached per level, so zooming back and forth
+or panning over already-seen history does not touch the database.
+"""
+import os
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_HISTORY_DB = "db/history.db"
+METRICS = ("pue", "max_temp", "power", "cost")
+LEVEL_SECONDS = (1, 10, 60, 600, 3600, 6 * 3600, 86400)
+TILE_BUCKETS = 256
+
+
+class HistoryWindow(NamedTuple):
+    """Aggregated history over a time range; one entry per non-empty bucket."""
+    level: int
+    bucket_seconds: int
+    t: np.ndarray # Bucket start, Unix seconds
+    count: np.ndarray
+    mean: Dict[str, np.ndarray]
+    min: Dict[str, np.ndarray]
+    max: Dict[str, np.ndarray]
+
+    def __len__(self):
+        return len(self.t)
+
+
+class TickHistoryStore:
+    """
+    Append-only store of per-tick metrics with a min/max/mean time pyramid.
+    `append()` and `query()` never block the caller on SQLite.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_HISTORY_DB, metrics: Sequence[str] = METRICS,
+                 level_seconds: Sequence[int] = LEVEL_SECONDS, cache_tiles: int = 512):
+        for name in metrics:
+            if not name.isidentifier():
+                raise ValueError(f"Metric name '{name}' is not usable as a column name.")
+        self.db_path = db_path
+        self.metrics = tuple(metrics)
+        self.level_seconds = tuple(level_seconds)
+        self.cache_tiles = cache_tiles
+        self.stats = {"appended": 0, "queries": 0, "tile_hits": 0, "tile_misses": 0}
+
+        self._cache = OrderedDict() # (level, tile) -> rows array, complete tiles only
+        self._latest = -float("inf") # Latest appended timestamp (store thread)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._conn = None
+        self._pool.submit(self._open).result() # SQLite objects stay on the store thread
+
+    # --- Store thread ---
+    def _open(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{m}_sum REAL, {m}_min REAL, {m}_max REAL" for m in self.metrics)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS tick_rollups (
+              level INTEGER NOT NULL, bucket INTEGER NOT NULL, n INTEGER NOT NULL, {columns},
+              PRIMARY KEY (level, bucket)
+            ) WITHOUT ROWID""")
+        self._conn.commit()
+
+        names = ", ".join(f"{m}_sum, {m}_min, {m}_max" for m in self.metrics)
+        updates = ", ".join(f"{m}_sum = {m}_sum + excluded.{m}_sum, {m}_min = min({m}_min, excluded.{m}_min), "
+                            f"{m}_max = max({m}_max, excluded.{m}_max)" for m in self.metrics)
+        placeholders = ", ".join("?" for _ in range(3 * len(self.metrics)))
+        self._upsert_sql = (f"INSERT INTO tick_rollups (level, bucket, n, {names}) VALUES (?, ?, 1, {placeholders}) "
+                            f"ON CONFLICT(level, bucket) DO UPDATE SET n = n + 1, {updates}")
+        self._select_sql = (f"SELECT bucket, n, {names} FROM tick_rollups "
+                            f"WHERE level = ? AND bucket BETWEEN ? AND ? ORDER BY bucket")
+        extent = self._extent()
+        if extent is not None:
+            self._latest = extent[1]
+
+    def _write(self, timestamp, values):
+        triple = [v for value in values for v in (value, value, value)]
+        rows = [(level, int(timestamp // seconds), *triple) for level, seconds in enumerate(self.level_seconds)]
+        self._conn.executemany(self._upsert_sql, rows)
+        self._conn.commit()
+        self._latest = max(self._latest, timestamp)
+        self.stats["appended"] += 1
+
+    def _tile(self, level, tile):
+        key = (level, tile)
+        rows = self._cache.get(key)
+        if rows is not None:
+            self._cache.move_to_end(key)
+            self.stats["tile_hits"] += 1
+            return rows
+
+        self.stats["tile_misses"] += 1
+        first = tile * TILE_BUCKETS
+        fetched = self._conn.execute(self._select_sql, (level, first, first + TILE_BUCKETS - 1)).fetchall()
+        rows = np.array(fetched, dtype=np.float64).reshape(len(fetched), 2 + 3 * len(self.metrics))
+
+        # Only tiles that end before the latest recorded tick can be cached (timestamps only move forward)
+        tile_end = (first + TILE_BUCKETS) * self.level_seconds[level]
+        if tile_end <= self._latest:
+            self._cache[key] = rows
+            if len(self._cache) > self.cache_tiles:
+                self._cache.popitem(last=False)
+        return rows
+
+    def _query(self, start, end, level):
+        seconds = self.level_seconds[level]
+        first, last = int(start // seconds), int(end // seconds)
+        tiles = [self._tile(level, tile) for tile in range(first // TILE_BUCKETS, last // TILE_BUCKETS + 1)]
+        rows = np.concatenate(tiles) if tiles else np.empty((0, 2 + 3 * len(self.metrics)))
+        rows = rows[(rows[:, 0] >= first) & (rows[:, 0] <= last)]
+        self.stats["queries"] += 1
+
+        count = rows[:, 1]
+        mean, low, high = {}, {}, {}
+        for i, name in enumerate(self.metrics):
+            column = 2 + 3 * i
+            mean[name] = rows[:, column] / np.maximum(count, 1)
+            low[name] = rows[:, column + 1]
+            high[name] = rows[:, column + 2]
+        return HistoryWindow(level, seconds, rows[:, 0] * seconds, count.astype(np.int64), mean, low, high)
+
+    def _extent(self):
+        row = self._conn.execute("SELECT min(bucket), max(bucket) FROM tick_rollups WHERE level = 0").fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0] * self.level_seconds[0], (row[1] + 1) * self.level_seconds[0]
+
+    # --- Public API (any thread) ---
+    def append(self, timestamp: float, values: Dict[str, float]) -> Future:
+        """Records one tick; `values` must hold every metric."""
+        return self._pool.submit(self._write, timestamp, [float(values[name]) for name in self.metrics])
+
+    def level_for(self, start: float, end: float, max_points: int) -> int:
+        """Finest level with at most `max_points` buckets over [start, end]."""
+        span = max(end - start, 0)
+        for level, seconds in enumerate(self.level_seconds):
+            if span / seconds <= max_points:
+                return level
+        return len(self.level_seconds) - 1
+
+    def query(self, start: float, end: float, max_points: int = 1000, level: Optional[int] = None) -> Future:
+        """Future of a HistoryWindow covering [start, end] (Unix seconds)."""
+        if level is None:
+            level = self.level_for(start, end, max_points)
+        return self._pool.submit(self._query, start, end, level)
+
+    def extent(self) -> Future:
+        """Future of (first, last) recorded time, or None for an empty store."""
+        return self._pool.submit(self._extent)
+
+    def close(self):
+        """Finishes queued writes and closes the database."""
+        if self._conn is not None:
+            self._pool.submit(self._conn.close).result()
+            self._conn = None
+        self._pool.shutdown(wait=True)
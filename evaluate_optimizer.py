@@ -0,0 +1,33 @@
+import argparse
+import sys
+import os
+
+# --- IMPORTANT: Add project root to path ---
+# This ensures we can import from 'twin' and 'ml'
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.evaluation import REPORT_PATH, evaluate, save_report, select_backend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare optimizer backends on accuracy, latency, memory and load time.")
+    parser.add_argument("--grid", type=int, default=16, help="Held-out grid points per input axis.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per batch-latency call (matches the surrogate search).")
+    parser.add_argument("--repeats", type=int, default=50, help="Timing repeats per latency measurement.")
+    parser.add_argument("--error-budget", type=float, default=0.01, help="Max mean decision regret for the auto mode.")
+    parser.add_argument("--output", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    report = evaluate(points_per_axis=args.grid, batch_size=args.batch_size, repeats=args.repeats)
+    report["error_budget"] = args.error_budget
+    report["selected"] = select_backend(report, args.error_budget)
+
+    markdown_path = save_report(report, args.output)
+    print(open(markdown_path).read())
+    print(f"Reports written to '{args.output}' and '{markdown_path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Streaming anomaly detection for the facility-level metrics.
+Scores one observation in O(features) against a robust baseline that is
+only rebuilt every few ticks, so the per-tick cost stays in microseconds.
+"""
+import numpy as np
+
+from ml.history import RingBuffer
+
+# Scales the MAD so it estimates the standard deviation of normal data
+MAD_TO_SIGMA = 1.4826
+
+
+class RobustZScoreDetector:
+    """
+    Rolling median/MAD anomaly detector.
+
+    Observations are kept in a fixed-size NumPy ring. The per-feature median
+    and MAD are recomputed from that window every `refit_interval` updates;
+    in between, scoring is a handful of array operations on the cached
+    baseline. Fully deterministic - no random refits.
+    """
+
+    def __init__(self, n_features, window=200, refit_interval=10, threshold=3.5, min_samples=20):
+        self.n_features = n_features
+        self.window = window
+        self.refit_interval = max(1, refit_interval)
+        self.threshold = threshold
+        self.min_samples = min_samples
+
+        self._history = RingBuffer(window, (n_features,))
+        self._updates_since_fit = 0
+
+        self.center = None
+        self.scale = None
+
+    @property
+    def is_ready(self):
+        return self.center is not None
+
+    def update(self, values):
+        """Adds one observation and rebuilds the baseline when it is due."""
+        self._history.append(values)
+        self._updates_since_fit += 1
+
+        if len(self._history) < self.min_samples:
+            return
+        if self.center is None or self._updates_since_fit >= self.refit_interval:
+            self.refit()
+
+    def refit(self):
+        """Recomputes the per-feature median and MAD from the current window."""
+        data = self._history.window()
+        center = np.median(data, axis=0)
+        mad = np.median(np.abs(data - center), axis=0) * MAD_TO_SIGMA
+
+        # Flat features (e.g. during a manual override) would divide by zero;
+        # fall back to a small fraction of the level so tiny jitter isn't flagged.
+        floor = np.maximum(np.abs(center) * 1e-3, 1e-9)
+        self.center = center
+        self.scale = np.maximum(mad, floor)
+        self._updates_since_fit = 0
+
+    def score(self, values):
+        """Returns the largest absolute robust z-score across features."""
+        if self.center is None:
+            return 0.0
+        z = np.abs((np.asarray(values, dtype=np.float64) - self.center) / self.scale)
+        return float(z.max())
+
+    def predict(self, values):
+        """IsolationForest-compatible label: -1 for anomalies, 1 for normal."""
+        return -1 if self.score(values) > self.threshold else 1
+
+
+class RackAnomalyDetector:
+    """
+    Per-rack rolling z-score detector for the whole fleet.
+
+    Reads the per-rack history from a shared (time, n_racks) RingBuffer that
+    holds at least `window + 1` ticks, and keeps running sums over the last
+    `window` of them, so each tick is O(n_racks) in-place array work plus a
+    vectorized score. The top-K racks above `threshold` are reported.
+    """
+
+    def __init__(self, history, window=60, top_k=10, threshold=4.0, min_samples=20):
+        if history.capacity <= window:
+            raise ValueError(f"Rack history must hold at least {window + 1} ticks")
+        self.history = history
+        self.n_racks = history.shape[0]
+        self.window = window
+        self.top_k = top_k
+        self.threshold = threshold
+        self.min_samples = min_samples
+
+        self._sum = np.zeros(self.n_racks, dtype=np.float64)
+        self._sum_sq = np.zeros(self.n_racks, dtype=np.float64)
+        self._scratch = np.empty(self.n_racks, dtype=np.float64)
+        self._count = 0
+        self._updates = 0
+
+    def update(self):
+        """
+        Scores the newest row of the shared history against the `window`
+        ticks before it, then folds it into the running sums. Call once per
+        append. Returns (rack_indices, z_scores) for the top-K anomalous
+        racks, hottest deviation first.
+        """
+        values = self.history.latest()
+        indices, scores = self.score(values)
+
+        sq = np.multiply(values, values, out=self._scratch)
+        self._sum += values
+        self._sum_sq += sq
+        if self._count == self.window:
+            old = self.history.window(self.window + 1)[0]
+            self._sum -= old
+            self._sum_sq -= np.multiply(old, old, out=self._scratch)
+        else:
+            self._count += 1
+        self._updates += 1
+
+        # Running sums drift with float error; resync once per full window
+        if self._updates % self.window == 0:
+            recent = self.history.window(self._count)
+            recent.sum(axis=0, out=self._sum)
+            np.einsum('ij,ij->j', recent, recent, out=self._sum_sq)
+
+        return indices, scores
+
+    def score(self, values):
+        """Vectorized z-scores for all racks; returns the top-K above threshold."""
+        empty = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        if self._count < self.min_samples:
+            return empty
+
+        mean = self._sum / self._count
+        var = np.maximum(self._sum_sq / self._count - mean * mean, 1e-6)
+        z = (values - mean) / np.sqrt(var)
+
+        k = min(self.top_k, self.n_racks)
+        top = np.argpartition(z, -k)[-k:]
+        top = top[z[top] > self.threshold]
+        if top.size == 0:
+            return empty
+        top = top[np.argsort(z[top])[::-1]]
+        return top, z[top]
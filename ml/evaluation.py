@@ -0,0 +1,267 @@
+"""
+Accuracy-versus-latency evaluation of the optimizer backends.
+
+Every backend predicts (daily cost, compute output) for a batch of
+(ambient, inlet, workload) rows. The harness scores each against the twin
+physics on a held-out regular grid and measures load time, memory,
+single-row and batch latency, plus the quality and latency of the
+settings `find_best_settings` picks with it. The report lets MLEngine's
+"auto" mode use the fastest backend within an error budget.
+"""
+import json
+import os
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from ml.flat_forest import FlatForest, flat_path_for
+from ml.optimizer import INLET_RANGE, WORKLOAD_RANGE, PROFILES, PhysicsOptimizer, daily_cost_usd
+from ml.registry import ModelRegistry
+from twin.digital_twin_engine import compute_results, compute_results_batch, physics_fingerprint
+
+REPORT_PATH = "reports/optimizer_evaluation.json"
+AMBIENT_RANGE = (10.0, 45.0)
+COST_MODEL_PATH = "models/optimizer_cost.joblib"
+COMPUTE_MODEL_PATH = "models/optimizer_compute.joblib"
+
+
+class Backend:
+    """
+    A named (cost, compute) predictor. `mode` is the MLEngine optimizer
+    mode that uses it, or None if it can only be evaluated.
+    """
+
+    def __init__(self, name, mode, loader, disk_paths=()):
+        self.name = name
+        self.mode = mode
+        self.loader = loader
+        self.disk_paths = list(disk_paths)
+
+    def load(self):
+        """Returns (predict, model_bytes), where predict(X) -> (cost, compute)."""
+        return self.loader()
+
+
+def _physics_loader():
+    def predict(X):
+        results = compute_results_batch(X[:, 1], X[:, 2], X[:, 0])
+        return daily_cost_usd(results), results['compute_output']
+    return predict, 0
+
+
+def _sklearn_loader():
+    import joblib
+
+    cost_model = joblib.load(COST_MODEL_PATH)
+    compute_model = joblib.load(COMPUTE_MODEL_PATH)
+
+    def predict(X):
+        with warnings.catch_warnings(): # Fitted with feature names, called on arrays
+            warnings.simplefilter("ignore")
+            return cost_model.predict(X), compute_model.predict(X)
+
+    model_bytes = sum(est.tree_.__getstate__()['nodes'].nbytes + est.tree_.value.nbytes
+                      for model in (cost_model, compute_model) for est in model.estimators_)
+    return predict, model_bytes
+
+
+def _flat_loader(load_models):
+    def loader():
+        cost_model, compute_model = load_models()
+
+        def predict(X):
+            return cost_model.predict(X), compute_model.predict(X)
+        return predict, cost_model.nodes.nbytes + compute_model.nodes.nbytes
+    return loader
+
+
+def available_backends(registry=None):
+    """Backends whose artifacts exist on disk; the physics is always available."""
+    backends = [Backend("physics", "physics", _physics_loader)]
+    if os.path.exists(COST_MODEL_PATH) and os.path.exists(COMPUTE_MODEL_PATH):
+        backends.append(Backend("sklearn", None, _sklearn_loader, [COST_MODEL_PATH, COMPUTE_MODEL_PATH]))
+
+    registry = registry or ModelRegistry("optimizer")
+    version = registry.current()
+    if version is not None:
+        version_dir = os.path.join(registry.path, version)
+        backends.append(Backend(
+            f"flat-{version}", "surrogate",
+            _flat_loader(lambda: tuple(registry.load(version)[1][name] for name in ("cost", "compute"))),
+            [os.path.join(version_dir, name) for name in os.listdir(version_dir)]
+        ))
+    else:
+        flat_cost, flat_compute = flat_path_for(COST_MODEL_PATH), flat_path_for(COMPUTE_MODEL_PATH)
+        if FlatForest.exists(flat_cost) and FlatForest.exists(flat_compute):
+            backends.append(Backend(
+                "flat", "surrogate",
+                _flat_loader(lambda: (FlatForest.load(flat_cost), FlatForest.load(flat_compute))),
+                [p + ext for p in (flat_cost, flat_compute) for ext in (".npy", ".json")]
+            ))
+    return backends
+
+
+def holdout_grid(points_per_axis=16):
+    """Regular (ambient, inlet, workload) grid, offset from the integer training-style values."""
+    ambient = np.linspace(*AMBIENT_RANGE, points_per_axis) + 0.13
+    inlet = np.linspace(*INLET_RANGE, points_per_axis) + 0.07
+    workload = np.linspace(*WORKLOAD_RANGE, points_per_axis) - 0.11
+    grid = np.stack(np.meshgrid(ambient, inlet, workload, indexing='ij'), axis=-1).reshape(-1, 3)
+    return np.clip(grid, [AMBIENT_RANGE[0], INLET_RANGE[0], WORKLOAD_RANGE[0]],
+                   [AMBIENT_RANGE[1], INLET_RANGE[1], WORKLOAD_RANGE[1]])
+
+
+def ground_truth(X, spot_checks=25):
+    """Exact physics for the grid, spot-checked against the scalar compute_results."""
+    results = compute_results_batch(X[:, 1], X[:, 2], X[:, 0])
+    cost, compute = daily_cost_usd(results), results['compute_output']
+    for i in np.linspace(0, len(X) - 1, spot_checks).astype(int):
+        scalar = compute_results({'ambient_temp_c': X[i, 0], 'inlet_temp_c': X[i, 1],
+                                  'server_workload_percent': X[i, 2]})
+        if not np.isclose(scalar['compute_output'], compute[i]) or \
+                not np.isclose(daily_cost_usd(scalar), cost[i]):
+            raise AssertionError(f"Batched physics disagrees with compute_results at {X[i].tolist()}")
+    return cost, compute
+
+
+def _error_stats(pred, truth):
+    error = np.abs(pred - truth)
+    return {
+        "mae": float(error.mean()),
+        "max_abs": float(error.max()),
+        # Relative to the mean magnitude: compute output is 0 wherever the twin throttles
+        "rel_mae": float(error.mean() / max(np.abs(truth).mean(), 1e-12)),
+    }
+
+
+def _latency_ms(func, repeats):
+    samples = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples[i] = time.perf_counter() - start
+    return float(np.median(samples) * 1000)
+
+
+def decision_quality(ml_engine, mode, ambients, seed=0):
+    """
+    Runs find_best_settings with `mode` and scores the chosen settings with
+    the physics. Returns (mean relative regret vs the physics optimum,
+    worst regret, median latency ms).
+    """
+    physics = PhysicsOptimizer()
+    np.random.seed(seed) # The surrogate search samples with the global RNG
+    regrets, latencies = [], []
+    for profile in PROFILES:
+        for ambient in ambients:
+            start = time.perf_counter()
+            best = ml_engine.find_best_settings(ambient, profile=profile, mode=mode, log=False)
+            latencies.append(time.perf_counter() - start)
+            optimum = physics.optimize(ambient, profile)['reward_score']
+            reward, _, _ = physics.evaluate(ambient, best['inlet'], best['workload'], profile)
+            regrets.append(max(0.0, (optimum - reward) / max(abs(optimum), 1e-12)))
+    return float(np.mean(regrets)), float(np.max(regrets)), float(np.median(latencies) * 1000)
+
+
+def evaluate(backends=None, points_per_axis=16, batch_size=1000, repeats=50, decision_ambients=8):
+    """Evaluates every backend and returns the report dict."""
+    from ml_engine import MLEngine
+
+    backends = backends if backends is not None else available_backends()
+    X = holdout_grid(points_per_axis)
+    true_cost, true_compute = ground_truth(X)
+    single, batch = X[:1], X[np.linspace(0, len(X) - 1, batch_size).astype(int)]
+    ambients = np.linspace(AMBIENT_RANGE[0] + 1, AMBIENT_RANGE[1] - 1, decision_ambients)
+
+    report = {"physics_fingerprint": physics_fingerprint(), "holdout_points": len(X),
+              "batch_size": batch_size, "backends": {}}
+    for backend in backends:
+        print(f"EVALUATION: {backend.name} ...")
+        start = time.perf_counter()
+        predict, model_bytes = backend.load()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        # Second load under tracemalloc (it slows allocation, so it isn't timed)
+        tracemalloc.start()
+        backend.load()
+        _, load_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pred_cost, pred_compute = predict(X)
+        entry = {
+            "mode": backend.mode,
+            "load_ms": load_ms,
+            "load_peak_bytes": load_peak,
+            "model_bytes": int(model_bytes),
+            "disk_bytes": sum(os.path.getsize(p) for p in backend.disk_paths if os.path.exists(p)),
+            "single_ms": _latency_ms(lambda: predict(single), repeats),
+            "batch_ms": _latency_ms(lambda: predict(batch), max(5, repeats // 5)),
+            "cost_error": _error_stats(pred_cost, true_cost),
+            "compute_error": _error_stats(pred_compute, true_compute),
+        }
+        if backend.mode is not None:
+            engine = MLEngine([], [], optimizer_mode=backend.mode)
+            regret, worst, decision_ms = decision_quality(engine, backend.mode, ambients)
+            entry.update(decision_regret=regret, decision_regret_max=worst, decision_ms=decision_ms)
+        report["backends"][backend.name] = entry
+    return report
+
+
+def select_backend(report, error_budget=0.01):
+    """
+    Fastest selectable backend (by find_best_settings latency) whose mean
+    decision regret is within `error_budget`. Returns an optimizer mode.
+    """
+    if report.get("physics_fingerprint") != physics_fingerprint():
+        return "physics" # Evaluated against different physics, trust nothing else
+    candidates = [entry for entry in report["backends"].values()
+                  if entry.get("mode") and entry.get("decision_regret", np.inf) <= error_budget]
+    if not candidates:
+        return "physics"
+    return min(candidates, key=lambda entry: entry["decision_ms"])["mode"]
+
+
+def load_report(path=REPORT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_report(report, path=REPORT_PATH):
+    """Writes the JSON report and a Markdown summary next to it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    markdown_path = os.path.splitext(path)[0] + ".md"
+    with open(markdown_path, "w") as f:
+        f.write(render_markdown(report))
+    return markdown_path
+
+
+def render_markdown(report):
+    lines = [
+        "# Optimizer backend evaluation",
+        "",
+        f"Physics fingerprint `{report['physics_fingerprint']}`, {report['holdout_points']} held-out grid points, "
+        f"batch of {report['batch_size']} rows.",
+        "",
+        "| Backend | Load ms | Load peak MB | Model MB | Single ms | Batch ms | Cost MAE ($/day) | "
+        "Compute rel. MAE | Decision regret | Decision ms |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for name, entry in report["backends"].items():
+        regret = f"{entry['decision_regret'] * 100:.3f}%" if "decision_regret" in entry else "-"
+        decision_ms = f"{entry['decision_ms']:.2f}" if "decision_ms" in entry else "-"
+        lines.append(
+            f"| {name} | {entry['load_ms']:.1f} | {entry['load_peak_bytes'] / 1e6:.2f} | "
+            f"{entry['model_bytes'] / 1e6:.2f} | {entry['single_ms']:.3f} | {entry['batch_ms']:.3f} | "
+            f"{entry['cost_error']['mae']:.4f} | {entry['compute_error']['rel_mae'] * 100:.3f}% | "
+            f"{regret} | {decision_ms} |"
+        )
+    if "selected" in report:
+        lines += ["", f"Selected for `optimizer_mode=\"auto\"` (error budget "
+                      f"{report['error_budget'] * 100:.2f}%): **{report['selected']}**"]
+    return "\n".join(lines) + "\n"
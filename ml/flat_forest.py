@@ -0,0 +1,152 @@
+"""
+Flattened, array-based inference for the optimizer RandomForests.
+
+A trained scikit-learn forest is exported as one contiguous structured
+NumPy array of nodes (feature, threshold, children, value) plus a small
+JSON sidecar. Loading memory-maps the node file, and prediction is a
+batched, pure-NumPy tree traversal that matches sklearn's output.
+
+    python -m ml.flat_forest   # export models/*.joblib as models/*.flat.{npy,json}
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+NODE_DTYPE = np.dtype([
+    ('feature', np.int32),
+    ('left', np.int32),
+    ('right', np.int32),
+    ('threshold', np.float64),
+    ('value', np.float64),
+])
+
+
+def flat_path_for(joblib_path):
+    """Flat model location next to a joblib file (models/x.joblib -> models/x.flat)."""
+    return os.path.splitext(joblib_path)[0] + ".flat"
+
+
+def flat_paths(path):
+    """Node array and metadata paths for a flat model stored at `path`."""
+    return path + ".npy", path + ".json"
+
+
+class FlatForest:
+    """
+    Regression forest stored as flat node arrays.
+
+    Leaves point to themselves in both children, so every sample can be
+    stepped `max_depth` times in lockstep without per-sample branching.
+    """
+
+    def __init__(self, nodes, roots, max_depth, feature_names=None):
+        self.nodes = nodes
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+        # Field views into the (possibly memory-mapped) node array, no copies
+        self._feature = nodes['feature']
+        self._left = nodes['left']
+        self._right = nodes['right']
+        self._threshold = nodes['threshold']
+        self._value = nodes['value']
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flattens a fitted RandomForestRegressor (or any forest of regression trees)."""
+        trees = [est.tree_ for est in model.estimators_]
+        total = sum(tree.node_count for tree in trees)
+        nodes = np.empty(total, dtype=NODE_DTYPE)
+
+        roots = []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            count = tree.node_count
+            block = nodes[offset:offset + count]
+            local = np.arange(count, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            block['feature'] = np.where(is_leaf, 0, tree.feature)
+            block['threshold'] = np.where(is_leaf, np.inf, tree.threshold)
+            block['left'] = np.where(is_leaf, local, tree.children_left) + offset
+            block['right'] = np.where(is_leaf, local, tree.children_right) + offset
+            block['value'] = tree.value[:, 0, 0]
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += count
+
+        feature_names = getattr(model, 'feature_names_in_', None)
+        return cls(nodes, roots, max_depth, feature_names)
+
+    def save(self, path):
+        """Writes `<path>.npy` (nodes) and `<path>.json` (roots, depth, features)."""
+        nodes_path, meta_path = flat_paths(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(nodes_path, np.ascontiguousarray(self.nodes))
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'roots': self.roots.tolist(),
+                'max_depth': self.max_depth,
+                'feature_names': self.feature_names,
+            }, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Loads a flat model; the node array is memory-mapped by default."""
+        nodes_path, meta_path = flat_paths(path)
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        nodes = np.load(nodes_path, mmap_mode='r' if mmap else None)
+        return cls(nodes, meta['roots'], meta['max_depth'], meta.get('feature_names'))
+
+    @staticmethod
+    def exists(path):
+        return all(os.path.exists(p) for p in flat_paths(path))
+
+    def predict(self, X):
+        """Mean prediction over all trees for an (n_samples, n_features) batch."""
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self._feature[node]] <= self._threshold[node]
+            node = np.where(go_left, self._left[node], self._right[node])
+
+        return self._value[node].mean(axis=1)
+
+
+def export_forest(model, path):
+    """Flattens a fitted forest and saves it; returns the FlatForest."""
+    flat = FlatForest.from_sklearn(model)
+    flat.save(path)
+    return flat
+
+
+def main(paths):
+    import joblib
+
+    for joblib_path in paths:
+        if not os.path.exists(joblib_path):
+            print(f"FLAT FOREST: '{joblib_path}' not found, skipping.")
+            continue
+        flat_path = flat_path_for(joblib_path)
+        flat = export_forest(joblib.load(joblib_path), flat_path)
+        print(f"FLAT FOREST: Exported {flat.n_estimators} trees "
+              f"({len(flat.nodes)} nodes) to '{flat_path}.npy'.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["models/optimizer_cost.joblib", "models/optimizer_compute.joblib"])
@@ -0,0 +1,194 @@
+"""
+Batched forecasting backends.
+All facility metrics are fitted jointly with one least-squares solve
+instead of one statsmodels model per series.
+"""
+import numpy as np
+
+
+class VARForecaster:
+    """
+    Vector autoregression VAR(p) with intercept, fitted on standardized data.
+
+    One `np.linalg.lstsq` call estimates the coefficients for every feature
+    at once; forecasts for all features and all horizon steps come out of a
+    single recursion, with Gaussian prediction intervals from the
+    companion-form MSE matrices.
+    """
+
+    def __init__(self, order=1, min_scale=1e-9):
+        self.order = order
+        self.min_scale = min_scale
+        self.coef = None # (1 + k*p, k), intercept row first
+        self.sigma = None # residual covariance, standardized units
+        self.mean = None
+        self.scale = None
+        self._last = None # last p standardized observations, oldest first
+
+    @property
+    def is_fitted(self):
+        return self.coef is not None
+
+    def fit(self, data):
+        """Fits on an (n_obs, n_features) array; returns self."""
+        data = np.asarray(data, dtype=np.float64)
+        p = self.order
+        n_obs, k = data.shape
+        if n_obs <= p + 1:
+            raise ValueError(f"VAR({p}) needs more than {p + 1} observations, got {n_obs}")
+
+        self.mean = data.mean(axis=0)
+        self.scale = np.maximum(data.std(axis=0), self.min_scale)
+        z = (data - self.mean) / self.scale
+
+        # Design matrix [1, z_{t-1}, ..., z_{t-p}] for every target row z_t
+        targets = z[p:]
+        design = np.empty((n_obs - p, 1 + k * p))
+        design[:, 0] = 1.0
+        for lag in range(1, p + 1):
+            design[:, 1 + (lag - 1) * k:1 + lag * k] = z[p - lag:n_obs - lag]
+
+        self.coef, *_ = np.linalg.lstsq(design, targets, rcond=None)
+        resid = targets - design @ self.coef
+        dof = max(1, design.shape[0] - design.shape[1])
+        self.sigma = resid.T @ resid / dof
+        self._last = z[-p:].copy()
+        return self
+
+    def forecast(self, steps, z_score=1.96):
+        """
+        Returns (mean, lower, upper), each (steps, n_features) in the
+        original units.
+        """
+        p = self.order
+        k = self.coef.shape[1]
+        intercept = self.coef[0]
+        lag_coefs = [self.coef[1 + i * k:1 + (i + 1) * k].T for i in range(p)] # A_1..A_p
+
+        # Mean forecast: roll the lag window forward
+        history = list(self._last)
+        mean = np.empty((steps, k))
+        for h in range(steps):
+            step = intercept.copy()
+            for i, a in enumerate(lag_coefs):
+                step += a @ history[-1 - i]
+            mean[h] = step
+            history.append(step)
+
+        # Forecast-error MSE via the MA(inf) weights Psi_h of the companion form
+        companion = np.zeros((k * p, k * p))
+        companion[:k] = np.hstack(lag_coefs)
+        if p > 1:
+            companion[k:, :-k] = np.eye(k * (p - 1))
+        power = np.eye(k * p)
+        mse = np.zeros((k, k))
+        variance = np.empty((steps, k))
+        for h in range(steps):
+            psi = power[:k, :k]
+            mse += psi @ self.sigma @ psi.T
+            variance[h] = np.diag(mse)
+            power = companion @ power
+
+        half_width = z_score * np.sqrt(np.maximum(variance, 0.0))
+        mean_out = mean * self.scale + self.mean
+        return mean_out, mean_out - half_width * self.scale, mean_out + half_width * self.scale
+
+
+class RackForecaster:
+    """
+    Per-rack AR(p) forecaster for the whole fleet.
+
+    Reads the latest `window` ticks from a shared (time, n_racks) RingBuffer
+    as one zero-copy view. All racks are fitted at once from lagged slices
+    of that view (batched normal equations with a small ridge term), every
+    `refit_interval` ticks, and forecast together every tick into an
+    (n_racks, horizon) matrix.
+    """
+
+    def __init__(self, history, window=60, order=2, horizon=30, critical_temp=37.0,
+                 refit_interval=5, ridge=1e-3, min_samples=20):
+        self.history = history
+        self.n_racks = history.shape[0]
+        self.window = min(window, history.capacity)
+        self.order = order
+        self.horizon = horizon
+        self.critical_temp = critical_temp
+        self.refit_interval = max(1, refit_interval)
+        self.ridge = ridge
+        self.min_samples = max(min_samples, order + 2)
+        self._updates_since_fit = 0
+
+        self.coef = None # (order + 1, n_racks): intercept, then lag 1..p
+        self.forecast = None # (n_racks, horizon) view of a horizon-major array
+
+    def update(self):
+        """Call once per append to the history; refits and re-forecasts when due."""
+        self._updates_since_fit += 1
+        if len(self.history) < self.min_samples:
+            return
+        if self.coef is None or self._updates_since_fit >= self.refit_interval:
+            self.fit()
+        self.forecast = self._predict()
+
+    def fit(self):
+        """Batched least-squares AR fit for every rack (no per-rack Python loop)."""
+        y = self.history.window(self.window) # (count, n_racks)
+        p = self.order
+        m = y.shape[0] - p
+        # Regressors as slices of the same view: [1, y_{t-1}, ..., y_{t-p}]
+        regressors = [None] + [y[p - lag:p - lag + m] for lag in range(1, p + 1)]
+        target = y[p:]
+
+        size = p + 1
+        gram = np.empty((self.n_racks, size, size))
+        rhs = np.empty((self.n_racks, size))
+        gram[:, 0, 0] = m
+        rhs[:, 0] = target.sum(axis=0)
+        for i in range(1, size):
+            gram[:, 0, i] = gram[:, i, 0] = regressors[i].sum(axis=0)
+            rhs[:, i] = np.einsum('mr,mr->r', regressors[i], target)
+            for j in range(i, size):
+                gram[:, i, j] = gram[:, j, i] = np.einsum('mr,mr->r', regressors[i], regressors[j])
+
+        # Ridge on the lag terms keeps flat racks (e.g. during overrides) solvable
+        gram[:, np.arange(1, size), np.arange(1, size)] += self.ridge * m
+        # Stored term-major so the forecast recursion reads contiguous rows
+        self.coef = np.ascontiguousarray(np.linalg.solve(gram, rhs[..., None])[..., 0].T)
+        self._updates_since_fit = 0
+
+    def _predict(self):
+        p = self.order
+        y = self.history.window(p)
+        lags = [y[-lag] for lag in range(1, p + 1)] # most recent first, views
+        forecast = np.empty((self.horizon, self.n_racks))
+        for h in range(self.horizon):
+            step = forecast[h]
+            step[:] = self.coef[0]
+            for i in range(p):
+                step += self.coef[i + 1] * lags[i]
+            lags = [step] + lags[:-1]
+        return forecast.T
+
+    def critical_racks(self, limit=None):
+        """
+        Racks not yet critical that are forecast to reach `critical_temp`
+        within the horizon. Returns (rack_indices, ticks_until_critical),
+        soonest first.
+        """
+        empty = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        if self.forecast is None:
+            return empty
+
+        current = self.history.latest()
+        crossing = self.forecast >= self.critical_temp
+        will_cross = crossing.any(axis=1) & (current < self.critical_temp)
+        racks = np.flatnonzero(will_cross)
+        if racks.size == 0:
+            return empty
+
+        eta = crossing[racks].argmax(axis=1) + 1
+        order = np.lexsort((-self.forecast[racks].max(axis=1), eta))
+        racks, eta = racks[order], eta[order]
+        if limit is not None:
+            racks, eta = racks[:limit], eta[:limit]
+        return racks, eta
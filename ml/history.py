@@ -0,0 +1,106 @@
+"""
+Preallocated NumPy history stores for the ML engine.
+Appending a tick writes into fixed arrays (no per-tick dicts, lists or
+DataFrames), and models read the recent window as a zero-copy view.
+"""
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity history of equally shaped rows, oldest first.
+
+    The ring is mirrored: every row is written at `pos` and `pos + capacity`
+    of a (2 * capacity, ...) array, so the latest n rows are always one
+    contiguous slice and `window()` never has to copy or wrap around.
+    """
+
+    def __init__(self, capacity, shape=(), dtype=np.float64):
+        self.capacity = int(capacity)
+        self.shape = tuple(shape)
+        self._buffer = np.zeros((2 * self.capacity,) + self.shape, dtype=dtype)
+        self._pos = -1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def is_full(self):
+        return self._count == self.capacity
+
+    def append(self, values):
+        """Writes one row; the oldest row drops out once the ring is full."""
+        pos = (self._pos + 1) % self.capacity
+        self._buffer[pos] = values
+        self._buffer[pos + self.capacity] = values
+        self._commit(pos)
+
+    def _commit(self, pos):
+        self._pos = pos
+        self._count = min(self._count + 1, self.capacity)
+
+    def window(self, n=None):
+        """Zero-copy view of the latest `n` rows (all rows by default), oldest first."""
+        n = self._count if n is None else min(n, self._count)
+        end = self._pos + 1 + self.capacity
+        return self._buffer[end - n:end]
+
+    def latest(self):
+        """View of the most recent row."""
+        return self._buffer[self._pos]
+
+    def clear(self):
+        self._pos = -1
+        self._count = 0
+
+
+class ColumnarRing(RingBuffer):
+    """
+    Ring of named scalar features, one float column per feature.
+
+    `append_record()` copies the columns straight out of a results dict;
+    columns missing from the dict are computed by the `derived` callables
+    (e.g. total_power from server + cooling power).
+    """
+
+    def __init__(self, columns, capacity, derived=None, dtype=np.float64):
+        super().__init__(capacity, (len(columns),), dtype)
+        self.columns = list(columns)
+        self.derived = dict(derived or {})
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    def append_record(self, record):
+        """Appends one tick from a mapping holding (or deriving) every column."""
+        pos = (self._pos + 1) % self.capacity
+        row = self._buffer[pos]
+        for i, name in enumerate(self.columns):
+            row[i] = record[name] if name in record else self.derived[name](record)
+        self._buffer[pos + self.capacity] = row
+        self._commit(pos)
+
+    def column(self, name, n=None):
+        """Strided view of one feature over the latest `n` ticks."""
+        return self.window(n)[:, self._index[name]]
+
+    def select(self, names, n=None):
+        """
+        (n, len(names)) array of the named features. A view when the names
+        are adjacent columns in order (see `column_order`), else a copy.
+        """
+        idx = [self._index[name] for name in names]
+        start = idx[0]
+        if idx == list(range(start, start + len(idx))):
+            return self.window(n)[:, start:start + len(idx)]
+        return self.window(n)[:, idx]
+
+    @staticmethod
+    def column_order(first, second):
+        """
+        Column order keeping both feature lists contiguous: features only in
+        `first`, the shared ones, then those only in `second`. Each list then
+        selects as a view when its names are taken in this order.
+        """
+        shared = [name for name in first if name in second]
+        return [name for name in first if name not in second] + shared + \
+               [name for name in second if name not in first]
@@ -0,0 +1,139 @@
+"""
+Physics-in-the-loop optimizer for the AI co-pilot.
+Evaluates the digital twin directly over a vectorized candidate grid and
+refines the best candidate with a bounded Nelder-Mead search.
+"""
+import numpy as np
+
+from twin.digital_twin_engine import compute_results_batch, cost_per_kwh_usd
+
+# Search space exposed by the what-if sliders (we want at least 20% work)
+INLET_RANGE = (15.0, 30.0)
+WORKLOAD_RANGE = (20.0, 100.0)
+
+PROFILES = ("greedy", "balanced", "sustainable")
+
+
+def profile_reward(profile, cost, compute):
+    """Reward to maximize for each optimization profile."""
+    if profile == "greedy":
+        # Maximize compute, ignore cost
+        return compute
+    elif profile == "sustainable":
+        # Maximize 1 / cost (i.e., minimize cost); +1 avoids divide-by-zero
+        return 1 / (cost + 1)
+    else: # "balanced"
+        # Maximize compute-per-dollar (default)
+        return compute / (cost + 1)
+
+
+def daily_cost_usd(results):
+    """Per-rack daily cost, using the same formula as the optimizer training set."""
+    total_power_watts = results['calculated_server_power_watts'] + results['cooling_unit_power_watts']
+    return total_power_watts / 1000 * cost_per_kwh_usd() * 24
+
+
+class PhysicsOptimizer:
+    """
+    Deterministic optimizer over (inlet, workload) for a given ambient temp.
+
+    1. Scores a regular grid of candidates with one batched physics call.
+    2. Refines the best grid point with Nelder-Mead inside the slider bounds.
+    3. Snaps to the integer settings the UI can apply, keeping the best corner.
+    """
+
+    def __init__(self, grid_shape=(31, 81), max_iter=80, tol=1e-6):
+        self.grid_shape = grid_shape
+        self.max_iter = max_iter
+        self.tol = tol
+        self._lo = np.array([INLET_RANGE[0], WORKLOAD_RANGE[0]])
+        self._span = np.array([INLET_RANGE[1] - INLET_RANGE[0], WORKLOAD_RANGE[1] - WORKLOAD_RANGE[0]])
+
+        # Candidate grid in normalized [0, 1]^2 coordinates, built once
+        u = np.linspace(0.0, 1.0, grid_shape[0])
+        v = np.linspace(0.0, 1.0, grid_shape[1])
+        uu, vv = np.meshgrid(u, v, indexing='ij')
+        self._grid = np.column_stack([uu.ravel(), vv.ravel()])
+
+    def evaluate(self, ambient_temp, inlet, workload, profile="balanced"):
+        """Returns (reward, cost, compute) arrays for a batch of settings."""
+        results = compute_results_batch(inlet, workload, ambient_temp)
+        cost = daily_cost_usd(results)
+        compute = results['compute_output']
+        return profile_reward(profile, cost, compute), cost, compute
+
+    def _evaluate_normalized(self, ambient_temp, points, profile):
+        settings = self._lo + np.clip(points, 0.0, 1.0) * self._span
+        return self.evaluate(ambient_temp, settings[:, 0], settings[:, 1], profile)
+
+    @staticmethod
+    def _best_index(reward, cost):
+        # Ties (e.g. 'greedy' on a compute plateau) go to the cheapest setting
+        return np.lexsort((cost, -reward))[0]
+
+    def optimize(self, ambient_temp, profile="balanced"):
+        """
+        Returns the optimal settings plus the convergence trace
+        (best reward after the grid pass and each Nelder-Mead iteration).
+        """
+        # 1. Coarse vectorized grid pass
+        reward, cost, _ = self._evaluate_normalized(ambient_temp, self._grid, profile)
+        best = self._best_index(reward, cost)
+        trace = [float(reward[best])]
+
+        # 2. Nelder-Mead refinement, starting from a one-cell simplex
+        step = np.array([1.0 / (self.grid_shape[0] - 1), 1.0 / (self.grid_shape[1] - 1)])
+        simplex = np.array([self._grid[best],
+                            self._grid[best] + [step[0], 0.0],
+                            self._grid[best] + [0.0, step[1]]])
+        simplex = np.clip(simplex, 0.0, 1.0)
+        values = -self._evaluate_normalized(ambient_temp, simplex, profile)[0]
+
+        for _ in range(self.max_iter):
+            order = np.argsort(values)
+            simplex, values = simplex[order], values[order]
+            if values[-1] - values[0] <= self.tol * max(1.0, abs(values[0])):
+                break
+
+            centroid = simplex[:-1].mean(axis=0)
+            worst = simplex[-1]
+            # Reflection, expansion and both contractions scored in one batch
+            candidates = np.clip(np.array([
+                centroid + (centroid - worst),
+                centroid + 2.0 * (centroid - worst),
+                centroid + 0.5 * (centroid - worst),
+                centroid - 0.5 * (centroid - worst),
+            ]), 0.0, 1.0)
+            refl, expa, outc, inc = -self._evaluate_normalized(ambient_temp, candidates, profile)[0]
+
+            if refl < values[0]:
+                if expa < refl:
+                    simplex[-1], values[-1] = candidates[1], expa
+                else:
+                    simplex[-1], values[-1] = candidates[0], refl
+            elif refl < values[-2]:
+                simplex[-1], values[-1] = candidates[0], refl
+            elif refl < values[-1] and outc <= refl:
+                simplex[-1], values[-1] = candidates[2], outc
+            elif inc < values[-1]:
+                simplex[-1], values[-1] = candidates[3], inc
+            else:
+                # Shrink towards the best vertex
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = -self._evaluate_normalized(ambient_temp, simplex[1:], profile)[0]
+            trace.append(float(-values.min()))
+
+        # 3. Snap to integer slider settings, checking the surrounding corners
+        refined = self._lo + simplex[np.argmin(values)] * self._span
+        inlets = np.clip([np.floor(refined[0]), np.ceil(refined[0])], *INLET_RANGE)
+        workloads = np.clip([np.floor(refined[1]), np.ceil(refined[1])], *WORKLOAD_RANGE)
+        ii, ww = np.meshgrid(inlets, workloads, indexing='ij')
+        reward, cost, _ = self.evaluate(ambient_temp, ii.ravel(), ww.ravel(), profile)
+        best = self._best_index(reward, cost)
+
+        return {
+            'inlet': int(ii.ravel()[best]),
+            'workload': int(ww.ravel()[best]),
+            'reward_score': float(reward[best]),
+            'trace': trace
+        }
@@ -0,0 +1,160 @@
+"""
+Precomputed optimizer policy table.
+Optimal settings per profile are computed over a grid of ambient
+temperatures in the background, persisted to disk, and interpolated on
+lookup so "Suggest" / "Auto-Optimize" cost a table read.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ml.optimizer import PROFILES
+
+
+class PolicyCache:
+    """
+    Ambient-temperature policy table for every optimization profile.
+
+    - `start()` loads the table from disk, or rebuilds it on a background
+      thread when the optimizer fingerprint (mode, physics, models) changed.
+    - `lookup()` interpolates between grid points once the table is ready;
+      otherwise (or outside the grid) it falls back to an on-demand search
+      whose results are kept in a small LRU.
+    - `invalidate()` bumps a generation counter; a build or on-demand search
+      that started on an older generation never installs its result.
+    """
+
+    def __init__(self, ml_engine, ambient_range=(10.0, 45.0), step=0.25,
+                 cache_path="models/policy_cache.npz", lru_size=128):
+        self.ml_engine = ml_engine
+        self.ambient_grid = np.arange(ambient_range[0], ambient_range[1] + step / 2, step)
+        self.cache_path = cache_path
+        self.lru_size = lru_size
+
+        self.table = None # {profile: (n_grid, 3) array of inlet, workload, reward}
+        self.fingerprint = None
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._generation = 0 # Bumped by invalidate()
+        self.error = None # Why the last build was abandoned (the table then stays empty)
+
+    @property
+    def is_ready(self):
+        return self.table is not None
+
+    @property
+    def is_abandoned(self):
+        return self.table is None and self.error is not None
+
+    def start(self):
+        """Loads the persisted table or precomputes it in the background."""
+        if self._thread is not None and self._thread.is_alive():
+            return # The running build restarts itself if it was invalidated
+        self._thread = threading.Thread(target=self._build, name="policy-cache", daemon=True)
+        self._thread.start()
+
+    def invalidate(self):
+        """Drops the table and LRU (e.g. after a model swap) and rebuilds."""
+        with self._lock:
+            self._generation += 1
+            self.table = None
+            self.fingerprint = None
+            self.error = None
+            self._lru.clear()
+        self.start()
+
+    def _build(self):
+        while True:
+            generation = self._generation
+            table, fingerprint, from_disk, error = self._build_table(generation)
+            with self._lock:
+                if generation == self._generation:
+                    self.error = error
+                    if table is not None:
+                        if not from_disk:
+                            self._save(fingerprint, table) # Small file; under the lock so a stale table never lands
+                        self.table = table
+                        self.fingerprint = fingerprint
+                    break
+            print("POLICY CACHE: Optimizer changed during the build, rebuilding.")
+        if table is not None:
+            print("POLICY CACHE: Ready.")
+        elif error is not None:
+            print(f"POLICY CACHE: Precompute abandoned: {error}")
+
+    def _build_table(self, generation):
+        """(table, fingerprint, from_disk, error); the table is None if the build stopped early."""
+        fingerprint = self.ml_engine.optimizer_fingerprint()
+        table = self._load(fingerprint)
+        if table is not None:
+            return table, fingerprint, True, None
+
+        print(f"POLICY CACHE: Precomputing {len(self.ambient_grid)} ambient points x {len(PROFILES)} profiles...")
+        table = {}
+        for profile in PROFILES:
+            rows = []
+            for ambient in self.ambient_grid:
+                if generation != self._generation:
+                    return None, fingerprint, False, None # Invalidated: _build starts over
+                best = self.ml_engine.find_best_settings(ambient, profile=profile, log=False)
+                if best is None:
+                    return None, fingerprint, False, \
+                        f"the optimizer found no '{profile}' settings at {ambient:.2f}°C ambient."
+                rows.append((best['inlet'], best['workload'], best['reward_score']))
+            table[profile] = np.array(rows, dtype=np.float64)
+        return table, fingerprint, False, None
+
+    def _load(self, fingerprint):
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with np.load(self.cache_path) as data:
+                if str(data['fingerprint']) != fingerprint or not np.array_equal(data['ambient'], self.ambient_grid):
+                    print("POLICY CACHE: Stale cache on disk (optimizer changed), rebuilding.")
+                    return None
+                return {profile: data[profile] for profile in PROFILES}
+        except Exception as e:
+            print(f"POLICY CACHE: Could not read {self.cache_path}: {e}")
+            return None
+
+    def _save(self, fingerprint, table):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp.npz"
+            np.savez(tmp_path, fingerprint=fingerprint, ambient=self.ambient_grid, **table)
+            os.replace(tmp_path, self.cache_path) # Atomic, readers never see half a file
+        except Exception as e:
+            print(f"POLICY CACHE: Could not write {self.cache_path}: {e}")
+
+    def lookup(self, ambient_temp, profile="balanced"):
+        """Returns {'inlet', 'workload', 'reward_score'} for the ambient temp."""
+        table = self.table
+        grid = self.ambient_grid
+        if table is not None and grid[0] <= ambient_temp <= grid[-1]:
+            rows = table[profile]
+            return {
+                'inlet': int(round(np.interp(ambient_temp, grid, rows[:, 0]))),
+                'workload': int(round(np.interp(ambient_temp, grid, rows[:, 1]))),
+                'reward_score': float(np.interp(ambient_temp, grid, rows[:, 2]))
+            }
+
+        key = (profile, round(float(ambient_temp), 1))
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+
+            generation = self._generation
+
+        best = self.ml_engine.find_best_settings(key[1], profile=profile)
+        if best is not None:
+            with self._lock:
+                if generation != self._generation:
+                    return best # Computed on the previous models: answer, but don't cache
+                self._lru[key] = best
+                while len(self._lru) > self.lru_size:
+                    self._lru.popitem(last=False)
+        return best
@@ -0,0 +1,144 @@
+"""
+Versioned registry for the optimizer models.
+
+    models/registry/<name>/
+        v0001/  cost.flat.npy, cost.flat.json, compute.flat.npy, ..., metadata.json
+        v0002/  ...
+        CURRENT  -> "v0002"
+
+Versions are written to a temporary directory and renamed into place, and
+the CURRENT pointer is replaced atomically, so a reader (the running
+console) only ever sees complete versions. Artifacts are flat forests, so
+loading memory-maps the node arrays.
+
+    python -m ml.registry                 # list versions
+    python -m ml.registry activate v0001  # switch the console to a version
+    python -m ml.registry rollback        # back to the previous version
+"""
+import json
+import os
+import shutil
+import sys
+import time
+
+from ml.flat_forest import FlatForest
+
+REGISTRY_DIR = "models/registry"
+
+
+class ModelRegistry:
+    """Versioned, memory-mappable model artifacts with an atomic CURRENT pointer."""
+
+    def __init__(self, name="optimizer", root=REGISTRY_DIR):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self.pointer_path = os.path.join(self.path, "CURRENT")
+
+    def versions(self):
+        """All published versions, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(v for v in os.listdir(self.path)
+                      if v.startswith("v") and v[1:].isdigit()
+                      and os.path.isdir(os.path.join(self.path, v)))
+
+    def current(self):
+        """The active version, or None if nothing was published yet."""
+        try:
+            with open(self.pointer_path, "r") as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version if version in self.versions() else None
+
+    def pointer_stamp(self):
+        """Cheap change marker for polling: mtime of the CURRENT pointer."""
+        try:
+            return os.stat(self.pointer_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def metadata(self, version):
+        with open(os.path.join(self.path, version, "metadata.json"), "r") as f:
+            return json.load(f)
+
+    def publish(self, models, metadata=None, activate=True):
+        """
+        Stores {artifact_name: FlatForest} as a new version and returns its
+        name. The version only becomes visible once fully written.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        existing = self.versions()
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+
+        staging = os.path.join(self.path, f".{version}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for artifact, forest in models.items():
+            forest.save(os.path.join(staging, f"{artifact}.flat"))
+
+        meta = dict(metadata or {})
+        meta.update(version=version, artifacts=sorted(models), published_at=time.time())
+        with open(os.path.join(staging, "metadata.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        os.rename(staging, os.path.join(self.path, version))
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Points CURRENT at `version` (atomic replace)."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown {self.name} model version '{version}'")
+        tmp_path = self.pointer_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, self.pointer_path)
+
+    def rollback(self):
+        """Activates the version published before the current one; returns it."""
+        versions = self.versions()
+        current = self.current()
+        if current is None or versions.index(current) == 0:
+            raise ValueError(f"No earlier {self.name} model version to roll back to")
+        previous = versions[versions.index(current) - 1]
+        self.activate(previous)
+        return previous
+
+    def load(self, version=None):
+        """
+        Returns (version, {artifact_name: FlatForest}, metadata) for the given
+        or current version, with the node arrays memory-mapped.
+        """
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"No {self.name} model published in '{self.path}'")
+        meta = self.metadata(version)
+        version_dir = os.path.join(self.path, version)
+        models = {artifact: FlatForest.load(os.path.join(version_dir, f"{artifact}.flat"))
+                  for artifact in meta["artifacts"]}
+        return version, models, meta
+
+
+def main(argv):
+    registry = ModelRegistry()
+    command = argv[0] if argv else "list"
+
+    if command == "activate" and len(argv) == 2:
+        registry.activate(argv[1])
+        print(f"REGISTRY: Activated {argv[1]}.")
+    elif command == "rollback":
+        print(f"REGISTRY: Rolled back to {registry.rollback()}.")
+    elif command == "list":
+        current = registry.current()
+        for version in registry.versions():
+            meta = registry.metadata(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  physics={meta.get('physics_fingerprint')}  metrics={meta.get('metrics')}")
+    else:
+        print("usage: python -m ml.registry [list | activate <version> | rollback]")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,70 +1,257 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from statsmodels.tsa.arima.model import ARIMA
 import warnings
-import joblib
 import os
-from collections import deque # Import deque
+import threading
+from ml.anomaly import RobustZScoreDetector, RackAnomalyDetector
+from ml.optimizer import PhysicsOptimizer, profile_reward
+from ml.flat_forest import FlatForest, export_forest, flat_path_for
+from ml.forecasting import VARForecaster, RackForecaster
+from ml.registry import ModelRegistry
+from ml.history import ColumnarRing, RingBuffer
+from ml.evaluation import load_report, select_backend
+from twin.digital_twin_engine import physics_fingerprint
 
 # Suppress harmless warnings from statsmodels
 warnings.filterwarnings("ignore")
 
+# NOTE: pandas, statsmodels and joblib are imported lazily (they cost seconds
+# at startup); call MLEngine.warm_up() from a background thread to preload them.
+
 class MLEngine:
     """
     Encapsulates all Machine Learning logic for the Digital Twin.
     """
     
     # --- MODIFIED: __init__ ---
-    def __init__(self, forecast_features, anomaly_features, forecast_steps=30):
+    # Ticks of facility-level features kept for the models (a few MB even at 100k)
+    HISTORY_SIZE = 200
+    FORECAST_WINDOW = 200
+    ANOMALY_WINDOW = 200
+    RACK_WINDOW = 60
+    RACK_CRITICAL_TEMP_C = 37.0
+
+    def __init__(self, forecast_features, anomaly_features, forecast_steps=30, anomaly_refit_interval=10,
+                 optimizer_mode="physics", forecast_backend="var", history_size=HISTORY_SIZE,
+                 optimizer_error_budget=0.01):
         
         # 1. Set ml_ready to True immediately
         self.ml_ready = True 
-        self.history_buffer = deque(maxlen=200) # Use a deque for history
+        # Preallocated columnar history: forecast and anomaly features are
+        # adjacent columns, and each model keeps its features in column order,
+        # so both read a zero-copy window (outputs are keyed by feature name)
+        columns = ColumnarRing.column_order(forecast_features, anomaly_features)
+        forecast_features = [name for name in columns if name in forecast_features]
+        anomaly_features = [name for name in columns if name in anomaly_features]
+        self.history = ColumnarRing(
+            columns, history_size,
+            derived={'total_power': lambda d: d['total_server_power_kw'] + d['total_cooling_power_kw']}
+        )
         
         # 2. Initialize models right away
-        self.anomaly_detector = IsolationForest(contamination=0.05, random_state=42)
+        # Streaming detector: O(features) scoring, baseline rebuilt every N ticks
+        self.anomaly_detector = RobustZScoreDetector(
+            len(anomaly_features), window=min(self.ANOMALY_WINDOW, history_size),
+            refit_interval=anomaly_refit_interval
+        )
+        # Per-rack history (time, n_racks) and its detectors are sized lazily
+        # from the first tick's rack count
+        self.rack_history = None
+        self.rack_anomaly_detector = None
+        self.rack_anomalies = ([], [])
+        # "var" fits all forecast features jointly in one solve; "arima" fits one model each
+        self.forecast_backend = forecast_backend
         self.forecasters = {}
+        self.joint_forecaster = VARForecaster(order=1)
+        self.rack_forecaster = None # Sized lazily, like the per-rack detector
         
         self.forecast_features = forecast_features
         self.anomaly_features = anomaly_features
         self.forecast_steps = forecast_steps
         
-        # --- Optimizer (no change) ---
+        # --- Optimizer ---
+        # "physics" searches the twin directly; "surrogate" uses the trained forests;
+        # "auto" picks the faster of the two within the error budget (see evaluate_optimizer.py)
+        if optimizer_mode == "auto":
+            optimizer_mode = self._select_optimizer_mode(optimizer_error_budget)
+        self.optimizer_mode = optimizer_mode
         self.optimizer_ready = False
-        self.cost_model = None
-        self.compute_model = None
+        # (version, cost_model, compute_model), replaced as a whole on hot swap
+        self.optimizer_models = (None, None, None)
+        self.registry = ModelRegistry("optimizer")
+        self._registry_stamp = self.registry.pointer_stamp()
+        self._pending_models = None
+        self._reload_thread = None
         self.optimizer_features = ['ambient_temp_c', 'inlet_temp_c', 'server_workload_percent']
+        self.physics_optimizer = PhysicsOptimizer()
         
-        self._load_optimizer_models()
+        if self.optimizer_mode == "physics":
+            self.optimizer_ready = True
+        else:
+            self._load_optimizer_models()
+
+    @staticmethod
+    def _select_optimizer_mode(error_budget):
+        """Fastest evaluated backend within `error_budget` mean decision regret."""
+        report = load_report()
+        if report is None:
+            print("ML OPTIMIZER: No evaluation report, using physics. Run evaluate_optimizer.py")
+            return "physics"
+        mode = select_backend(report, error_budget)
+        print(f"ML OPTIMIZER: Auto-selected '{mode}' backend (error budget {error_budget:.2%}).")
+        return mode
+
+    COST_MODEL_PATH = "models/optimizer_cost.joblib"
+    COMPUTE_MODEL_PATH = "models/optimizer_compute.joblib"
+
+    @property
+    def cost_model(self):
+        return self.optimizer_models[1]
+
+    @property
+    def compute_model(self):
+        return self.optimizer_models[2]
+
+    @property
+    def model_version(self):
+        return self.optimizer_models[0]
 
     def _load_optimizer_models(self):
-        """Loads the pre-trained optimizer models from disk."""
-        cost_path = "models/optimizer_cost.joblib"
-        compute_path = "models/optimizer_compute.joblib"
+        """
+        Loads the pre-trained optimizer models. Prefers the active registry
+        version (memory-mapped); falls back to the legacy files in models/.
+        """
+        self._registry_stamp = self.registry.pointer_stamp()
+        if self.registry.current() is not None:
+            try:
+                self.optimizer_models = self._load_registry_version()
+                self.optimizer_ready = True
+                print(f"ML OPTIMIZER: Models {self.model_version} loaded from registry.")
+                return
+            except Exception as e:
+                print(f"ML OPTIMIZER: Error loading registry models: {e}")
+
+        cost_path = self.COST_MODEL_PATH
+        compute_path = self.COMPUTE_MODEL_PATH
         
         if os.path.exists(cost_path) and os.path.exists(compute_path):
             try:
-                self.cost_model = joblib.load(cost_path)
-                self.compute_model = joblib.load(compute_path)
+                self.optimizer_models = (None, self._load_forest(cost_path), self._load_forest(compute_path))
                 self.optimizer_ready = True
                 print("ML OPTIMIZER: Models loaded successfully.")
             except Exception as e:
                 print(f"ML OPTIMIZER: Error loading models: {e}")
         else:
             print("ML OPTIMIZER: Warning! Optimizer models not found. Run train_optimizer.py")
+
+    def _load_registry_version(self, version=None):
+        version, models, meta = self.registry.load(version)
+        if meta.get("physics_fingerprint") not in (None, physics_fingerprint()):
+            print(f"ML OPTIMIZER: Warning! Models {version} were trained on different twin physics.")
+        return version, models["cost"], models["compute"]
+
+    def check_for_model_updates(self):
+        """
+        Polls the registry between ticks, in every optimizer mode (the physics
+        mode keeps the surrogate current for find_best_settings(mode=...)).
+        A changed CURRENT pointer starts a background load; the loaded models
+        are swapped in on a later call, so the swap always happens between
+        ticks and never blocks one.
+        Returns the new version when a swap happened, else None.
+        """
+        pending = self._pending_models
+        if pending is not None:
+            self._pending_models = None
+            self.optimizer_models = pending # Single reference swap
+            self.optimizer_ready = True
+            print(f"ML OPTIMIZER: Hot-swapped to models {pending[0]}.")
+            return pending[0]
+
+        stamp = self.registry.pointer_stamp()
+        if stamp == self._registry_stamp or (self._reload_thread is not None and self._reload_thread.is_alive()):
+            return None
+        self._registry_stamp = stamp
+        self._reload_thread = threading.Thread(target=self._reload_models, name="model-reload", daemon=True)
+        self._reload_thread.start()
+        return None
+
+    def _reload_models(self):
+        try:
+            models = self._load_registry_version()
+        except Exception as e:
+            print(f"ML OPTIMIZER: Could not load new models, keeping {self.model_version}: {e}")
+            return
+        if models[0] != self.model_version:
+            self._pending_models = models
+
+    def activate_model_version(self, version):
+        """Switches to a published version; picked up by the next update check."""
+        self.registry.activate(version)
+
+    def rollback_models(self):
+        """Reverts to the previously published version; returns its name."""
+        return self.registry.rollback()
+
+    def _load_forest(self, joblib_path):
+        """Returns a FlatForest for the model, re-exporting it if the joblib file is newer."""
+        flat_path = flat_path_for(joblib_path)
+        if FlatForest.exists(flat_path) and \
+                os.path.getmtime(flat_path + ".npy") >= os.path.getmtime(joblib_path):
+            return FlatForest.load(flat_path)
+
+        import joblib
+
+        print(f"ML OPTIMIZER: Flattening '{joblib_path}' for fast loading...")
+        export_forest(joblib.load(joblib_path), flat_path)
+        return FlatForest.load(flat_path)
             
+    def warm_up(self):
+        """
+        Imports the heavy forecasting dependencies ahead of first use.
+        Safe to call from a background thread while the UI starts.
+        """
+        import pandas
+        if self.forecast_backend == "arima":
+            from statsmodels.tsa.arima.model import ARIMA
+        print("ML: Forecasting libraries loaded.")
+
+    def optimizer_fingerprint(self):
+        """
+        Identifies everything the optimizer output depends on: the mode, the
+        twin physics and (for the surrogate) the model files on disk.
+        """
+        parts = [self.optimizer_mode, physics_fingerprint()]
+        if self.optimizer_mode != "physics" and self.model_version is not None:
+            parts.append(self.model_version)
+        elif self.optimizer_mode != "physics":
+            for path in (self.COST_MODEL_PATH, self.COMPUTE_MODEL_PATH):
+                if os.path.exists(path):
+                    stat = os.stat(path)
+                    parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        return "|".join(parts)
+
     # --- MODIFIED: The "Finder" Function ---
-    def find_best_settings(self, current_ambient_temp, profile="balanced", num_samples=1000):
+    def find_best_settings(self, current_ambient_temp, profile="balanced", num_samples=1000, mode=None, log=True):
         """
-        Uses the loaded models to find the optimal settings for the given ambient temp
-        based on the selected optimization profile.
+        Finds the optimal settings for the given ambient temp based on the
+        selected optimization profile. `mode` overrides self.optimizer_mode.
         """
         if not self.optimizer_ready:
             return None
 
-        print(f"ML OPTIMIZER: Searching for '{profile}' settings at {current_ambient_temp:.1f}°C ambient...")
-        
+        mode = mode or self.optimizer_mode
+        if log:
+            print(f"ML OPTIMIZER: Searching for '{profile}' settings at {current_ambient_temp:.1f}°C ambient ({mode})...")
+
+        if mode == "physics":
+            # Deterministic: vectorized twin physics + Nelder-Mead refinement
+            return self.physics_optimizer.optimize(current_ambient_temp, profile)
+
+        _, cost_model, compute_model = self.optimizer_models # One consistent version per search
+        if cost_model is None or compute_model is None:
+            return None
+
+        import pandas as pd
+
         # 1. Create a "search space" DataFrame
         search_data = {
             'ambient_temp_c': np.full(num_samples, current_ambient_temp),
@@ -74,19 +261,11 @@ class MLEngine:
         search_df = pd.DataFrame(search_data)[self.optimizer_features]
 
         # 2. Predict cost and compute for all samples
-        pred_cost = self.cost_model.predict(search_df)
-        pred_compute = self.compute_model.predict(search_df)
-
-        # 3. --- NEW: Find the best "reward" based on the profile ---
-        if profile == "greedy":
-            # Maximize compute, ignore cost
-            reward = pred_compute
-        elif profile == "sustainable":
-            # Maximize 1 / cost (i.e., minimize cost)
-            reward = 1 / (pred_cost + 1) # +1 to avoid divide-by-zero
-        else: # "balanced"
-            # Maximize compute-per-dollar (default)
-            reward = pred_compute / (pred_cost + 1)
+        pred_cost = cost_model.predict(search_df)
+        pred_compute = compute_model.predict(search_df)
+
+        # 3. Find the best "reward" based on the profile
+        reward = profile_reward(profile, pred_cost, pred_compute)
         
         best_index = np.argmax(reward)
         
@@ -106,32 +285,39 @@ class MLEngine:
         Adds a new data point and refits all ML models.
         This is called on every simulation step.
         """
-        self.history_buffer.append(data_dict)
+        self.history.append_record(data_dict)
+
+        # 1. Update the streaming anomaly baseline (cheap, no refit every tick)
+        self.anomaly_detector.update(self.history.select(self.anomaly_features, 1)[0])
+        self._update_rack_models(data_dict.get('individual_outlet_temps'))
         
         # We need *some* data to train, > 20 steps is a safe minimum to avoid errors
-        if len(self.history_buffer) < 20:
-            print(f"ML: Collecting initial data... {len(self.history_buffer)}/20")
+        if len(self.history) < 20:
+            print(f"ML: Collecting initial data... {len(self.history)}/20")
             
             # --- Enable optimizer buttons once we have *some* data ---
-            if len(self.history_buffer) == 19 and self.optimizer_ready:
+            if len(self.history) == 19 and self.optimizer_ready:
                  print("ML: Optimizer is now online.")
             return 
         
         # --- Update insights message once training starts ---
-        if len(self.history_buffer) == 20:
+        if len(self.history) == 20:
             print("ML: Initial data collected. Live training starting.")
 
-        df = pd.DataFrame(self.history_buffer)
-        df['total_power'] = df['total_server_power_kw'] + df['total_cooling_power_kw']
+        # 2. Re-Train Forecasting Models
+        if self.forecast_backend == "var":
+            try:
+                self.joint_forecaster.fit(self.history.select(self.forecast_features, self.FORECAST_WINDOW))
+            except Exception as e:
+                print(f"ML Error (Forecast): {e}")
+            return
 
-        # 1. Re-Train Anomaly Detection Model
-        try:
-            anomaly_data = df[self.anomaly_features]
-            self.anomaly_detector.fit(anomaly_data)
-        except Exception as e:
-            print(f"ML Error (Anomaly): {e}")
+        import pandas as pd
+        from statsmodels.tsa.arima.model import ARIMA
+
+        df = pd.DataFrame(self.history.select(self.forecast_features, self.FORECAST_WINDOW),
+                          columns=self.forecast_features)
 
-        # 2. Re-Train Forecasting Models
         try:
             for feature in self.forecast_features:
                 # (Re-training ARIMA every step is slow, but works for this demo)
@@ -143,25 +329,114 @@ class MLEngine:
             # print(f"ML Error (Forecast): {e}")
             pass # Suppress repeat warnings
 
-    def infer_anomaly(self, current_data_df):
+    def _update_rack_models(self, outlet_temps):
+        """
+        Appends the per-rack outlet temperatures to the rack history, then
+        scores every rack against its own rolling history and updates the
+        batched per-rack forecaster, each in one pass over the fleet.
+        """
+        if not outlet_temps:
+            self.rack_anomalies = ([], [])
+            return
+        n_racks = len(outlet_temps)
+        if self.rack_history is None or self.rack_history.shape != (n_racks,):
+            # One extra tick so the detector can see the value leaving its window
+            self.rack_history = RingBuffer(self.RACK_WINDOW + 1, (n_racks,))
+            self.rack_anomaly_detector = RackAnomalyDetector(self.rack_history, window=self.RACK_WINDOW)
+            self.rack_forecaster = RackForecaster(self.rack_history, window=self.RACK_WINDOW,
+                                                  horizon=self.forecast_steps, critical_temp=self.RACK_CRITICAL_TEMP_C)
+        self.rack_history.append(outlet_temps)
+
+        indices, scores = self.rack_anomaly_detector.update()
+        self.rack_anomalies = (indices.tolist(), scores.tolist())
+        self.rack_forecaster.update()
+
+    def infer_critical_racks(self, limit=None):
+        """
+        Returns (rack_indices, ticks_until_critical) for racks forecast to
+        cross the critical outlet temperature within the forecast horizon.
+        """
+        if not self.ml_ready or self.rack_forecaster is None:
+            return [], []
+        racks, eta = self.rack_forecaster.critical_racks(limit)
+        return racks.tolist(), eta.tolist()
+
+    def infer_rack_anomalies(self):
+        """
+        Returns (rack_indices, z_scores) for the top-K racks deviating from
+        their own recent behaviour on the latest tick, worst first.
+        """
+        if not self.ml_ready:
+            return [], []
+        return self.rack_anomalies
+
+    @staticmethod
+    def _feature_vector(data_dict, features):
+        """Pulls `features` out of a results dict, deriving total_power if needed."""
+        values = []
+        for feature in features:
+            if feature == 'total_power' and feature not in data_dict:
+                values.append(data_dict['total_server_power_kw'] + data_dict['total_cooling_power_kw'])
+            else:
+                values.append(data_dict[feature])
+        return values
+
+    def _anomaly_vector(self, data_dict):
+        """Pulls the anomaly features out of a results dict, in feature order."""
+        return self._feature_vector(data_dict, self.anomaly_features)
+
+    def infer_anomaly(self, current_data=None):
         """
         Runs anomaly detection on the current data point.
+        `current_data` is a dict holding the anomaly features (or the raw
+        aggregated results); by default the latest tick in the history is
+        scored. Returns -1 for an anomaly, 1 for normal and 0 while the
+        baseline is still warming up.
         """
-        if not self.ml_ready or self.anomaly_detector is None or len(self.history_buffer) < 20:
+        if not self.ml_ready or not self.anomaly_detector.is_ready:
             return 0 
             
         try:
-            prediction = self.anomaly_detector.predict(current_data_df)
-            return prediction[0]
+            if current_data is None:
+                return self.anomaly_detector.predict(self.history.select(self.anomaly_features, 1)[0])
+            return self.anomaly_detector.predict(self._anomaly_vector(current_data))
         except Exception as e:
             print(f"Anomaly detection error: {e}")
             return 0
 
+    @staticmethod
+    def _forecast_key(feature):
+        return feature.replace('total_power', 'power') \
+                      .replace('average_pue', 'pue') \
+                      .replace('max_outlet_temp_c', 'temp') \
+                      .replace('total_daily_cost_usd', 'cost')
+
     def infer_forecasts(self):
         """
         Generates a forecast for all relevant features.
+        With the joint backend, forecast_results['bands'] also holds the
+        (lower, upper) 95% prediction interval for each feature.
         """
-        if not self.ml_ready or not self.forecasters or len(self.history_buffer) < 20:
+        if not self.ml_ready or len(self.history) < 20:
+            return {}
+
+        if self.forecast_backend == "var":
+            if not self.joint_forecaster.is_fitted:
+                return {}
+            try:
+                mean, lower, upper = self.joint_forecaster.forecast(self.forecast_steps)
+            except Exception as e:
+                print(f"Forecasting error: {e}")
+                return {}
+
+            forecast_results = {'bands': {}}
+            for i, feature in enumerate(self.forecast_features):
+                clean_key = self._forecast_key(feature)
+                forecast_results[clean_key] = mean[:, i].tolist()
+                forecast_results['bands'][clean_key] = (lower[:, i].tolist(), upper[:, i].tolist())
+            return forecast_results
+
+        if not self.forecasters:
             return {}
             
         forecast_results = {}
@@ -172,14 +447,10 @@ class MLEngine:
                 end = history_len + self.forecast_steps - 1
                 
                 forecast = list(model.predict(start, end))
-                clean_key = feature.replace('total_power', 'power') \
-                                   .replace('average_pue', 'pue') \
-                                   .replace('max_outlet_temp_c', 'temp') \
-                                   .replace('total_daily_cost_usd', 'cost')
-                forecast_results[clean_key] = forecast
+                forecast_results[self._forecast_key(feature)] = forecast
         
         except Exception as e:
             # print(f"Forecasting error: {e}")
             return {}
             
-        return forecast_results
\ No newline at end of file
+        return forecast_results
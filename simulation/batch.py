@@ -0,0 +1,147 @@
+"""
+Time-compressed batch runs of the twin for capacity planning.
+
+Steps a SimulationClock through e.g. a year of operation without the UI,
+using the array APIs end to end (scenario plan -> variation -> batched
+physics), and streams one row of facility aggregates per step to CSV.
+
+    python -m simulation.batch --days 365 --step-minutes 60 --output runs/year.csv
+    python -m simulation.batch --days 30 --record-racks   # + per-rack outlet temps (.npy)
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from data_pipeline import DataIngestor, ScenarioCombinator
+from simulation.clock import SEASONAL_AMPLITUDE_C, WEEKEND_WORKLOAD_FACTOR, SimulationClock
+from simulation.dynamics import StateRandomizer
+from twin.digital_twin_engine import compute_results, compute_results_batch, cost_per_kwh_usd
+
+COLUMNS = [
+    "timestamp", "weekend", "mean_ambient_c", "total_server_power_kw", "total_cooling_power_kw",
+    "average_pue", "max_outlet_temp_c", "total_daily_cost_usd", "step_energy_kwh", "step_cost_usd",
+    "total_compute_output", "cooling_strategy",
+]
+
+
+def aggregate_step(payload, results):
+    """Facility-level aggregates of one step, the same figures the live dashboard shows."""
+    server_w = results['calculated_server_power_watts'].sum()
+    cooling_w = results['cooling_unit_power_watts'].sum()
+    facility_kw = (server_w + cooling_w) / 1000
+
+    # Cooling strategy of the hottest rack (strings only exist on the scalar path)
+    hottest = int(np.argmax(results['temp_deviation_c']))
+    strategy = compute_results({field: float(values[hottest]) for field, values in payload.items()})['cooling_strategy']
+
+    return {
+        "total_server_power_kw": server_w / 1000,
+        "total_cooling_power_kw": cooling_w / 1000,
+        "average_pue": facility_kw * 1000 / server_w if server_w > 0 else 0,
+        "max_outlet_temp_c": float(results['outlet_temp_c'].max()),
+        "total_daily_cost_usd": facility_kw * cost_per_kwh_usd() * 24,
+        "total_compute_output": float(results['compute_output'].sum()),
+        "cooling_strategy": strategy,
+    }
+
+
+def run_batch(output, clock, n_steps, seed=None, record_racks=False, data_path='data/datacenter_full_state_list.json'):
+    """
+    Runs `n_steps` clock steps and streams aggregates to `output` (CSV).
+    With `record_racks`, per-rack outlet temperatures go to a memory-mapped
+    float32 (n_steps, n_racks) array next to it. Returns the run summary.
+    """
+    rng = np.random.default_rng(seed)
+    ingestor = DataIngestor(data_path)
+    combinator = ScenarioCombinator(num_machines=len(ingestor.machine_ids))
+    randomizer = StateRandomizer(seed=rng.integers(2**32), clock=clock, grid_shape=(20, 35))
+    step_hours = clock.step.total_seconds() / 3600
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    rack_temps = None
+    if record_racks:
+        rack_temps = np.lib.format.open_memmap(os.path.splitext(output)[0] + "_rack_outlet_temps.npy", mode='w+',
+                                               dtype=np.float32, shape=(n_steps, len(ingestor.machine_ids)))
+
+    totals = {"energy_kwh": 0.0, "server_energy_kwh": 0.0, "cost_usd": 0.0, "rack_hours_above_37c": 0.0}
+    start = time.perf_counter()
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for step in range(n_steps):
+            timestamp, weekend = clock.now, clock.is_weekend
+
+            payload = ingestor.get_arrays_from_plan(combinator.generate_plan_array(rng))
+            workload, ambient = randomizer.vary_arrays(payload['server_workload_percent'], payload['ambient_temp_c'])
+            payload = {'server_workload_percent': workload, 'inlet_temp_c': payload['inlet_temp_c'],
+                       'ambient_temp_c': ambient}
+            results = compute_results_batch(payload['inlet_temp_c'], workload, ambient)
+            agg = aggregate_step(payload, results)
+
+            facility_kw = agg["total_server_power_kw"] + agg["total_cooling_power_kw"]
+            step_energy = facility_kw * step_hours
+            step_cost = step_energy * cost_per_kwh_usd()
+            totals["energy_kwh"] += step_energy
+            totals["server_energy_kwh"] += agg["total_server_power_kw"] * step_hours
+            totals["cost_usd"] += step_cost
+            totals["rack_hours_above_37c"] += np.count_nonzero(results['outlet_temp_c'] > 37.0) * step_hours
+            if rack_temps is not None:
+                rack_temps[step] = results['outlet_temp_c']
+
+            writer.writerow([
+                timestamp.isoformat(timespec="minutes"), int(weekend), f"{ambient.mean():.3f}",
+                f"{agg['total_server_power_kw']:.3f}", f"{agg['total_cooling_power_kw']:.3f}",
+                f"{agg['average_pue']:.5f}", f"{agg['max_outlet_temp_c']:.3f}", f"{agg['total_daily_cost_usd']:.2f}",
+                f"{step_energy:.3f}", f"{step_cost:.4f}", f"{agg['total_compute_output']:.1f}", agg["cooling_strategy"],
+            ])
+
+    if rack_temps is not None:
+        rack_temps.flush()
+    elapsed = time.perf_counter() - start
+    summary = {
+        "steps": n_steps,
+        "step_minutes": step_hours * 60,
+        "simulated_days": n_steps * step_hours / 24,
+        "wall_seconds": elapsed,
+        "energy_kwh": totals["energy_kwh"],
+        "cost_usd": totals["cost_usd"],
+        # Energy-weighted PUE over the whole run
+        "annualized_pue": totals["energy_kwh"] / totals["server_energy_kwh"] if totals["server_energy_kwh"] else 0,
+        "rack_hours_above_37c": totals["rack_hours_above_37c"],
+        "output": output,
+    }
+    with open(os.path.splitext(output)[0] + "_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time-compressed batch simulation of the data center twin.")
+    parser.add_argument("--days", type=float, default=365, help="Simulated duration in days.")
+    parser.add_argument("--step-minutes", type=float, default=60, help="Simulated time per step.")
+    parser.add_argument("--start", default=None, help="Start date, YYYY-MM-DD (default: Jan 1 this year).")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible run.")
+    parser.add_argument("--output", default="runs/batch.csv", help="CSV of per-step aggregates.")
+    parser.add_argument("--record-racks", action="store_true", help="Also store per-rack outlet temperatures.")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d") if args.start else datetime(datetime.now().year, 1, 1)
+    clock = SimulationClock(start, step=timedelta(minutes=args.step_minutes),
+                            weekend_workload_factor=WEEKEND_WORKLOAD_FACTOR, seasonal_amplitude_c=SEASONAL_AMPLITUDE_C)
+    n_steps = clock.steps_for(timedelta(days=args.days))
+    print(f"BATCH: Simulating {args.days:g} days in {n_steps} steps of {args.step_minutes:g} min...")
+
+    summary = run_batch(args.output, clock, n_steps, seed=args.seed, record_racks=args.record_racks)
+    print(f"BATCH: Done in {summary['wall_seconds']:.1f}s. Energy {summary['energy_kwh']:,.0f} kWh, "
+          f"cost ${summary['cost_usd']:,.0f}, PUE {summary['annualized_pue']:.3f}, "
+          f"{summary['rack_hours_above_37c']:,.0f} rack-hours above 37°C. Aggregates in '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
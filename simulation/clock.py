@@ -0,0 +1,51 @@
+import math
+from datetime import datetime, timedelta
+
+# Calendar effects used by batch runs
+WEEKEND_WORKLOAD_FACTOR = 0.8
+SEASONAL_AMPLITUDE_C = 4.0
+
+class SimulationClock:
+    """
+    Simulated wall clock for the twin, decoupled from the UI timer.
+
+    Each tick advances the clock by `step` (minutes to hours). The clock
+    also knows the calendar: weekends can scale workload down, and a
+    seasonal curve can shift ambient temperature (warmest around mid-July).
+    Both are off by default (factor 1.0, amplitude 0); batch runs turn them
+    on with WEEKEND_WORKLOAD_FACTOR and SEASONAL_AMPLITUDE_C.
+    """
+    def __init__(self, start=None, step=timedelta(hours=1), weekend_workload_factor=1.0,
+                 seasonal_amplitude_c=0.0, warmest_day_of_year=196):
+        if start is None:
+            start = datetime.now().replace(minute=0, second=0, microsecond=0)
+        self.now = start
+        self.step = step if isinstance(step, timedelta) else timedelta(minutes=step)
+        self.weekend_workload_factor = weekend_workload_factor
+        self.seasonal_amplitude_c = seasonal_amplitude_c
+        self.warmest_day_of_year = warmest_day_of_year
+
+    @property
+    def hour(self):
+        """Fractional hour of day, e.g. 13.5 for 13:30."""
+        return self.now.hour + self.now.minute / 60
+
+    @property
+    def is_weekend(self):
+        return self.now.weekday() >= 5
+
+    def steps_for(self, duration):
+        """Number of ticks that cover `duration` (a timedelta)."""
+        return int(math.ceil(duration / self.step))
+
+    def advance(self):
+        self.now += self.step
+        return self.now
+
+    def workload_factor(self):
+        return self.weekend_workload_factor if self.is_weekend else 1.0
+
+    def seasonal_ambient_offset(self):
+        """Ambient temperature shift (°C) for the current day of the year."""
+        day_of_year = self.now.timetuple().tm_yday + self.hour / 24
+        return self.seasonal_amplitude_c * math.cos(2 * math.pi * (day_of_year - self.warmest_day_of_year) / 365.25)
@@ -1,15 +1,42 @@
-import random
 import math
 from datetime import datetime
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from simulation.clock import SimulationClock
+
 class StateRandomizer:
     """
     Applies a layer of dynamic, "natural" variation on top of a baseline
     data state to make the simulation feel alive and unpredictable.
+
+    All variation is drawn for the whole fleet at once from a seeded
+    `numpy.random.Generator`, so runs are reproducible. Ambient noise is
+    spatially correlated over the rack grid: white noise is smoothed by a
+    precomputed, truncated Gaussian kernel applied separably (rows, then
+    columns), a couple of strided reductions even for 100k racks.
+
+    Time comes from a SimulationClock, which can also add a weekend workload
+    dip and a seasonal ambient curve (the default clock leaves both off).
     """
-    def __init__(self):
-        self.simulation_hour = datetime.now().hour
-        print(f"StateRandomizer initialized. Starting at hour: {self.simulation_hour}.")
+    def __init__(self, seed=None, start_hour=None, grid_shape=None, correlation_length=3.0,
+                 spike_probability=0.02, clock=None):
+        self.rng = np.random.default_rng(seed)
+        if clock is None:
+            start = datetime.now().replace(minute=0, second=0, microsecond=0)
+            clock = SimulationClock(start if start_hour is None else start.replace(hour=start_hour))
+        self.clock = clock
+        self.grid_shape = grid_shape
+        self.correlation_length = correlation_length
+        self.spike_probability = spike_probability
+        self._taps = self._smoothing_kernel()
+        self._grids = {} # n_racks -> (rows, cols)
+        print(f"StateRandomizer initialized. Starting at: {self.clock.now:%Y-%m-%d %H:%M}.")
+
+    @property
+    def simulation_hour(self):
+        return self.clock.hour
 
     def _get_diurnal_multiplier(self, hour, peak_multiplier, trough_multiplier):
         """Creates a simple day/night cycle multiplier (e.g., 1.2 for day, 0.8 for night)."""
@@ -17,41 +44,84 @@ class StateRandomizer:
         multiplier_range = peak_multiplier - trough_multiplier
         return trough_multiplier + (1 + sine_wave) / 2 * multiplier_range
 
-    def apply_natural_variation(self, baseline_payloads):
+    def _smoothing_kernel(self):
+        """Gaussian taps truncated at 3 sigma, unit L2 norm (so the smoothed noise keeps unit variance)."""
+        sigma = max(self.correlation_length, 1e-6)
+        half = int(math.ceil(3 * sigma))
+        taps = np.exp(-0.5 * (np.arange(-half, half + 1) / sigma) ** 2)
+        return taps / np.linalg.norm(taps)
+
+    def _grid_for(self, n_racks):
+        if n_racks not in self._grids:
+            if self.grid_shape is not None and self.grid_shape[0] * self.grid_shape[1] >= n_racks:
+                self._grids[n_racks] = tuple(self.grid_shape)
+            else:
+                cols = math.ceil(math.sqrt(n_racks))
+                self._grids[n_racks] = (math.ceil(n_racks / cols), cols)
+        return self._grids[n_racks]
+
+    def correlated_noise(self, n_racks):
+        """Unit-variance noise for every rack, correlated between grid neighbours."""
+        rows, cols = self._grid_for(n_racks)
+        taps = self._taps
+        width = len(taps)
+        # White noise on a padded grid, so edge racks get the full kernel too
+        white = self.rng.standard_normal((rows + width - 1, cols + width - 1))
+
+        # Separable smoothing: a strided window view per axis, reduced against the taps
+        smoothed_rows = sliding_window_view(white, width, axis=0) @ taps
+        field = sliding_window_view(smoothed_rows, width, axis=1) @ taps
+        return field.ravel()[:n_racks]
+
+    def vary_arrays(self, workload, ambient):
         """
-        Takes a list of baseline payloads and returns a new list with
-        dynamic variations applied.
+        Array version of `apply_natural_variation`: takes the baseline
+        per-rack workload and ambient arrays and returns varied copies.
         """
+        workload = np.asarray(workload, dtype=np.float64)
+        ambient = np.asarray(ambient, dtype=np.float64)
+        n_racks = workload.shape[0]
+
         # Get the global multipliers for the current simulated hour
         workload_multiplier = self._get_diurnal_multiplier(self.simulation_hour, 1.2, 0.7) # 20% higher in day, 30% lower at night
         ambient_multiplier = self._get_diurnal_multiplier(self.simulation_hour, 1.1, 0.9)  # 10% temp swing
 
-        if 12 <= self.simulation_hour <= 13: # Lunchtime dip
-            workload_multiplier *= 0.8 
-
-        varied_payloads = []
-        for payload in baseline_payloads:
-            new_payload = payload.copy()
+        if 12 <= self.simulation_hour < 14: # Lunchtime dip
+            workload_multiplier *= 0.8
+        workload_multiplier *= self.clock.workload_factor() # Quieter weekends
 
-            # Apply multiplier and random noise to the baseline workload
-            base_workload = new_payload['server_workload_percent']
-            varied_workload = base_workload * workload_multiplier + random.uniform(-5, 5)
-            
-            # Add occasional random spikes for realism
-            if random.random() < 0.02:
-                varied_workload += random.uniform(15, 30)
+        # Apply multiplier and random noise to the baseline workload
+        varied_workload = workload * workload_multiplier + self.rng.uniform(-5, 5, n_racks)
 
-            # Apply multiplier and noise to ambient temperature
-            base_ambient = new_payload['ambient_temp_c']
-            varied_ambient = base_ambient * ambient_multiplier + random.uniform(-1, 1)
+        # Add occasional random spikes for realism (magnitudes drawn only for spiking racks)
+        spikes = np.flatnonzero(self.rng.random(n_racks) < self.spike_probability)
+        varied_workload[spikes] += self.rng.uniform(15, 30, spikes.size)
+        np.clip(varied_workload, 5, 100, out=varied_workload)
 
-            new_payload['server_workload_percent'] = max(5, min(100, varied_workload))
-            new_payload['ambient_temp_c'] = varied_ambient
-            
-            varied_payloads.append(new_payload)
+        # Apply multiplier and spatially correlated noise (same spread as uniform(-1, 1))
+        varied_ambient = ambient * ambient_multiplier + self.correlated_noise(n_racks) / math.sqrt(3)
+        varied_ambient += self.clock.seasonal_ambient_offset()
 
         # Advance the simulation time for the next cycle
-        self.simulation_hour = (self.simulation_hour + 1) % 24
-        
-        return varied_payloads
+        self.clock.advance()
+
+        return varied_workload, varied_ambient
+
+    def apply_natural_variation(self, baseline_payloads):
+        """
+        Takes a list of baseline payloads and returns a new list with
+        dynamic variations applied.
+        """
+        if not baseline_payloads:
+            self.clock.advance()
+            return []
+
+        count = len(baseline_payloads)
+        workload = np.fromiter((p['server_workload_percent'] for p in baseline_payloads), np.float64, count)
+        ambient = np.fromiter((p['ambient_temp_c'] for p in baseline_payloads), np.float64, count)
+        varied_workload, varied_ambient = self.vary_arrays(workload, ambient)
 
+        return [
+            dict(payload, server_workload_percent=w, ambient_temp_c=a)
+            for payload, w, a in zip(baseline_payloads, varied_workload.tolist(), varied_ambient.tolist())
+        ]
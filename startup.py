@@ -0,0 +1,88 @@
+"""
+Staged-startup helpers for the what-if console: a startup trace, a
+background loader that hands results back to the UI thread, and the
+last-known dashboard state that is shown before the twin is running.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+LAST_STATE_PATH = "data/last_known_state.json"
+STARTUP_TRACE_PATH = "logs/startup_trace.json"
+
+
+class StartupTrace:
+    """Records named startup milestones relative to process start."""
+
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        """Records the first occurrence of a milestone, in ms since t0."""
+        if name in self.marks:
+            return
+        self.marks[name] = (time.perf_counter() - self.t0) * 1000
+        print(f"STARTUP: {name} at {self.marks[name]:.0f} ms")
+
+    def save(self, path=STARTUP_TRACE_PATH):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({"milestones_ms": self.marks}, f, indent=2)
+        except OSError as e:
+            print(f"STARTUP: Could not write trace to {path}: {e}")
+
+
+class BackgroundLoader(QObject):
+    """
+    Runs named loading jobs in parallel worker threads. Results come back
+    through Qt signals, so the connected handlers run on the UI thread.
+    """
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, max_workers=2):
+        super().__init__()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+
+    def submit(self, name, func):
+        self._pool.submit(self._run, name, func)
+
+    def _run(self, name, func):
+        try:
+            result = func()
+        except BaseException as e: # DataIngestor calls exit() on a missing file
+            self.failed.emit(name, str(e) or type(e).__name__)
+            return
+        self.loaded.emit(name, result)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+def load_last_known_state(path=LAST_STATE_PATH):
+    """Returns the last persisted aggregated results, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"STARTUP: Ignoring unreadable last state ({e})")
+        return None
+
+
+def save_last_known_state(results, path=LAST_STATE_PATH):
+    """Persists the aggregated results so the next start can render them immediately."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        print(f"STARTUP: Could not save last state ({e})")
@@ -0,0 +1,197 @@
+"""
+Pipelined tick scheduler for the what-if console.
+
+Each tick is split in three: the controls are read on the UI thread, the
+simulation + ML step runs on a worker thread, and the resulting immutable
+snapshot is applied back on the UI thread. The worker runs one tick
+ahead: the next tick's compute is started before the current snapshot is
+painted, the interval stretches with the measured compute time, manual
+triggers are coalesced, and overruns and skipped frames are counted.
+"""
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class ControlSnapshot(NamedTuple):
+    """What-if controls, read on the UI thread when a tick starts (None = no override)."""
+    ambient_override: Optional[float]
+    workload_override: Optional[float]
+    inlet_override: Optional[float]
+    closed_loop: bool
+    profile: str
+
+    @property
+    def any_override(self):
+        return any(v is not None for v in (self.ambient_override, self.workload_override, self.inlet_override))
+
+
+class TickSnapshot(NamedTuple):
+    """Everything one tick produced. Built on the worker, never mutated after publishing."""
+    step: int
+    controls: ControlSnapshot
+    results: Any # read-only mapping of the aggregated results
+    forecasts: Any
+    ambient_temp: float
+    sim_time: float = 0.0 # Simulation clock at this tick (Unix seconds)
+    anomaly: int = 0
+    rack_anomalies: tuple = ((), ())
+    critical_racks: tuple = ((), ())
+    closed_loop_suggestion: Optional[dict] = None
+    new_model_version: Optional[str] = None
+    compute_ms: float = 0.0
+
+
+class TickScheduler(QObject):
+    """
+    Drives `compute(controls) -> TickSnapshot` on a single worker thread,
+    one tick ahead of the UI.
+
+    - A snapshot is published every `interval_ms`, which adapts to
+      `headroom` x the smoothed compute time (never below `base_interval_ms`).
+      Publishing first starts the next compute, then emits the snapshot, so
+      compute N+1 runs while the UI paints tick N.
+    - `request()` asks for an immediate tick, published as soon as it is
+      computed; requests arriving while a tick is computing collapse into
+      one follow-up tick.
+    - A computed snapshot that a newer one replaces before it was
+      published (a manual request, or a follow-up tick) is a skipped frame.
+    """
+    snapshot_ready = pyqtSignal(object)
+    stats_changed = pyqtSignal(dict)
+    _computed = pyqtSignal()
+
+    def __init__(self, read_controls, compute, base_interval_ms=1500, max_interval_ms=10000,
+                 headroom=1.5, smoothing=0.2):
+        super().__init__()
+        self.read_controls = read_controls
+        self.compute = compute
+        self.base_interval_ms = base_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.interval_ms = base_interval_ms
+
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick")
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_due)
+        self._computed.connect(self._on_computed) # Queued: emitted from the worker
+
+        self._running = False
+        self._busy = False
+        self._pending = False
+        self._publish_on_arrival = False # The tick in flight is already due (manual request or overrun)
+        self._tick_started = 0.0
+        self._latest = None # Written by the worker, read on the UI thread
+        self._ready = None # Computed, waiting for its publish time
+        self._applied_step = 0
+
+        self.stats = {
+            "ticks": 0, "overruns": 0, "skipped_frames": 0, "late_ticks": 0, "coalesced_requests": 0,
+            "compute_ms": 0.0, "avg_compute_ms": 0.0, "interval_ms": float(base_interval_ms),
+        }
+
+    def start(self):
+        self._running = True
+        self._start_tick(publish_on_arrival=True)
+
+    def stop(self):
+        """Stops scheduling and waits for an in-flight compute to finish."""
+        self._running = False
+        self._timer.stop()
+        self._pool.shutdown(wait=True)
+
+    def request(self):
+        """Asks for a tick as soon as possible (manual triggers, slider moves)."""
+        if not self._running:
+            return
+        if self._busy:
+            if self._pending:
+                self.stats["coalesced_requests"] += 1
+            self._pending = True
+            return
+        self._timer.stop()
+        self._skip_ready() # Computed with the old controls
+        self._start_tick(publish_on_arrival=True)
+
+    def _on_due(self):
+        if self._ready is not None:
+            self._publish()
+        elif self._busy: # The prefetched tick overran its interval
+            if not self._publish_on_arrival:
+                self.stats["late_ticks"] += 1
+            self._publish_on_arrival = True
+        elif self._running: # The last compute failed
+            self._start_tick(publish_on_arrival=True)
+
+    def _start_tick(self, publish_on_arrival=False):
+        self._busy = True
+        self._publish_on_arrival = publish_on_arrival
+        self._tick_started = time.perf_counter()
+        controls = self.read_controls()
+        self._pool.submit(self._run, controls)
+
+    def _run(self, controls):
+        try:
+            snapshot = self.compute(controls)
+        except Exception:
+            print(f"TICK: Simulation step failed:\n{traceback.format_exc()}")
+            snapshot = None
+        self._latest = snapshot
+        self._computed.emit()
+
+    def _on_computed(self):
+        self._busy = False
+        compute_ms = (time.perf_counter() - self._tick_started) * 1000
+        self._update_stats(compute_ms)
+        snapshot, self._latest = self._latest, None
+        if not self._running:
+            return
+
+        if snapshot is not None and snapshot.step > self._applied_step:
+            self._skip_ready()
+            self._ready = snapshot
+        if self._pending: # Coalesced manual requests: recompute with the current controls
+            self._pending = False
+            self._skip_ready()
+            self._start_tick(publish_on_arrival=True)
+        elif self._publish_on_arrival:
+            if self._ready is not None:
+                self._publish()
+            else: # Failed: retry on the next due time
+                self._timer.start(int(self.interval_ms))
+        elif not self._timer.isActive():
+            self._timer.start(int(self.interval_ms))
+
+    def _skip_ready(self):
+        if self._ready is not None:
+            self.stats["skipped_frames"] += 1
+            self._ready = None
+
+    def _publish(self):
+        """Starts the next compute, then hands the ready snapshot to the UI."""
+        snapshot, self._ready = self._ready, None
+        self._publish_on_arrival = False
+        if self._running and not self._busy:
+            self._start_tick() # Pipeline: compute N+1 overlaps painting N
+        self._timer.start(int(self.interval_ms))
+        self._applied_step = snapshot.step
+        self.snapshot_ready.emit(snapshot)
+        self.stats_changed.emit(dict(self.stats))
+
+    def _update_stats(self, compute_ms):
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["compute_ms"] = compute_ms
+        if compute_ms > self.interval_ms:
+            stats["overruns"] += 1
+        avg = stats["avg_compute_ms"]
+        stats["avg_compute_ms"] = compute_ms if stats["ticks"] == 1 else avg + self.smoothing * (compute_ms - avg)
+
+        # Adaptive interval: keep `headroom` over the typical compute time
+        self.interval_ms = min(self.max_interval_ms, max(self.base_interval_ms, stats["avg_compute_ms"] * self.headroom))
+        stats["interval_ms"] = self.interval_ms
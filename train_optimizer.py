@@ -1,8 +1,12 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import argparse
 import joblib
+import json
+import time
 import sys
 import os
 
@@ -13,65 +17,156 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 # Now we can import our core physics
-from twin.digital_twin_engine import compute_results
-
-print("Starting optimizer training script...")
-
-# 1. Generate a large synthetic dataset
-NUM_SAMPLES = 50000
-print(f"Generating {NUM_SAMPLES} data samples...")
-
-data = {
-    'ambient_temp_c': np.random.uniform(10, 45, NUM_SAMPLES),
-    'inlet_temp_c': np.random.uniform(15, 30, NUM_SAMPLES),
-    'server_workload_percent': np.random.uniform(0, 100, NUM_SAMPLES)
-}
-df = pd.DataFrame(data)
-
-# 2. Run the Digital Twin physics for each sample
-print("Running physics simulation for all samples...")
-results = []
-for _, row in df.iterrows():
-    # We pass the row as the 'payload' for the compute function
-    sim_result = compute_results(row.to_dict())
-    
-    cost_per_day = (sim_result['calculated_server_power_watts'] + sim_result['cooling_unit_power_watts']) / 1000 * 0.12 * 24
-    
-    results.append({
-        'cost_per_day': cost_per_day,
-        'compute_output': sim_result['compute_output']
-    })
-
-results_df = pd.DataFrame(results)
-df = pd.concat([df, results_df], axis=1)
-
-# 3. Define our features (X) and targets (y)
-features = ['ambient_temp_c', 'inlet_temp_c', 'server_workload_percent']
-X = df[features]
-y_cost = df['cost_per_day']
-y_compute = df['compute_output']
-
-print("Data generation complete. Training models...")
-
-# 4. Train the Cost Prediction Model
-cost_model = RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=-1, max_depth=10)
-cost_model.fit(X, y_cost)
-print("Cost model trained.")
-
-# 5. Train the Compute Prediction Model
-compute_model = RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=-1, max_depth=10)
-compute_model.fit(X, y_compute)
-print("Compute model trained.")
-
-# 6. Save models to disk
-model_dir = "models"
-os.makedirs(model_dir, exist_ok=True)
-
-cost_model_path = os.path.join(model_dir, "optimizer_cost.joblib")
-compute_model_path = os.path.join(model_dir, "optimizer_compute.joblib")
-
-joblib.dump(cost_model, cost_model_path)
-joblib.dump(compute_model, compute_model_path)
-
-print(f"Models saved successfully to '{model_dir}' directory.")
-print("Optimizer training complete.")
\ No newline at end of file
+from twin.digital_twin_engine import compute_results_batch, physics_fingerprint
+from ml.flat_forest import export_forest, flat_path_for
+from ml.registry import ModelRegistry
+from ml.optimizer import daily_cost_usd
+
+FEATURES = ['ambient_temp_c', 'inlet_temp_c', 'server_workload_percent']
+MODEL_DIR = "models"
+
+
+class StageTimer:
+    """Records wall time per training stage for the timing report."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        print(f"[{name}] ...")
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+        print(f"[{name}] done in {self.timings[name]:.2f}s")
+
+
+def generate_samples(num_samples, chunk_size, seed):
+    """
+    Streams the synthetic dataset in chunks: each chunk is sampled and run
+    through the vectorized twin physics, then written into preallocated
+    arrays, so peak memory stays at the final arrays even for 10M samples.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.empty((num_samples, len(FEATURES)), dtype=np.float32) # sklearn trains on float32
+    y_cost = np.empty(num_samples, dtype=np.float64)
+    y_compute = np.empty(num_samples, dtype=np.float64)
+
+    for start in range(0, num_samples, chunk_size):
+        size = min(chunk_size, num_samples - start)
+        ambient = rng.uniform(10, 45, size)
+        inlet = rng.uniform(15, 30, size)
+        workload = rng.uniform(0, 100, size)
+
+        results = compute_results_batch(inlet, workload, ambient)
+
+        X[start:start + size, 0] = ambient
+        X[start:start + size, 1] = inlet
+        X[start:start + size, 2] = workload
+        y_cost[start:start + size] = daily_cost_usd(results)
+        y_compute[start:start + size] = results['compute_output']
+
+    return X, y_cost, y_compute
+
+
+def train_model(X, y, n_estimators, max_depth, seed):
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=seed, n_jobs=-1, max_depth=max_depth)
+    model.fit(X, y)
+    return model
+
+
+def holdout_metrics(model, X, y):
+    """MAE and R^2 of a (flat) model on held-out samples."""
+    pred = model.predict(X)
+    residual = y - pred
+    return {
+        "mae": float(np.abs(residual).mean()),
+        "r2": float(1.0 - (residual ** 2).sum() / ((y - y.mean()) ** 2).sum()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the AI co-pilot optimizer surrogates.")
+    parser.add_argument("--samples", type=int, default=50000, help="Number of synthetic samples (e.g. 10000000).")
+    parser.add_argument("--chunk-size", type=int, default=1000000, help="Samples generated per physics batch.")
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--holdout", type=int, default=10000, help="Fresh samples used for the registry metrics.")
+    parser.add_argument("--no-activate", action="store_true", help="Publish without switching the console to the new version.")
+    args = parser.parse_args(argv)
+
+    print("Starting optimizer training script...")
+    timer = StageTimer()
+    total_start = time.perf_counter()
+
+    # 1. Generate the synthetic dataset and run the twin physics, chunk by chunk
+    with timer.stage("generate_and_simulate"):
+        X, y_cost, y_compute = generate_samples(args.samples, args.chunk_size, args.seed)
+        X = pd.DataFrame(X, columns=FEATURES, copy=False) # Keep feature names on the models
+    print(f"Generated {args.samples} data samples.")
+
+    # 2. Train the Cost and Compute models concurrently
+    with timer.stage("train_models"):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            cost_future = pool.submit(train_model, X, y_cost, args.n_estimators, args.max_depth, args.seed)
+            compute_future = pool.submit(train_model, X, y_compute, args.n_estimators, args.max_depth, args.seed)
+            cost_model = cost_future.result()
+            compute_model = compute_future.result()
+    print("Cost and compute models trained.")
+
+    # 3. Save models to disk, plus flattened, memory-mappable copies
+    with timer.stage("save_models"):
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        cost_model_path = os.path.join(MODEL_DIR, "optimizer_cost.joblib")
+        compute_model_path = os.path.join(MODEL_DIR, "optimizer_compute.joblib")
+
+        joblib.dump(cost_model, cost_model_path)
+        joblib.dump(compute_model, compute_model_path)
+        flat_cost = export_forest(cost_model, flat_path_for(cost_model_path))
+        flat_compute = export_forest(compute_model, flat_path_for(compute_model_path))
+    print(f"Models saved successfully to '{MODEL_DIR}' directory.")
+
+    # 4. Evaluate on fresh samples and publish a new registry version
+    with timer.stage("publish"):
+        X_val, y_cost_val, y_compute_val = generate_samples(args.holdout, args.chunk_size, args.seed + 1)
+        metadata = {
+            "physics_fingerprint": physics_fingerprint(),
+            "features": FEATURES,
+            "samples": args.samples,
+            "n_estimators": args.n_estimators,
+            "max_depth": args.max_depth,
+            "seed": args.seed,
+            "metrics": {
+                "cost": holdout_metrics(flat_cost, X_val, y_cost_val),
+                "compute": holdout_metrics(flat_compute, X_val, y_compute_val),
+            },
+        }
+        version = ModelRegistry("optimizer").publish(
+            {"cost": flat_cost, "compute": flat_compute}, metadata, activate=not args.no_activate
+        )
+    print(f"Published optimizer models as {version}: {metadata['metrics']}")
+
+    # 5. Timing breakdown per stage
+    timings = dict(timer.timings, total=time.perf_counter() - total_start)
+    report = {
+        "samples": args.samples,
+        "chunk_size": args.chunk_size,
+        "n_estimators": args.n_estimators,
+        "max_depth": args.max_depth,
+        "physics_fingerprint": physics_fingerprint(),
+        "registry_version": version,
+        "timings_s": timings,
+    }
+    timings_path = os.path.join(MODEL_DIR, "training_timings.json")
+    with open(timings_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Timing breakdown:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<24}{seconds:8.2f}s")
+    print(f"Optimizer training complete. Timings written to '{timings_path}'.")
+
+
+if __name__ == "__main__":
+    main()
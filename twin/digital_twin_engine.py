@@ -1,5 +1,8 @@
 import random
+import json
+import hashlib
 from typing import Dict, Any
+import numpy as np
 
 class DataCenterTwin:
     """The core physics engine, now with a realistic cooling feedback loop."""
@@ -20,6 +23,11 @@ class DataCenterTwin:
         # This simulates the air not getting cold enough if the system is overwhelmed.
         self.COOLING_DEFICIT_TEMP_FACTOR = 0.005 # e.g., a 100W deficit raises inlet temp by 0.5°C
 
+    def physics_fingerprint(self) -> str:
+        """Short hash of the physics constants, used to invalidate derived artifacts."""
+        constants = json.dumps(vars(self), sort_keys=True)
+        return hashlib.sha1(constants.encode("utf-8")).hexdigest()[:12]
+
     def _get_cooling_strategy(self, temp_deviation, pue):
         if temp_deviation > 2.0: return "[bold red]CRITICAL: Boost All Cooling[/bold red]"
         elif temp_deviation > 0.5: return "[bold yellow]WARNING: Increase Cooling[/bold yellow]"
@@ -80,7 +88,55 @@ class DataCenterTwin:
             "calculated_pue": pue, "compute_output": final_compute_output
         }
 
+    def compute_results_batch(self, inlet_temp_c, server_workload_percent, ambient_temp_c) -> Dict[str, np.ndarray]:
+        """
+        Vectorized version of compute_results over broadcastable arrays.
+        Mirrors the scalar physics exactly (minus the strategy strings), so a
+        whole candidate batch or training set is evaluated in one pass.
+        """
+        # Same defaults as the scalar path, where a 0/None value falls back via `or`
+        target_inlet_temp_c = np.asarray(inlet_temp_c, dtype=np.float64)
+        target_inlet_temp_c = np.where(target_inlet_temp_c == 0, 22.0, target_inlet_temp_c)
+        server_workload_percent = np.asarray(server_workload_percent, dtype=np.float64)
+        ambient_temp_c = np.asarray(ambient_temp_c, dtype=np.float64)
+        ambient_temp_c = np.where(ambient_temp_c == 0, 25.0, ambient_temp_c)
+
+        server_power_watts = self.SERVER_IDLE_POWER_WATTS + \
+                             (server_workload_percent / 100) * (self.SERVER_MAX_POWER_WATTS - self.SERVER_IDLE_POWER_WATTS)
+
+        ambient_excess = np.maximum(0, ambient_temp_c - self.IDEAL_AMBIENT_TEMP_C)
+        cooling_unit_power_watts = (
+            self.COOLING_BASE_POWER_WATTS +
+            (server_power_watts * self.COOLING_EFFICIENCY_FACTOR) +
+            ambient_excess * self.AMBIENT_TEMP_IMPACT_FACTOR +
+            np.maximum(0, self.IDEAL_INLET_TEMP_C - target_inlet_temp_c) * self.INLET_TEMP_IMPACT_FACTOR
+        )
+
+        actual_inlet_temp_c = target_inlet_temp_c + ambient_excess * 0.1 + \
+                              (server_power_watts / self.SERVER_MAX_POWER_WATTS) * 0.5
+        outlet_temp_c = actual_inlet_temp_c + (server_power_watts * self.HEAT_DISSIPATION_FACTOR)
+
+        total_power_watts = server_power_watts + cooling_unit_power_watts
+        pue = total_power_watts / server_power_watts
+
+        throttling_penalty = np.clip((outlet_temp_c - 38.0) * 0.10, 0.0, 1.0)
+        compute_output = (server_workload_percent / 100) * 10000 * (1 - throttling_penalty)
+
+        return {
+            "outlet_temp_c": outlet_temp_c, "temp_deviation_c": outlet_temp_c - self.TARGET_OUTLET_TEMP_C,
+            "calculated_server_power_watts": server_power_watts, "cooling_unit_power_watts": cooling_unit_power_watts,
+            "calculated_pue": pue, "compute_output": compute_output
+        }
+
 _twin_engine_instance = DataCenterTwin()
 def compute_results(payload: Dict[str, Any]) -> Dict[str, Any]:
     return _twin_engine_instance.compute_results(payload)
 
+def compute_results_batch(inlet_temp_c, server_workload_percent, ambient_temp_c) -> Dict[str, np.ndarray]:
+    return _twin_engine_instance.compute_results_batch(inlet_temp_c, server_workload_percent, ambient_temp_c)
+
+def physics_fingerprint() -> str:
+    return _twin_engine_instance.physics_fingerprint()
+
+def cost_per_kwh_usd() -> float:
+    return _twin_engine_instance.COST_PER_KWH_USD
@@ -2,152 +2,279 @@
 Custom dashboard widgets for the datacenter digital twin UI.
 Includes charts, gauges, and enhanced visualizations.
 """
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame
-from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer, QObject, pyqtSignal, QThread, pyqtSlot
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QListView, QStyledItemDelegate
+from PyQt5.QtCore import (Qt, QPointF, QRectF, QTimer, QObject, pyqtSignal, QThread, pyqtSlot, QCoreApplication,
+                          QAbstractListModel, QModelIndex, QSize, QRect)
 from PyQt5.QtGui import (QPainter, QColor, QPen, QBrush, QFont, QPainterPath, 
-                         QLinearGradient, QPixmap, QImage, QRadialGradient) 
+                         QLinearGradient, QImage, QRadialGradient, QTransform, QFontMetrics)
 from collections import deque
+from typing import Any, NamedTuple
 import math
-import copy # <-- Import copy for deepcopy
-
-# --- Helper function for color interpolation ---
-def interpolate_color(color1, color2, ratio):
-    """Interpolates between two QColors."""
-    if not isinstance(color1, QColor) or not isinstance(color2, QColor):
-        return QColor(0,0,0) # Return black on error
-    r = int(color1.red() * (1 - ratio) + color2.red() * ratio)
-    g = int(color1.green() * (1 - ratio) + color2.green() * ratio)
-    b = int(color1.blue() * (1 - ratio) + color2.blue() * ratio)
-    a = int(color1.alpha() * (1 - ratio) + color2.alpha() * ratio)
-    return QColor(r, g, b, a)
+import threading
+import time
+
+import numpy as np
+
+from alert_engine import Alert
+from ml.history import RingBuffer
+from ui.decimation import lttb
+from ui.layers import LayerCache
+from ui.heatmap_raster import HeatmapRasterizer, pixels_to_qimage
+
+# --- FIX (COLOR MAP): Adjusted thresholds for better shallow color perception ---
+HEATMAP_COLOR_STOPS = [
+    (20.0, QColor(0, 0, 139, 255)),    # Dark Blue (cool)
+    (27.0, QColor(0, 128, 0, 255)),    # Green (starts 1 degree earlier)
+    (32.0, QColor(255, 255, 0, 255)),  # Yellow (starts 1 degree earlier)
+    (36.0, QColor(255, 165, 0, 255)),  # Orange (starts 1 degree earlier)
+    (39.0, QColor(255, 0, 0, 255)),    # Red (starts 1 degree earlier)
+    (45.0, QColor(139, 0, 0, 255))     # Dark Red (hot)
+]
+# --- End of Color Fix ---
 
 # --- Worker thread for generating the heatmap ---
+class RenderRequest(NamedTuple):
+    """One heatmap frame to render, posted from the UI thread."""
+    frame: int
+    temps: Any # float32 array, never mutated after posting
+    shape: tuple # (rows, cols) of the rack grid
+    viewport: tuple # (x0, y0, x1, y1) in rack cells
+    statistic: str # Pyramid statistic for zoomed-out levels
+    width: int
+    height: int
+    posted_at: float
+
+
 class HeatmapWorker(QObject):
-    """Runs the slow heatmap generation in a background thread."""
-    finished = pyqtSignal(QPixmap)
+    """
+    Rasterizes the heatmap in a background thread (see ui/heatmap_raster.py).
 
-    def __init__(self, rows, cols, get_color_func, img_width, img_height):
+    The UI thread `post()`s render requests into a single slot; a newer post
+    overwrites one the worker has not picked up yet, so a busy worker always
+    renders the newest grid next and never works through a backlog. Emits
+    the raw pixel array; it is wrapped as a QImage on the UI thread.
+    """
+    finished = pyqtSignal(object, object, float) # request, pixels, render ms
+
+    def __init__(self, rows, cols, color_map):
         super().__init__()
-        self.rows = rows
-        self.cols = cols
-        self.get_color_for_temp = get_color_func
-        self.img_width = img_width
-        self.img_height = img_height
-        self.is_busy = False
-
-    # --- NEW: Function to pre-smooth the data ---
-    def _create_smoothed_grid(self, temp_grid):
-        """Averages each rack with its neighbors to create smooth zones."""
-        smoothed_grid = copy.deepcopy(temp_grid) # Start with a copy
-        
-        for r in range(self.rows):
-            for c in range(self.cols):
-                total_temp = 0
-                count = 0
-                
-                # Loop through 3x3 neighbors
-                for dr in [-1, 0, 1]:
-                    for dc in [-1, 0, 1]:
-                        nr, nc = r + dr, c + dc
-                        # Check if neighbor is valid
-                        if 0 <= nr < self.rows and 0 <= nc < self.cols:
-                            total_temp += temp_grid[nr][nc]
-                            count += 1
-                
-                # Set the new smoothed temperature
-                if count > 0:
-                    smoothed_grid[r][c] = total_temp / count
-                    
-        return smoothed_grid
-
-    @pyqtSlot(list)
-    def generate_map(self, temps):
-        """Generates the heatmap pixmap."""
-        if self.is_busy:
+        self.rasterizer = HeatmapRasterizer(rows, cols, color_map)
+        self._lock = threading.Lock()
+        self._slot = None
+
+    def post(self, request):
+        """Called on the UI thread. Returns True if it replaced a request that was never rendered."""
+        with self._lock:
+            dropped = self._slot is not None
+            self._slot = request
+        return dropped
+
+    @pyqtSlot()
+    def render_latest(self):
+        """Renders whatever request is newest (wake-ups with an empty slot are no-ops)."""
+        with self._lock:
+            request, self._slot = self._slot, None
+        if request is None:
             return
-        self.is_busy = True
+        start = time.perf_counter()
+        pixels = self.rasterizer.render_pixels(request.temps, request.width, request.height, shape=request.shape,
+                                               viewport=request.viewport, statistic=request.statistic)
+        if pixels is not None:
+            self.finished.emit(request, pixels, (time.perf_counter() - start) * 1000)
+
+
+class HeatmapRenderService(QObject):
+    """
+    One render pipeline shared by every heatmap view of the same rack grid.
+
+    Each dataset (frame) is rendered once, on one worker thread, at the size
+    of the largest visible view, and the image is fanned out to all visible
+    views. Hidden views (e.g. on another tab) are skipped; when one is shown
+    it gets the cached frame, re-rendered only if it needs a larger image.
+
+    Requests are coalesced latest-wins and the worker is woken at most
+    `max_fps` times a second. A finished render more than one frame behind
+    the newest data is discarded (the newer frame is already on its way).
+
+    The service also owns the viewport (pan/zoom, in rack cells), shared by
+    its views. The grid grows automatically to fit more racks; zoomed-out
+    levels show each block's `statistic` ("max" keeps single hot racks visible).
+    """
+    MIN_VIEW_CELLS = 3 # Deepest zoom: about 3 racks across
+    wake_worker = pyqtSignal()
+    stats_changed = pyqtSignal(dict)
+
+    def __init__(self, rows=20, cols=35, color_map=HEATMAP_COLOR_STOPS, max_fps=30, smoothing=0.2,
+                 statistic="max", parent=None):
+        super().__init__(parent)
+        self.rows, self.cols = rows, cols
+        self.statistic = statistic
+        self.viewport = (0.0, 0.0, float(cols), float(rows))
+        self.views = []
+        self.temps = [25.0] * (rows * cols)
+        self.workloads = [50.0] * (rows * cols)
+        self._grid = np.asarray(self.temps, dtype=np.float32)
+        self.frame = 0
+        self.image = QImage() # Cached image of the latest rendered frame
+        self.image_frame = -1
+        self.image_viewport = self.viewport
+        self._requested = None # (frame, viewport, width, height) of the last request
 
-        if not temps:
-            self.is_busy = False
+        self.min_interval = 1.0 / max_fps
+        self.smoothing = smoothing
+        self._last_wake = 0.0
+        self._wake_timer = QTimer(self)
+        self._wake_timer.setSingleShot(True)
+        self._wake_timer.timeout.connect(self._wake)
+        self.stats = {
+            "rendered": 0, "dropped_frames": 0, "stale_frames": 0,
+            "render_ms": 0.0, "latency_ms": 0.0, "avg_latency_ms": 0.0,
+        }
+
+        self.thread = QThread()
+        self.worker = HeatmapWorker(rows, cols, color_map)
+        self.worker.moveToThread(self.thread)
+        self.worker.finished.connect(self._on_rendered)
+        self.wake_worker.connect(self.worker.render_latest)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.start()
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+        print("Heatmap render service started.")
+
+    def shutdown(self):
+        self._wake_timer.stop()
+        if self.thread.isRunning():
+            self.thread.quit()
+            self.thread.wait()
+
+    def add_view(self, view):
+        self.views.append(view)
+
+    def set_grid_shape(self, rows, cols):
+        """Changes the rack layout (racks fill it row by row) and resets the view."""
+        self.rows, self.cols = rows, cols
+        self.viewport = (0.0, 0.0, float(cols), float(rows))
+        for view in self.views:
+            view.update()
+
+    def update_data(self, temps, workloads=None):
+        """New dataset for every view: rendered once, if any view is visible."""
+        self.temps = list(temps) if temps else [25.0] * (self.rows * self.cols)
+        if workloads:
+            self.workloads = workloads
+        if len(self.temps) > self.rows * self.cols:
+            # More racks than the layout holds: grow it, keeping its aspect ratio
+            cols = math.ceil(math.sqrt(len(self.temps) * self.cols / self.rows))
+            self.set_grid_shape(math.ceil(len(self.temps) / cols), cols)
+        self._grid = np.asarray(self.temps, dtype=np.float32) # The only copy the worker sees
+        self.frame += 1
+        for view in self.views:
+            view.set_rack_data(self.temps, self.workloads)
+        self.request()
+
+    def _target_size(self):
+        """Largest device-pixel size among the visible views, or None if none is visible."""
+        sizes = [view.device_size() for view in self.views if view.isVisible()]
+        if not sizes:
+            return None
+        return max(w for w, _ in sizes), max(h for _, h in sizes)
+
+    def request(self):
+        """Hands visible views the cached frame, rendering it first if it is stale or too small."""
+        size = self._target_size()
+        if size is None:
+            return
+        width, height = size
+        cached_ok = (self.image_frame == self.frame and self.image_viewport == self.viewport
+                     and self.image.width() >= width and self.image.height() >= height)
+        if cached_ok:
+            self._deliver()
             return
+        key = (self.frame, self.viewport, width, height)
+        if key != self._requested:
+            self._requested = key
+            self._post(RenderRequest(self.frame, self._grid, (self.rows, self.cols), self.viewport, self.statistic,
+                                     width, height, time.perf_counter()))
 
-        # Create a 2D grid of temperatures
-        temp_grid = []
-        idx = 0
-        for r in range(self.rows):
-            row_data = []
-            for c in range(self.cols):
-                if idx < len(temps):
-                    row_data.append(temps[idx])
-                    idx += 1
-                else:
-                    row_data.append(25.0) 
-            temp_grid.append(row_data)
-
-        # --- FIX: Run the smoothing pass FIRST ---
-        smoothed_temp_grid = self._create_smoothed_grid(temp_grid)
-
-        # Create a QImage for pixel-by-pixel drawing
-        img = QImage(self.img_width, self.img_height, QImage.Format_ARGB32)
-        img.fill(QColor("#1A1A2E")) 
-
-        # Calculate cell dimensions
-        cell_width = self.img_width / (self.cols - 1) if self.cols > 1 else 0
-        cell_height = self.img_height / (self.rows - 1) if self.rows > 1 else 0
-        
-        if cell_width == 0 or cell_height == 0:
-            self.is_busy = False
-            return 
-
-        # Iterate over each pixel in the QImage
-        for y_pixel in range(self.img_height):
-            for x_pixel in range(self.img_width):
-                
-                # --- FIX (GLITCH): Corrected range mapping math ---
-                grid_x = x_pixel * (self.cols - 1) / (self.img_width - 1)
-                grid_y = y_pixel * (self.rows - 1) / (self.img_height - 1)
+    def _post(self, request):
+        if self.worker.post(request):
+            self.stats["dropped_frames"] += 1
+        if not self._wake_timer.isActive():
+            # Frame-rate cap: wake now, or once the minimum interval has passed
+            wait = self._last_wake + self.min_interval - time.perf_counter()
+            self._wake_timer.start(max(0, int(wait * 1000)))
 
-                x0 = int(grid_x)
-                y0 = int(grid_y)
-                
-                # Clamp to avoid edge cases
-                x0 = max(0, min(self.cols - 2, x0))
-                y0 = max(0, min(self.rows - 2, y0))
-                
-                x1 = x0 + 1
-                y1 = y0 + 1
+    def _wake(self):
+        self._last_wake = time.perf_counter()
+        self.wake_worker.emit()
 
-                fx = grid_x - x0
-                fy = grid_y - y0
-                # --- End of Glitch Fix ---
-                
-                try:
-                    # --- Use the SMOOTHED grid for interpolation ---
-                    temp00 = smoothed_temp_grid[y0][x0]
-                    temp10 = smoothed_temp_grid[y0][x1]
-                    temp01 = smoothed_temp_grid[y1][x0]
-                    temp11 = smoothed_temp_grid[y1][x1]
-                except IndexError:
-                    continue 
-
-                color00 = self.get_color_for_temp(temp00)
-                color10 = self.get_color_for_temp(temp10)
-                color01 = self.get_color_for_temp(temp01)
-                color11 = self.get_color_for_temp(temp11)
-
-                color_top = interpolate_color(color00, color10, fx)
-                color_bottom = interpolate_color(color01, color11, fx)
-                
-                final_color = interpolate_color(color_top, color_bottom, fy)
+    @pyqtSlot(object, object, float)
+    def _on_rendered(self, request, pixels, render_ms):
+        if self.frame - request.frame > 1 or request.frame < self.image_frame:
+            self.stats["stale_frames"] += 1
+            self.request() # Make sure the newest frame is on its way
+            return
+        self.image = pixels_to_qimage(pixels)
+        self.image_frame = request.frame
+        self.image_viewport = request.viewport
+        self._deliver()
+        self._update_stats(render_ms, (time.perf_counter() - request.posted_at) * 1000)
+
+    def _deliver(self):
+        for view in self.views:
+            if view.isVisible():
+                view.set_image(self.image)
 
-                img.setPixelColor(x_pixel, y_pixel, final_color)
+    # --- Pan / zoom (coordinates in rack cells) ---
+    def set_viewport(self, x0, y0, x1, y1):
+        """Clamps the view to the grid (and to the deepest zoom) and re-renders."""
+        width, height = x1 - x0, y1 - y0
+        # Deepest zoom: grow both sides alike so cells keep their shape
+        grow = max(min(self.MIN_VIEW_CELLS, self.cols) / width, min(self.MIN_VIEW_CELLS, self.rows) / height, 1.0)
+        center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+        width, height = min(width * grow, self.cols), min(height * grow, self.rows)
+        x0, y0 = center_x - width / 2, center_y - height / 2
+        x0 = min(max(x0, 0.0), self.cols - width)
+        y0 = min(max(y0, 0.0), self.rows - height)
+        viewport = (x0, y0, x0 + width, y0 + height)
+        if viewport != self.viewport:
+            self.viewport = viewport
+            for view in self.views:
+                view.update() # Views redraw the cached image at the new transform straight away
+            self.request()
 
-        self.is_busy = False
-        self.finished.emit(QPixmap.fromImage(img))
+    def zoom(self, factor, anchor_x, anchor_y):
+        """Zooms by `factor` (>1 zooms in), keeping the cell under (anchor_x, anchor_y) in place."""
+        x0, y0, x1, y1 = self.viewport
+        self.set_viewport(anchor_x - (anchor_x - x0) / factor, anchor_y - (anchor_y - y0) / factor,
+                          anchor_x + (x1 - anchor_x) / factor, anchor_y + (y1 - anchor_y) / factor)
+
+    def pan(self, dx, dy):
+        x0, y0, x1, y1 = self.viewport
+        self.set_viewport(x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+
+    def reset_view(self):
+        self.set_viewport(0.0, 0.0, float(self.cols), float(self.rows))
+
+    def _update_stats(self, render_ms, latency_ms):
+        stats = self.stats
+        stats["rendered"] += 1
+        stats["render_ms"] = render_ms
+        stats["latency_ms"] = latency_ms
+        avg = stats["avg_latency_ms"]
+        stats["avg_latency_ms"] = latency_ms if stats["rendered"] == 1 else avg + self.smoothing * (latency_ms - avg)
+        self.stats_changed.emit(dict(stats))
 
 
 class MetricGauge(QWidget):
-    """Circular gauge widget for displaying metrics like PUE."""
+    """
+    Circular gauge widget for displaying metrics like PUE.
+    Title, background arc and icon are a cached layer; only the value arc
+    and value text are painted per frame.
+    """
     
     def __init__(self, title="Metric", min_val=0, max_val=100, unit="", 
                  good_threshold=None, warning_threshold=None, reverse_colors=False):
@@ -160,21 +287,23 @@ class MetricGauge(QWidget):
         self.good_threshold = good_threshold
         self.warning_threshold = warning_threshold
         self.reverse_colors = reverse_colors
+        self._layers = LayerCache(self)
         self.setMinimumSize(160, 200)
         self.setMaximumSize(220, 240)
         
     def set_value(self, value):
-        self.current_value = max(self.min_val, min(self.max_val, value))
-        self.update()
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
+        value = max(self.min_val, min(self.max_val, value))
+        if value != self.current_value:
+            self.current_value = value
+            self.update()
+
+    def _geometry(self):
         rect = self.rect()
-        center_x = rect.width() / 2
-        center_y = rect.height() / 2 - 25
-        radius = min(rect.width(), rect.height()) / 2 - 40
+        return rect, rect.width() / 2, rect.height() / 2 - 25, min(rect.width(), rect.height()) / 2 - 40
+
+    def _draw_static(self, painter):
+        """Title, background arc and icon."""
+        rect, center_x, center_y, radius = self._geometry()
         
         # Draw title above gauge
         painter.setPen(QColor("#95A5A6"))
@@ -188,34 +317,6 @@ class MetricGauge(QWidget):
         painter.drawArc(int(center_x - radius), int(center_y - radius), 
                         int(radius * 2), int(radius * 2), start_angle, span_angle)
         
-        # Calculate value position
-        value_ratio = (self.current_value - self.min_val) / (self.max_val - self.min_val)
-        value_angle = 135 + (270 * value_ratio)
-        
-        # Determine color based on thresholds
-        if self.reverse_colors:
-            if self.good_threshold and self.current_value <= self.good_threshold:
-                color = QColor("#2ECC71")
-            elif self.warning_threshold and self.current_value <= self.warning_threshold:
-                color = QColor("#F39C12")
-            else:
-                color = QColor("#E74C3C")
-        else:
-            if self.good_threshold and self.current_value >= self.good_threshold:
-                color = QColor("#2ECC71")
-            elif self.warning_threshold and self.current_value >= self.warning_threshold:
-                color = QColor("#F39C12")
-            else:
-                color = QColor("#E74C3C")
-        
-        # Draw value arc with gradient
-        gradient = QLinearGradient(center_x - radius, center_y, center_x + radius, center_y)
-        gradient.setColorAt(0, color.darker(120))
-        gradient.setColorAt(1, color)
-        painter.setPen(QPen(QBrush(gradient), 8, Qt.SolidLine, Qt.RoundCap))
-        painter.drawArc(int(center_x - radius), int(center_y - radius),
-                        int(radius * 2), int(radius * 2), start_angle, int(270 * value_ratio * 16))
-        
         # Draw icon in center of gauge (within the circle)
         icon_color = QColor("#4D4D6E")
         
@@ -287,6 +388,41 @@ class MetricGauge(QWidget):
             painter.setFont(QFont("Segoe UI", 26))
             icon = "●"
             painter.drawText(QRectF(0, center_y - 13, rect.width(), 35), Qt.AlignCenter, icon)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._layers.layer("static", self._draw_static, self.title))
+        painter.setRenderHint(QPainter.Antialiasing)
+        
+        rect, center_x, center_y, radius = self._geometry()
+        start_angle = 135 * 16
+        
+        # Calculate value position
+        value_ratio = (self.current_value - self.min_val) / (self.max_val - self.min_val)
+        
+        # Determine color based on thresholds
+        if self.reverse_colors:
+            if self.good_threshold and self.current_value <= self.good_threshold:
+                color = QColor("#2ECC71")
+            elif self.warning_threshold and self.current_value <= self.warning_threshold:
+                color = QColor("#F39C12")
+            else:
+                color = QColor("#E74C3C")
+        else:
+            if self.good_threshold and self.current_value >= self.good_threshold:
+                color = QColor("#2ECC71")
+            elif self.warning_threshold and self.current_value >= self.warning_threshold:
+                color = QColor("#F39C12")
+            else:
+                color = QColor("#E74C3C")
+        
+        # Draw value arc with gradient
+        gradient = QLinearGradient(center_x - radius, center_y, center_x + radius, center_y)
+        gradient.setColorAt(0, color.darker(120))
+        gradient.setColorAt(1, color)
+        painter.setPen(QPen(QBrush(gradient), 8, Qt.SolidLine, Qt.RoundCap))
+        painter.drawArc(int(center_x - radius), int(center_y - radius),
+                        int(radius * 2), int(radius * 2), start_angle, int(270 * value_ratio * 16))
         
         # Draw value text with unit inline
         painter.setPen(color)
@@ -326,24 +462,48 @@ class TrendChart(QWidget):
     """
     Line chart widget, with support for a second (forecast) series
     and gradient fill.
+
+    History lives in a NumPy ring of `history_points` samples (default
+    `max_points`). The x axis spans at least `max_points` samples and
+    compresses as the history grows, while the forecast keeps its share of
+    the width. The static layer (title, frame, grid, labels) is cached as a
+    pixmap, and the history line is cached as a path in sample coordinates:
+    new samples are appended to it, and scrolling or rescaling is only a
+    transform. Histories longer than the pixel width are drawn LTTB-decimated.
     """
+    MARGIN = 50
+    NUM_GRID_LINES = 5
     
     def __init__(self, title="Trend", max_points=50, y_label="Value", color="#4D96FF", 
-                 forecast_steps=30, goal_text=None, y_min=None, y_max=None):
+                 forecast_steps=30, goal_text=None, y_min=None, y_max=None, history_points=None):
         super().__init__()
         self.title = title
         self.y_label = y_label
         self.color = QColor(color)
         self.max_points = max_points
         self.forecast_steps = forecast_steps
-        self.data_points = deque(maxlen=max_points)
+        self.history = RingBuffer(max(history_points or max_points, max_points))
+        self.samples_seen = 0 # Global index of the next sample
         self.forecast_points = []
+        self.forecast_lower = []
+        self.forecast_upper = []
         
         self.goal_text = goal_text
         self.y_min = y_min
         self.y_max = y_max
+
+        self._layers = LayerCache(self) # "static" (title, frame, grid) and "history" (rasterized line)
+        self._line_path = None # History line, x = sample index, y = value
+        self._path_end = 0 # Sample index after the last path element
+        self._path_decimated = False
+        self._path_vertices = 0
         
         self.setMinimumSize(400, 300) 
+
+    @property
+    def data_points(self):
+        """Zero-copy view of the history, oldest first."""
+        return self.history.window()
         
     def add_data_point(self, value):
         if self.y_min is not None and value < self.y_min:
@@ -351,25 +511,57 @@ class TrendChart(QWidget):
         if self.y_max is not None and value > self.y_max:
             value = self.y_max
             
-        self.data_points.append(value)
+        self.history.append(value)
+        self.samples_seen += 1
         self.update()
     
-    def update_forecast_data(self, forecast_data):
+    def update_forecast_data(self, forecast_data, lower=None, upper=None):
+        """Sets the forecast series and, optionally, its prediction interval band."""
         self.forecast_points = forecast_data
+        self.forecast_lower = lower or []
+        self.forecast_upper = upper or []
         self.update()
         
     def clear_data(self):
-        self.data_points.clear()
+        self.history.clear()
+        self._line_path = None
+        self._layers.invalidate("history")
         self.forecast_points = []
+        self.forecast_lower = []
+        self.forecast_upper = []
         self.update()
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
+
+    # --- Layout ---
+    def _chart_rect(self):
+        rect = self.rect()
+        margin = self.MARGIN
+        return QRectF(margin, margin + 20, rect.width() - margin * 2, rect.height() - margin * 2 - 20)
+
+    def _value_range(self, points):
+        if self.y_min is not None and self.y_max is not None:
+            min_val, max_val = self.y_min, self.y_max
+        else:
+            forecast = np.asarray(self.forecast_points, dtype=np.float64)
+            min_val = min(points.min(), forecast.min()) if forecast.size else points.min()
+            max_val = max(points.max(), forecast.max()) if forecast.size else points.max()
+        return float(min_val), float(max_val)
+
+    def _x_layout(self, chart_rect, count):
+        """(history width, x step per history sample, x step per forecast step)."""
+        forecast_share = self.forecast_steps / max(1, (self.max_points - 1) + self.forecast_steps)
+        history_width = chart_rect.width() * (1 - forecast_share)
+        span = min(max(count, self.max_points), self.history.capacity)
+        forecast_step = chart_rect.width() * forecast_share / self.forecast_steps if self.forecast_steps else 0
+        return history_width, history_width / max(1, span - 1), forecast_step
+
+    # --- Cached layers ---
+    def _static_layer(self, chart_rect, min_val, max_val):
+        """Title, chart frame, grid and axis labels, redrawn only when size or range changes."""
+        return self._layers.layer("static", lambda painter: self._draw_static(painter, chart_rect, min_val, max_val),
+                                  min_val, max_val)
+
+    def _draw_static(self, painter, chart_rect, min_val, max_val):
         rect = self.rect()
-        margin = 50
-        chart_rect = QRectF(margin, margin + 20, rect.width() - margin * 2, rect.height() - margin * 2 - 20)
         
         # Draw title
         painter.setPen(QColor("#BDC3C7"))
@@ -384,65 +576,79 @@ class TrendChart(QWidget):
         painter.fillRect(chart_rect, QColor("#1A1A2E"))
         painter.setPen(QPen(QColor("#3D3D5C"), 1))
         painter.drawRect(chart_rect)
-        
-        if len(self.data_points) < 2:
+
+        if min_val is not None:
+            value_range = max_val - min_val if max_val != min_val else 1
+            num_grid_lines = self.NUM_GRID_LINES
+            painter.setPen(QPen(QColor("#3D3D5C"), 1, Qt.DotLine))
+            for i in range(num_grid_lines):
+                y = chart_rect.top() + (chart_rect.height() / (num_grid_lines - 1)) * i
+                painter.drawLine(int(chart_rect.left()), int(y), int(chart_rect.right()), int(y))
+
             painter.setPen(QColor("#95A5A6"))
-            painter.setFont(QFont("Segoe UI", 10))
-            painter.drawText(chart_rect, Qt.AlignCenter, "Collecting data...")
-            return
-        
-        all_points = list(self.data_points) + self.forecast_points
-        
-        if self.y_min is not None and self.y_max is not None:
-            min_val = self.y_min
-            max_val = self.y_max
+            painter.setFont(QFont("Segoe UI", 8))
+            for i in range(num_grid_lines):
+                y = chart_rect.top() + (chart_rect.height() / (num_grid_lines - 1)) * i
+                value = max_val - (value_range / (num_grid_lines - 1)) * i
+                painter.drawText(QRectF(5, y - 10, self.MARGIN - 10, 20), Qt.AlignRight | Qt.AlignVCenter, f"{value:.1f}")
+
+    def _history_path(self, points, max_vertices):
+        """
+        The history line in sample coordinates. Appends new samples to the
+        cached path; rebuilds it (LTTB-decimated if needed) only when the
+        history outgrows `max_vertices` or the path holds too many stale samples.
+        """
+        first = self.samples_seen - len(points)
+        decimate = len(points) > max_vertices
+        path = self._line_path
+        if path is not None and self._path_end == self.samples_seen and self._path_vertices == max_vertices:
+            return path # Nothing new since the last paint
+        incremental = (path is not None and not decimate and not self._path_decimated
+                       and first <= self._path_end and path.elementCount() <= 2 * max(max_vertices, 1))
+        if incremental:
+            for index in range(self._path_end, self.samples_seen):
+                path.lineTo(index, points[index - first])
         else:
-            min_val = min(all_points) if all_points else 0
-            max_val = max(all_points) if all_points else 1
-            
-        value_range = max_val - min_val if max_val != min_val else 1
-        
-        painter.setPen(QPen(QColor("#3D3D5C"), 1, Qt.DotLine))
-        num_grid_lines = 5
-        for i in range(num_grid_lines):
-            y = chart_rect.top() + (chart_rect.height() / (num_grid_lines - 1)) * i
-            painter.drawLine(int(chart_rect.left()), int(y), int(chart_rect.right()), int(y))
-        
-        
-        points = list(self.data_points)
-        
-        total_x_points = (self.max_points - 1) + self.forecast_steps
-        if total_x_points == 0: total_x_points = 1
-        x_step = chart_rect.width() / total_x_points
+            kept = lttb(points, max_vertices) if decimate else np.arange(len(points))
+            xs = (kept + first).tolist()
+            ys = points[kept].tolist()
+            path = QPainterPath()
+            path.moveTo(xs[0], ys[0])
+            for x, y in zip(xs[1:], ys[1:]):
+                path.lineTo(x, y)
+            self._line_path, self._path_decimated = path, decimate
+        self._path_end = self.samples_seen
+        self._path_vertices = max_vertices
+        return path
         
-        line_path = QPainterPath()
-        fill_path = QPainterPath()
-        
-        current_x_offset = (self.max_points - len(points)) * x_step
-        start_x = chart_rect.left() + current_x_offset
-        
-        fill_path.moveTo(start_x, chart_rect.bottom())
-
-        first_value = points[0]
-        first_y = chart_rect.bottom() - (((first_value - min_val) / value_range) * chart_rect.height())
+    def _history_layer(self, chart_rect, points, min_val, max_val):
+        """
+        The filled history line, rasterized once per new sample (or size or
+        range change); repaints in between only blit it.
+        """
+        return self._layers.layer("history", lambda painter: self._draw_history(painter, chart_rect, points, min_val, max_val),
+                                  min_val, max_val, self.samples_seen)
 
-        line_path.moveTo(start_x, first_y)
-        fill_path.lineTo(start_x, first_y)
+    def _draw_history(self, painter, chart_rect, points, min_val, max_val):
+        value_range = max_val - min_val if max_val != min_val else 1
+        history_width, x_step, _ = self._x_layout(chart_rect, len(points))
+        last_x = chart_rect.left() + history_width
+        y_scale = chart_rect.height() / value_range
+        last_index = self.samples_seen - 1
 
-        last_x = start_x
-        for i, value in enumerate(points[1:], 1):
-            y_ratio = (value - min_val) / value_range
-            x = chart_rect.left() + current_x_offset + (i * x_step)
-            y = chart_rect.bottom() - (y_ratio * chart_rect.height())
-            
-            line_path.lineTo(x, y)
-            fill_path.lineTo(x, y)
-            last_x = x
+        # Sample coordinates -> pixels: the newest sample sits at the end of the history area
+        to_pixels = QTransform(x_step, 0, 0, -y_scale, last_x - last_index * x_step,
+                               chart_rect.bottom() + min_val * y_scale)
+        line_path = to_pixels.map(self._history_path(points, max(2, int(history_width))))
+        first_x = max(chart_rect.left(), last_x - (len(points) - 1) * x_step)
 
+        fill_path = QPainterPath(line_path)
         fill_path.lineTo(last_x, chart_rect.bottom())
-        fill_path.lineTo(chart_rect.left() + current_x_offset, chart_rect.bottom())
+        fill_path.lineTo(first_x, chart_rect.bottom())
         fill_path.closeSubpath()
 
+        painter.setClipRect(QRectF(first_x, chart_rect.top(), last_x - first_x + 1, chart_rect.height()))
+
         gradient = QLinearGradient(chart_rect.center().x(), chart_rect.top(), chart_rect.center().x(), chart_rect.bottom())
         gradient_color = QColor(self.color)
         gradient_color.setAlpha(90)
@@ -457,45 +663,385 @@ class TrendChart(QWidget):
         painter.setBrush(Qt.NoBrush)
         painter.setPen(QPen(self.color, 3))
         painter.drawPath(line_path)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        chart_rect = self._chart_rect()
+        points = self.data_points
+
+        if len(points) < 2:
+            painter.drawPixmap(0, 0, self._static_layer(chart_rect, None, None))
+            painter.setPen(QColor("#95A5A6"))
+            painter.setFont(QFont("Segoe UI", 10))
+            painter.drawText(chart_rect, Qt.AlignCenter, "Collecting data...")
+            return
+
+        min_val, max_val = self._value_range(points)
+        value_range = max_val - min_val if max_val != min_val else 1
+        painter.drawPixmap(0, 0, self._static_layer(chart_rect, min_val, max_val))
+
+        history_width, x_step, forecast_step = self._x_layout(chart_rect, len(points))
+        last_x = chart_rect.left() + history_width
+        y_scale = chart_rect.height() / value_range
+        painter.drawPixmap(0, 0, self._history_layer(chart_rect, points, min_val, max_val))
+
+        def to_y(value):
+            if self.y_min is not None: value = max(self.y_min, value)
+            if self.y_max is not None: value = min(self.y_max, value)
+            return chart_rect.bottom() - (value - min_val) * y_scale
+
+        last_actual_y = to_y(points[-1])
+        forecast_xs = [last_x + (i + 1) * forecast_step for i in range(len(self.forecast_points))]
+        forecast_xs = [x for x in forecast_xs if x <= chart_rect.right() + 5]
         
-        
-        if self.forecast_points and len(self.data_points) > 0:
+        if self.forecast_lower and self.forecast_upper:
+            # Prediction interval band: upper edge forward, lower edge back
+            band_path = QPainterPath()
+            band_path.moveTo(last_x, last_actual_y)
+            band_xs = [last_x + (i + 1) * forecast_step for i in range(min(len(self.forecast_lower), len(self.forecast_upper)))]
+            band_xs = [x for x in band_xs if x <= chart_rect.right() + 5]
+            for i, x in enumerate(band_xs):
+                band_path.lineTo(x, to_y(self.forecast_upper[i]))
+            for i in reversed(range(len(band_xs))):
+                band_path.lineTo(band_xs[i], to_y(self.forecast_lower[i]))
+            band_path.closeSubpath()
+
+            band_color = QColor(self.color)
+            band_color.setAlpha(45)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(band_color)
+            painter.drawPath(band_path)
+            painter.setBrush(Qt.NoBrush)
+
+        if forecast_xs:
             forecast_path = QPainterPath()
-            
-            last_actual_value = points[-1]
-            last_actual_x = last_x
-            last_actual_y = chart_rect.bottom() - (((last_actual_value - min_val) / value_range) * chart_rect.height())
-            forecast_path.moveTo(last_actual_x, last_actual_y)
-            
-            for i, value in enumerate(self.forecast_points):
-                if self.y_min is not None and value < self.y_min: value = self.y_min
-                if self.y_max is not None and value > self.y_max: value = self.y_max
-                
-                y_ratio = (value - min_val) / value_range
-                x = last_actual_x + ((i + 1) * x_step)
-                y = chart_rect.bottom() - (y_ratio * chart_rect.height())
-                
-                if x > chart_rect.right() + 5:
-                    break
-                    
-                forecast_path.lineTo(x, y)
+            forecast_path.moveTo(last_x, last_actual_y)
+            for x, value in zip(forecast_xs, self.forecast_points):
+                forecast_path.lineTo(x, to_y(value))
 
             forecast_pen = QPen(self.color.lighter(110), 3, Qt.DotLine)
             painter.setPen(forecast_pen)
             painter.drawPath(forecast_path)
 
+
+class HistoryChart(QWidget):
+    """
+    Zoomable trend of one metric from the persisted tick history
+    (db/history_store.py): the mean as a line over the min/max envelope of
+    each bucket. The wheel zooms around the cursor (a year down to seconds),
+    dragging pans back in time, double-click returns to the live last hour.
+    Times are the simulation clock's (Unix seconds); the live edge is the
+    latest recorded tick. Queries run on the store's thread; only the newest
+    answer is drawn.
+    """
+    MARGIN = 50
+    NUM_GRID_LINES = 5
+    MIN_SPAN = 10 # seconds
+    MAX_SPAN = 2 * 365 * 86400
+
+    data_ready = pyqtSignal(int, object)
+
+    def __init__(self, title="History", metric="pue", y_label="", color="#4D96FF", span=3600):
+        super().__init__()
+        self.title = title
+        self.metric = metric
+        self.y_label = y_label
+        self.color = QColor(color)
+        self.store = None
+        self.follow_live = True
+        self.live_time = time.time() # Simulated time of the latest tick
+        self.end = self.live_time
+        self.start = self.end - span
+        self.window = None # Latest HistoryWindow
+        self._request_id = 0
+        self._drag_x = None
+        self.data_ready.connect(self._on_data) # Queued: emitted from the store thread
+        self.setMinimumSize(400, 300)
+
+    def set_store(self, store, live_time=None):
+        self.store = store
+        self.refresh(live_time)
+
+    def set_metric(self, metric, title=None, y_label=None, color=None):
+        self.metric = metric
+        self.title = title or self.title
+        self.y_label = y_label if y_label is not None else self.y_label
+        self.color = QColor(color) if color else self.color
+        self.update()
+        self.refresh()
+
+    def show_last(self, span):
+        """Follows live data over the last `span` seconds."""
+        self.follow_live = True
+        self.end = self.live_time
+        self.start = self.end - span
+        self.refresh()
+
+    def refresh(self, live_time=None):
+        """
+        Re-queries the visible range; `live_time` moves the live edge (and
+        the range along with it when following).
+        """
+        if live_time is not None:
+            self.live_time = live_time
+        if self.store is None or not self.isVisible():
+            return
+        if self.follow_live:
+            span = self.end - self.start
+            self.end = self.live_time
+            self.start = self.end - span
+        self._request_id += 1
+        request_id = self._request_id
+        future = self.store.query(self.start, self.end, max_points=max(50, self._plot_rect().width()))
+        future.add_done_callback(lambda f: self.data_ready.emit(request_id, f))
+
+    @pyqtSlot(int, object)
+    def _on_data(self, request_id, future):
+        if request_id != self._request_id:
+            return # A newer query is on its way
+        try:
+            self.window = future.result()
+        except Exception as e:
+            print(f"HISTORY: Query failed: {e}")
+            return
+        self.update()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+    def _plot_rect(self):
+        rect = self.rect()
+        margin = self.MARGIN
+        return QRectF(margin, margin + 20, rect.width() - margin * 2, rect.height() - margin * 2 - 20)
+
+    def _time_at(self, x):
+        plot = self._plot_rect()
+        return self.start + (x - plot.left()) / plot.width() * (self.end - self.start)
+
+    def _set_range(self, start, end):
+        span = min(max(end - start, self.MIN_SPAN), self.MAX_SPAN)
+        center = (start + end) / 2
+        end = min(center + span / 2, self.live_time)
+        self.start, self.end = end - span, end
+        self.follow_live = end >= self.live_time - 1 # Back at the live edge: keep following
+        self.update()
+        self.refresh()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            anchor = self._time_at(event.x())
+            factor = 1.25 ** -steps # Wheel up zooms in
+            self._set_range(anchor - (anchor - self.start) * factor, anchor + (self.end - anchor) * factor)
+        event.accept()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_x = event.x()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_x is None:
+            return
+        shift = (event.x() - self._drag_x) / self._plot_rect().width() * (self.end - self.start)
+        self._drag_x = event.x()
+        self._set_range(self.start - shift, self.end - shift)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_x = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.show_last(3600)
+
+    def _time_label(self, timestamp):
+        span = self.end - self.start
+        fmt = "%H:%M:%S" if span < 600 else "%H:%M" if span < 2 * 86400 else "%b %d %H:%M" if span < 30 * 86400 else "%Y-%m-%d"
+        return time.strftime(fmt, time.localtime(timestamp))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect()
+        plot = self._plot_rect()
+        window = self.window
+
+        title = self.title
+        if window is not None:
+            seconds = window.bucket_seconds
+            bucket = f"{seconds} s" if seconds < 60 else f"{seconds // 60} min" if seconds < 3600 else f"{seconds // 3600} h"
+            title += f" ({bucket} buckets)"
+        painter.setPen(QColor("#BDC3C7"))
+        painter.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        painter.drawText(QRectF(0, 10, rect.width(), 30), Qt.AlignCenter, title)
+        painter.setPen(QColor("#7F8C8D"))
+        painter.setFont(QFont("Segoe UI", 9))
+        hint = "Live" if self.follow_live else "Paused"
+        painter.drawText(QRectF(0, 30, rect.width(), 20), Qt.AlignCenter,
+                         f"{hint} | wheel: zoom, drag: pan, double-click: last hour")
+
+        painter.fillRect(plot, QColor("#1A1A2E"))
+        painter.setPen(QPen(QColor("#3D3D5C"), 1))
+        painter.drawRect(plot)
+
+        # Time axis labels
         painter.setPen(QColor("#95A5A6"))
         painter.setFont(QFont("Segoe UI", 8))
+        for i in range(5):
+            x = plot.left() + plot.width() * i / 4
+            label = self._time_label(self.start + (self.end - self.start) * i / 4)
+            if i == 0:
+                painter.drawText(QRectF(x, plot.bottom() + 4, 120, 16), Qt.AlignLeft, label)
+            elif i == 4:
+                painter.drawText(QRectF(x - 120, plot.bottom() + 4, 120, 16), Qt.AlignRight, label)
+            else:
+                painter.drawText(QRectF(x - 60, plot.bottom() + 4, 120, 16), Qt.AlignHCenter, label)
+
+        if window is None or len(window) == 0 or self.metric not in window.mean:
+            painter.drawText(plot, Qt.AlignCenter, "No recorded history in this range" if window is not None else "Loading history...")
+            return
+
+        mean, low, high = window.mean[self.metric], window.min[self.metric], window.max[self.metric]
+        min_val, max_val = float(low.min()), float(high.max())
+        pad = (max_val - min_val) * 0.05 or 0.5
+        min_val, max_val = min_val - pad, max_val + pad
+        value_range = max_val - min_val
+
+        num_grid_lines = self.NUM_GRID_LINES
         for i in range(num_grid_lines):
-            y = chart_rect.top() + (chart_rect.height() / (num_grid_lines - 1)) * i
+            y = plot.top() + (plot.height() / (num_grid_lines - 1)) * i
             value = max_val - (value_range / (num_grid_lines - 1)) * i
-            painter.drawText(QRectF(5, y - 10, margin - 10, 20), Qt.AlignRight | Qt.AlignVCenter, f"{value:.1f}")
+            painter.drawText(QRectF(5, y - 10, self.MARGIN - 10, 20), Qt.AlignRight | Qt.AlignVCenter, f"{value:.1f}")
+        painter.setPen(QPen(QColor("#3D3D5C"), 1, Qt.DotLine))
+        for i in range(num_grid_lines):
+            y = plot.top() + (plot.height() / (num_grid_lines - 1)) * i
+            painter.drawLine(int(plot.left()), int(y), int(plot.right()), int(y))
+
+        # Bucket centres -> pixels; runs of consecutive buckets are drawn as separate segments
+        x_scale = plot.width() / (self.end - self.start)
+        xs = plot.left() + (window.t + window.bucket_seconds / 2 - self.start) * x_scale
+        y_scale = plot.height() / value_range
+        to_y = lambda values: plot.bottom() - (values - min_val) * y_scale
+        mean_y, low_y, high_y = to_y(mean), to_y(low), to_y(high)
+        breaks = np.flatnonzero(np.diff(window.t) > 1.5 * window.bucket_seconds) + 1
+
+        band_color = QColor(self.color)
+        band_color.setAlpha(60)
+        painter.setClipRect(plot)
+        for segment in np.split(np.arange(len(xs)), breaks):
+            band = QPainterPath()
+            band.moveTo(xs[segment[0]], high_y[segment[0]])
+            for i in segment[1:].tolist():
+                band.lineTo(xs[i], high_y[i])
+            for i in segment[::-1].tolist():
+                band.lineTo(xs[i], low_y[i])
+            band.closeSubpath()
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(band_color)
+            painter.drawPath(band)
+
+            line = QPainterPath()
+            line.moveTo(xs[segment[0]], mean_y[segment[0]])
+            for i in segment[1:].tolist():
+                line.lineTo(xs[i], mean_y[i])
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(QPen(self.color, 2))
+            painter.drawPath(line)
+
+
+ALERT_COLORS = {"info": "#4D96FF", "warning": "#F39C12", "critical": "#E74C3C", "good": "#2ECC71"}
+ALERT_ICONS = {"info": "ℹ", "warning": "⚠", "critical": "✗", "good": "✓"}
+
+
+class AlertListModel(QAbstractListModel):
+    """Bounded list of alerts (newest first) for a QListView; rows are `alert_engine.Alert`s."""
+    SeverityRole = Qt.UserRole + 1
+
+    def __init__(self, max_rows=500, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self._alerts = deque() # Newest first
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._alerts)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._alerts):
+            return None
+        alert = self._alerts[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{ALERT_ICONS.get(alert.severity, 'ℹ')} {alert.message}"
+        if role == Qt.ToolTipRole:
+            return f"{time.strftime('%H:%M:%S', time.localtime(alert.time))}  {alert.message}"
+        if role == self.SeverityRole:
+            return alert.severity
+        return None
+
+    def latest(self):
+        return self._alerts[0] if self._alerts else None
+
+    def add_alerts(self, alerts):
+        """Inserts a tick's alerts in one batch and trims the oldest rows past `max_rows`."""
+        alerts = list(alerts)[-self.max_rows:]
+        if not alerts:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(alerts) - 1)
+        self._alerts.extendleft(alerts) # Last of the batch ends up on top
+        self.endInsertRows()
+
+        excess = len(self._alerts) - self.max_rows
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), self.max_rows, len(self._alerts) - 1)
+            for _ in range(excess):
+                self._alerts.pop()
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._alerts.clear()
+        self.endResetModel()
+
+
+class AlertDelegate(QStyledItemDelegate):
+    """Paints one alert row: severity bar and coloured, elided text (no per-row widgets or stylesheets)."""
+    ROW_HEIGHT = 28
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont("Segoe UI", 8)
+        self.colors = {severity: QColor(color) for severity, color in ALERT_COLORS.items()}
+        self.background = QColor(255, 255, 255, 8)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        color = self.colors.get(index.data(AlertListModel.SeverityRole), self.colors["info"])
+        rect = option.rect.adjusted(0, 2, 0, -2)
+        painter.save()
+        painter.fillRect(rect, self.background)
+        painter.fillRect(QRectF(rect.left(), rect.top(), 3, rect.height()), color)
+        painter.setFont(self.font)
+        painter.setPen(color)
+        text_rect = rect.adjusted(10, 0, -6, 0)
+        text = QFontMetrics(self.font).elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
 
 
 class AlertPanel(QFrame):
-    """Panel for displaying system alerts and warnings."""
+    """
+    Panel for displaying system alerts and warnings.
+    A QListView over an AlertListModel: only visible rows are painted, so an
+    alert storm costs one batched model insert per tick.
+    """
     
-    def __init__(self):
+    def __init__(self, max_rows=500):
         super().__init__()
         self.setFrameShape(QFrame.StyledPanel)
         self.setStyleSheet("""
@@ -504,6 +1050,10 @@ class AlertPanel(QFrame):
                 border-radius: 8px;
                 border: 1px solid #3D3D5C;
             }
+            QListView {
+                background: transparent;
+                border: none;
+            }
         """)
         
         layout = QVBoxLayout(self)
@@ -514,165 +1064,153 @@ class AlertPanel(QFrame):
         title.setStyleSheet("font-family: 'Segoe UI'; font-size: 13px; font-weight: bold; color: #4D96FF; margin-bottom: 5px;")
         layout.addWidget(title)
         
-        self.alerts_layout = QVBoxLayout()
-        self.alerts_layout.setSpacing(5)
-        layout.addLayout(self.alerts_layout)
-        layout.addStretch()
-        
-        self.alerts = []
+        self.model = AlertListModel(max_rows, self)
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(AlertDelegate(self.view))
+        self.view.setUniformItemSizes(True) # Row geometry without asking every row
+        self.view.setSelectionMode(QListView.NoSelection)
+        self.view.setFocusPolicy(Qt.NoFocus)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        layout.addWidget(self.view)
+
+    def add_alerts(self, alerts):
+        """Shows a batch of `alert_engine.Alert`s (e.g. one tick's) on top of the list."""
+        self.model.add_alerts(alerts)
         
     def add_alert(self, message, severity="info"):
         """Add an alert message. Severity: info, warning, critical, good"""
-        if len(self.alerts) > 0:
-            last_alert_text = self.alerts[-1].text()
-            if message in last_alert_text:
-                return
-        
-        colors = {
-            "info": "#4D96FF",
-            "warning": "#F39C12",
-            "critical": "#E74C3C",
-            "good": "#2ECC71"
-        }
-        icons = {
-            "info": "ℹ",
-            "warning": "⚠",
-            "critical": "✗",
-            "good": "✓"
-        }
-        
-        alert_widget = QLabel(f"{icons.get(severity, 'ℹ')} {message}")
-        alert_widget.setStyleSheet(f"""
-            font-family: 'Segoe UI';
-            color: {colors.get(severity, '#4D96FF')};
-            font-size: 10px;
-            padding: 8px 10px;
-            background-color: rgba(255, 255, 255, 0.03);
-            border-left: 3px solid {colors.get(severity, '#4D96FF')};
-            border-radius: 4px;
-        """)
-        alert_widget.setWordWrap(True)
-        
-        self.alerts_layout.addWidget(alert_widget)
-        self.alerts.append(alert_widget)
-        
-        if len(self.alerts) > 8:
-            old_alert = self.alerts.pop(0)
-            self.alerts_layout.removeWidget(old_alert)
-            old_alert.deleteLater()
+        latest = self.model.latest()
+        if latest is not None and latest.message == message:
+            return
+        self.model.add_alerts([Alert(time.time(), severity, "system", message)])
     
     def clear_alerts(self):
-        for alert in self.alerts:
-            self.alerts_layout.removeWidget(alert)
-            alert.deleteLater()
-        self.alerts.clear()
+        self.model.clear()
 
 
 class EnhancedHeatmap(QWidget):
-    """Enhanced heatmap with hover tooltips and rack details."""
-    
-    # --- FIX (SMOOTHER): Drastically reduced internal heatmap resolution ---
-    HEATMAP_IMG_WIDTH = 50  # Was 200
-    HEATMAP_IMG_HEIGHT = 25 # Was 100
+    """
+    Enhanced heatmap with hover tooltips and rack details.
+    Views of the same rack grid can share one HeatmapRenderService.
 
-    request_new_map = pyqtSignal(list)
+    Mouse wheel zooms around the cursor, dragging pans, double-click resets
+    to the whole grid. Grid lines appear once cells are large enough to see.
+    Image, grid and outlines are one cached layer, so hovering only repaints
+    the tooltip's region.
+    """
+    MIN_GRID_CELL_PX = 6
 
-    def __init__(self, rows=20, cols=35):
+    def __init__(self, rows=20, cols=35, render_service=None):
         super().__init__()
-        self.rows, self.cols = rows, cols
         self.rack_temps = [25.0] * (rows * cols)
         self.rack_workloads = [50.0] * (rows * cols)
         self.setMinimumHeight(300)
         self.setMouseTracking(True)
         self.hover_rack = -1
+        self.anomalous_racks = []
+        self._drag_origin = None
         
-        # --- FIX (COLOR MAP): Adjusted thresholds for better shallow color perception ---
-        self.color_map = [
-            (20.0, QColor(0, 0, 139, 255)),    # Dark Blue (cool)
-            (27.0, QColor(0, 128, 0, 255)),    # Green (starts 1 degree earlier)
-            (32.0, QColor(255, 255, 0, 255)),  # Yellow (starts 1 degree earlier)
-            (36.0, QColor(255, 165, 0, 255)),  # Orange (starts 1 degree earlier)
-            (39.0, QColor(255, 0, 0, 255)),    # Red (starts 1 degree earlier)
-            (45.0, QColor(139, 0, 0, 255))     # Dark Red (hot)
-        ]
-        # --- End of Color Fix ---
-        
-        self.color_map.sort(key=lambda x: x[0])
-
-        self.heatmap_pixmap = QPixmap(self.HEATMAP_IMG_WIDTH, self.HEATMAP_IMG_HEIGHT)
-        self.heatmap_pixmap.fill(QColor("#1A1A2E")) 
-
-        self.heatmap_thread = QThread()
-        self.heatmap_worker = HeatmapWorker(
-            self.rows, self.cols, self.get_color_for_temp,
-            self.HEATMAP_IMG_WIDTH, self.HEATMAP_IMG_HEIGHT
-        )
-        self.heatmap_worker.moveToThread(self.heatmap_thread)
-        
-        self.heatmap_worker.finished.connect(self.on_pixmap_ready)
-        self.request_new_map.connect(self.heatmap_worker.generate_map)
-        
-        # --- Make sure thread quits when app closes ---
-        self.heatmap_thread.finished.connect(self.heatmap_worker.deleteLater)
-        self.heatmap_thread.start()
-        print("Heatmap worker thread started.")
-    
-    # --- Add this function to properly shut down the thread ---
-    def closeEvent(self, event):
-        """Clean up the thread when the widget is closed."""
-        self.heatmap_thread.quit()
-        self.heatmap_thread.wait()
-        super().closeEvent(event)
-
-    @pyqtSlot(QPixmap)
-    def on_pixmap_ready(self, pixmap):
-        self.heatmap_pixmap = pixmap
-        self.update() 
-
-    def get_color_for_temp(self, temp):
-        if not self.color_map:
-            return QColor(0,0,0) 
-            
-        if temp <= self.color_map[0][0]:
-            return self.color_map[0][1]
-        if temp >= self.color_map[-1][0]:
-            return self.color_map[-1][1]
-
-        for i in range(len(self.color_map) - 1):
-            temp1, color1 = self.color_map[i]
-            temp2, color2 = self.color_map[i+1]
-            
-            if temp1 <= temp <= temp2:
-                if (temp2 - temp1) == 0:
-                    return color1
-                ratio = (temp - temp1) / (temp2 - temp1)
-                return interpolate_color(color1, color2, ratio)
-                
-        return self.color_map[0][1] 
+        self.color_map = sorted(HEATMAP_COLOR_STOPS, key=lambda x: x[0])
+
+        self.heatmap_image = QImage() # Rendered at full widget resolution
+        self._layers = LayerCache(self) # "scene": image, grid and outlines
+        self.tooltip_font = QFont("Segoe UI", 9)
+        self.tooltip_metrics = QFontMetrics(self.tooltip_font)
+        self._tooltip_box = None # Where the tooltip was last painted
+
+        if render_service is None:
+            render_service = HeatmapRenderService(rows, cols, self.color_map, parent=self)
+        self.render_service = render_service
+        self.render_service.add_view(self)
+
+    @property
+    def rows(self):
+        return self.render_service.rows
+
+    @property
+    def cols(self):
+        return self.render_service.cols
+
+    def set_image(self, image):
+        if image is not self.heatmap_image:
+            self.heatmap_image = image
+            self._layers.invalidate("scene") # Image ids get reused, so a new image always redraws the scene
+            self.update()
+
+    def set_rack_data(self, temps, workloads):
+        """Tooltip data; the image itself comes from the render service."""
+        self.rack_temps = temps
+        self.rack_workloads = workloads
+        if self.hover_rack >= 0:
+            self._update_tooltip()
+
+    def device_size(self):
+        dpr = self.devicePixelRatioF()
+        return int(self.width() * dpr), int(self.height() * dpr)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.render_service.request()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.render_service.request()
+
+    # --- Widget <-> rack cell coordinates under the current viewport ---
+    def _cell_size(self):
+        x0, y0, x1, y1 = self.render_service.viewport
+        return self.width() / (x1 - x0), self.height() / (y1 - y0)
+
+    def _to_cell(self, x, y):
+        x0, y0, _, _ = self.render_service.viewport
+        cell_width, cell_height = self._cell_size()
+        return x0 + x / cell_width, y0 + y / cell_height
+
+    def _cell_rect(self, row, col):
+        x0, y0, _, _ = self.render_service.viewport
+        cell_width, cell_height = self._cell_size()
+        return QRectF((col - x0) * cell_width, (row - y0) * cell_height, cell_width, cell_height)
 
     def update_data(self, temps, workloads=None):
-        if not temps: 
-             self.rack_temps = [25.0] * (self.rows * self.cols)
-        else:
-            self.rack_temps = temps
-            
-        if workloads:
-            self.rack_workloads = workloads
-        
-        self.request_new_map.emit(self.rack_temps)
+        """Updates every view sharing this heatmap's render service."""
+        self.render_service.update_data(temps, workloads)
+
+    def set_anomalous_racks(self, rack_indices):
+        """Outlines the racks flagged by the per-rack anomaly detector."""
+        rack_indices = list(rack_indices)
+        if rack_indices != self.anomalous_racks:
+            self.anomalous_racks = rack_indices
+            self.update()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            anchor_x, anchor_y = self._to_cell(event.x(), event.y())
+            self.render_service.zoom(1.25 ** steps, anchor_x, anchor_y)
+        event.accept()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_origin = event.pos()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_origin = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.render_service.reset_view()
         
     def mouseMoveEvent(self, event):
-        rect = self.rect()
-        if not rect.isValid(): return
+        if not self.rect().isValid(): return
 
-        cell_width = rect.width() / self.cols
-        cell_height = rect.height() / self.rows
+        if self._drag_origin is not None:
+            cell_width, cell_height = self._cell_size()
+            delta = event.pos() - self._drag_origin
+            self._drag_origin = event.pos()
+            self.render_service.pan(-delta.x() / cell_width, -delta.y() / cell_height)
 
-        if cell_width == 0 or cell_height == 0:
-            return
-
-        col = int(event.x() / cell_width)
-        row = int(event.y() / cell_height)
+        col, row = (int(math.floor(v)) for v in self._to_cell(event.x(), event.y()))
         
         new_hover_rack = -1
         if 0 <= row < self.rows and 0 <= col < self.cols:
@@ -680,73 +1218,116 @@ class EnhancedHeatmap(QWidget):
         
         if new_hover_rack != self.hover_rack:
             self.hover_rack = new_hover_rack
-            self.update() 
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform) 
+            self._update_tooltip()
         
+
+    def _draw_scene(self, painter):
+        """Heatmap image, grid lines and anomaly outlines for the current viewport."""
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
         rect = self.rect()
-        if not rect.isValid():
-            return
-            
-        if not self.heatmap_pixmap.isNull():
-            painter.drawPixmap(rect, self.heatmap_pixmap)
+        service = self.render_service
+        x0, y0, x1, y1 = service.viewport
+        cell_width, cell_height = self._cell_size()
+
+        painter.fillRect(rect, QColor("#1A1A2E"))
+        if not self.heatmap_image.isNull():
+            # The image may still be for the previous viewport while a pan/zoom
+            # render is in flight: place it where its cells are now
+            ix0, iy0, ix1, iy1 = service.image_viewport
+            painter.drawImage(QRectF((ix0 - x0) * cell_width, (iy0 - y0) * cell_height,
+                                     (ix1 - ix0) * cell_width, (iy1 - iy0) * cell_height), self.heatmap_image)
         else:
-            painter.fillRect(rect, QColor("#1A1A2E"))
             painter.setPen(Qt.white)
             painter.drawText(rect, Qt.AlignCenter, "Generating heatmap...")
 
         # --- FIX 3 (GRID): Make grid more visible ---
+        # Only the visible lines, and only once cells are big enough to tell apart
         painter.setPen(QColor(0, 0, 0, 90)) # BLACK grid
-        cell_width = rect.width() / self.cols
-        cell_height = rect.height() / self.rows
-        
-        if cell_width > 0 and cell_height > 0:
+        if cell_width >= self.MIN_GRID_CELL_PX and cell_height >= self.MIN_GRID_CELL_PX:
             # Draw vertical lines
-            for i in range(1, self.cols):
-                x = int(i * cell_width)
+            for i in range(max(1, math.ceil(x0)), min(self.cols, math.floor(x1) + 1)):
+                x = int((i - x0) * cell_width)
                 painter.drawLine(x, 0, x, rect.height())
                 
             # Draw horizontal lines
-            for i in range(1, self.rows):
-                y = int(i * cell_height)
+            for i in range(max(1, math.ceil(y0)), min(self.rows, math.floor(y1) + 1)):
+                y = int((i - y0) * cell_height)
                 painter.drawLine(0, y, rect.width(), y)
         # --- End of Grid Fix ---
 
+        # Outline racks flagged by the ML per-rack anomaly detector
+        if self.anomalous_racks:
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(QPen(QColor("#FFFFFF"), 2))
+            for rack in self.anomalous_racks:
+                if 0 <= rack < self.rows * self.cols:
+                    col = rack % self.cols
+                    row = rack // self.cols
+                    if x0 - 1 < col < x1 and y0 - 1 < row < y1:
+                        cell = self._cell_rect(row, col)
+                        # Keep the outline visible when a cell is smaller than a few pixels
+                        pad = 1 if cell.width() > 6 else -2
+                        painter.drawRect(cell.adjusted(pad, pad, -pad, -pad))
+
+    # --- Tooltip (the only per-hover work: a small region repaint) ---
+    def _tooltip(self):
+        """(box, lines) of the hover tooltip, or None when no rack is hovered."""
+        if not (0 <= self.hover_rack < len(self.rack_temps)):
+            return None
+        temp = self.rack_temps[self.hover_rack]
+        workload = self.rack_workloads[self.hover_rack] if self.rack_workloads and self.hover_rack < len(self.rack_workloads) else 0
+        lines = [f"Rack {self.hover_rack + 1}", f"Temp: {temp:.1f}°C", f"Workload: {workload:.0f}%"]
+
+        metrics = self.tooltip_metrics
+        max_width = max(metrics.horizontalAdvance(line) for line in lines)
+        tooltip_height = len(lines) * metrics.height() + 10
+        hover_cell = self._cell_rect(self.hover_rack // self.cols, self.hover_rack % self.cols)
+
+        tooltip_x = int(hover_cell.left())
+        tooltip_y = int(hover_cell.top())
+        if tooltip_x + max_width + 20 > self.width():
+            tooltip_x = self.width() - max_width - 20
+        if tooltip_y - tooltip_height - 10 < 0:
+            tooltip_y = int(hover_cell.bottom()) + 10
+        else:
+            tooltip_y = tooltip_y - tooltip_height - 10
+        return QRect(tooltip_x, tooltip_y, max_width + 10, tooltip_height), lines
+
+    def _update_tooltip(self):
+        """Repaints only where the tooltip was and where it is now."""
+        tooltip = self._tooltip()
+        region = self._tooltip_box
+        if tooltip is not None:
+            region = tooltip[0] if region is None else region.united(tooltip[0])
+        if region is not None:
+            self.update(region.adjusted(-2, -2, 2, 2)) # Pen overhang
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect()
+        if not rect.isValid():
+            return
+
+        service = self.render_service
+        scene = self._layers.layer("scene", self._draw_scene, service.viewport, service.image_viewport,
+                                   tuple(self.anomalous_racks), self.rows, self.cols)
+        painter.drawPixmap(0, 0, scene) # Clipped to the update region: a hover change blits only the tooltip area
+
         # Draw tooltip
-        if self.hover_rack >= 0 and self.hover_rack < len(self.rack_temps):
-            temp = self.rack_temps[self.hover_rack]
-            workload = self.rack_workloads[self.hover_rack] if self.rack_workloads and self.hover_rack < len(self.rack_workloads) else 0
-            
-            tooltip_text = f"Rack {self.hover_rack + 1}\nTemp: {temp:.1f}°C\nWorkload: {workload:.0f}%"
-            
-            painter.setFont(QFont("Segoe UI", 9))
-            metrics = painter.fontMetrics()
-            lines = tooltip_text.split('\n')
-            max_width = max(metrics.horizontalAdvance(line) for line in lines)
-            tooltip_height = len(lines) * metrics.height() + 10
-            
-            hover_col = self.hover_rack % self.cols
-            hover_row = self.hover_rack // self.cols
-            
-            tooltip_x = int(hover_col * cell_width)
-            tooltip_y = int(hover_row * cell_height)
-            
-            if tooltip_x + max_width + 20 > rect.width():
-                tooltip_x = rect.width() - max_width - 20
-            if tooltip_y - tooltip_height - 10 < 0:
-                tooltip_y = int(hover_row * cell_height) + int(cell_height) + 10
-            else:
-                tooltip_y = tooltip_y - tooltip_height - 10
+        tooltip = self._tooltip()
+        self._tooltip_box = None if tooltip is None else tooltip[0]
+        if tooltip is not None:
+            box, lines = tooltip
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setFont(self.tooltip_font)
+            metrics = self.tooltip_metrics
 
             painter.setBrush(QColor("#28284B"))
             painter.setPen(QPen(QColor("#4D96FF"), 2))
-            painter.drawRoundedRect(tooltip_x, tooltip_y, max_width + 10, tooltip_height, 5, 5)
+            painter.drawRoundedRect(box, 5, 5)
             
             painter.setPen(QColor("#ECF0F1"))
-            y_offset = tooltip_y + metrics.height() 
+            y_offset = box.top() + metrics.height() 
             for line in lines:
-                painter.drawText(tooltip_x + 5, y_offset, line)
-                y_offset += metrics.height()
\ No newline at end of file
+                painter.drawText(box.left() + 5, y_offset, line)
+                y_offset += metrics.height()
@@ -0,0 +1,46 @@
+"""
+Downsampling of long time series for drawing.
+
+Largest-triangle-three-buckets (LTTB) keeps the first and last points and,
+from each of `threshold - 2` equal buckets in between, the point forming
+the largest triangle with the point kept from the previous bucket and the
+mean of the next bucket. Peaks and dips survive, which plain striding or
+bucket means would flatten.
+"""
+import numpy as np
+
+
+def lttb(y, threshold, x=None):
+    """
+    Indices of the `threshold` points LTTB keeps from `y` (all indices if
+    `y` is not longer than that). `x` defaults to evenly spaced samples.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[0]
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # Bucket edges over the interior points 1 .. n-2
+    edges = (1 + np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.intp)
+    edges[-1] = n - 1
+    starts, stops = edges[:-1], edges[1:]
+
+    # Mean point of each bucket (the "next bucket" anchor), from prefix sums; the last anchor is the last point
+    cx, cy = np.cumsum(x), np.cumsum(y)
+    counts = stops - starts
+    mean_x = (cx[stops - 1] - cx[starts - 1]) / counts
+    mean_y = (cy[stops - 1] - cy[starts - 1]) / counts
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for b, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist())):
+        ax, ay = x[a], y[a]
+        # Twice the triangle area (a, candidate, next-bucket mean), up to sign
+        area = np.abs((ax - mean_x[b]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (mean_y[b] - ay))
+        a = start + int(area.argmax())
+        kept[b + 1] = a
+    return kept
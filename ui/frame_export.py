@@ -0,0 +1,276 @@
+"""
+Offscreen frame export of recorded runs, for incident post-mortems.
+
+Reads a run written by `simulation.batch --record-racks` (the per-step CSV
+of facility aggregates and the per-rack outlet temperature .npy next to
+it) and renders one frame per step without a visible window: the rack
+heatmap (the console's NumPy rasterizer) above the four trend charts (the
+console's TrendChart). Frames are split into contiguous chunks across a
+process pool and written as numbered PNGs or into one .zip archive.
+
+    python -m ui.frame_export runs/incident.csv --output runs/incident_frames
+    python -m ui.frame_export runs/incident.csv --start 2025-07-14T02:00 --hours 8 --output runs/incident.zip
+    ffmpeg -framerate 30 -i runs/incident_frames/frame_%06d.png incident.mp4
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPoint, QRectF, Qt
+from PyQt5.QtGui import QColor, QFont, QImage, QPainter, QPen, QRegion
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from ui.dashboard_widgets import HEATMAP_COLOR_STOPS, TrendChart
+from ui.heatmap_raster import HeatmapRasterizer, pixels_to_qimage
+
+HEADER_HEIGHT = 44
+FRAME_NAME = "frame_{:06d}.png"
+
+# Trend charts of the analytics tab (without forecasts): (series, TrendChart arguments)
+CHARTS = [
+    ("pue", dict(title="PUE Trend", y_label="PUE", color="#4D96FF", y_min=1.0, y_max=2.5)),
+    ("max_temp", dict(title="Temperature Trend", y_label="°C", color="#E74C3C", y_min=30, y_max=50)),
+    ("power", dict(title="Total Power Trend", y_label="kW", color="#2ECC71", y_min=1000, y_max=2000)),
+    ("cost", dict(title="Cost Trend", y_label="USD/day", color="#F1C40F", y_min=3000, y_max=6000)),
+]
+CHART_POINTS = 60
+
+
+class RecordedRun(NamedTuple):
+    """Aggregates of a batch run (one entry per step) and the path of its per-rack temperatures."""
+    timestamps: List[str]
+    series: Dict[str, np.ndarray] # pue, max_temp, power, cost
+    rack_temps_path: str
+
+
+def load_run(csv_path) -> RecordedRun:
+    racks_path = os.path.splitext(csv_path)[0] + "_rack_outlet_temps.npy"
+    if not os.path.exists(racks_path):
+        raise FileNotFoundError(f"No per-rack temperatures at '{racks_path}'. Record the run with "
+                                f"'python -m simulation.batch --record-racks'.")
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    column = lambda name: np.array([float(row[name]) for row in rows], dtype=np.float64)
+    series = {
+        "pue": column("average_pue"),
+        "max_temp": column("max_outlet_temp_c"),
+        "power": column("total_server_power_kw") + column("total_cooling_power_kw"),
+        "cost": column("total_daily_cost_usd"),
+    }
+    return RecordedRun([row["timestamp"] for row in rows], series, racks_path)
+
+
+def select_steps(run, start=None, hours=None, stride=1):
+    """Step indices from the first step at/after `start` (ISO time) covering `hours`, every `stride`-th."""
+    times = [datetime.fromisoformat(t) for t in run.timestamps]
+    first = 0
+    if start is not None:
+        start = datetime.fromisoformat(start)
+        first = next((i for i, t in enumerate(times) if t >= start), len(times))
+    last = len(times)
+    if hours is not None and first < len(times):
+        end = times[first] + timedelta(hours=hours)
+        last = next((i for i in range(first, len(times)) if times[i] >= end), len(times))
+    return list(range(first, last, stride))
+
+
+def grid_shape_for(n_racks, rows=20, cols=35):
+    """The console's rack layout, grown with the same aspect ratio if there are more racks."""
+    if n_racks > rows * cols:
+        cols = math.ceil(math.sqrt(n_racks * cols / rows))
+        rows = math.ceil(n_racks / cols)
+    return rows, cols
+
+
+class FrameRenderer:
+    """
+    Renders frames of one run into QImages. Needs a QApplication (the charts
+    are widgets, painted offscreen). Consecutive steps only append to the
+    charts; a jump rebuilds their window of the last CHART_POINTS samples.
+    """
+
+    def __init__(self, run, width=1280, height=960):
+        self.run = run
+        self.rack_temps = np.load(run.rack_temps_path, mmap_mode="r")
+        self.width, self.height = width, height
+        self.rows, self.cols = grid_shape_for(self.rack_temps.shape[1])
+        self.rasterizer = HeatmapRasterizer(self.rows, self.cols, sorted(HEATMAP_COLOR_STOPS, key=lambda s: s[0]))
+        self.background = QColor("#0F0F1E")
+
+        self.heatmap_height = int((height - HEADER_HEIGHT) * 0.45)
+        chart_width, chart_height = width // 2, (height - HEADER_HEIGHT - self.heatmap_height) // 2
+        self.charts = []
+        for i, (key, kwargs) in enumerate(CHARTS):
+            chart = TrendChart(max_points=CHART_POINTS, forecast_steps=0, **kwargs)
+            chart.setMinimumSize(0, 0) # The console's 400x300 minimum would overflow the grid slots
+            chart.resize(chart_width, chart_height)
+            origin = ((i % 2) * chart_width, HEADER_HEIGHT + self.heatmap_height + (i // 2) * chart_height)
+            self.charts.append((key, chart, origin))
+        self._next_step = None # Step the charts expect next
+
+    def _sync_charts(self, step):
+        """Feeds the charts every sample up to and including `step`."""
+        if self._next_step is None or step < self._next_step or step - self._next_step >= CHART_POINTS:
+            first = max(0, step - CHART_POINTS + 1)
+            for _, chart, _ in self.charts:
+                chart.clear_data()
+        else:
+            first = self._next_step
+        for key, chart, _ in self.charts:
+            for value in self.run.series[key][first:step + 1].tolist():
+                chart.add_data_point(value)
+        self._next_step = step + 1
+
+    def render(self, step):
+        image = QImage(self.width, self.height, QImage.Format_RGB32) # Opaque: no alpha channel to encode
+        image.fill(self.background)
+        painter = QPainter(image)
+
+        # Header: time and facility figures of this step
+        temps = np.asarray(self.rack_temps[step], dtype=np.float32)
+        critical = int(np.count_nonzero(temps >= 37.0))
+        painter.setPen(QColor("#ECF0F1"))
+        painter.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        painter.drawText(QRectF(12, 0, self.width - 24, HEADER_HEIGHT), Qt.AlignLeft | Qt.AlignVCenter,
+                         self.run.timestamps[step].replace("T", " "))
+        painter.setFont(QFont("Segoe UI", 10))
+        painter.drawText(QRectF(12, 0, self.width - 24, HEADER_HEIGHT), Qt.AlignRight | Qt.AlignVCenter,
+                         f"PUE {self.run.series['pue'][step]:.2f} | max {temps.max():.1f}°C | "
+                         f"{critical} racks ≥ 37°C | {self.run.series['power'][step]:,.0f} kW")
+
+        # Heatmap, with grid lines once cells are big enough to tell apart (as in the console)
+        pixels = self.rasterizer.render_pixels(temps, self.width, self.heatmap_height)
+        if pixels is not None:
+            painter.drawImage(0, HEADER_HEIGHT, pixels_to_qimage(pixels))
+        cell_width, cell_height = self.width / self.cols, self.heatmap_height / self.rows
+        if min(cell_width, cell_height) >= 6:
+            painter.setPen(QPen(QColor(0, 0, 0, 90)))
+            for col in range(1, self.cols):
+                x = int(col * cell_width)
+                painter.drawLine(x, HEADER_HEIGHT, x, HEADER_HEIGHT + self.heatmap_height)
+            for row in range(1, self.rows):
+                y = HEADER_HEIGHT + int(row * cell_height)
+                painter.drawLine(0, y, self.width, y)
+
+        self._sync_charts(step)
+        for _, chart, (x, y) in self.charts:
+            chart.render(painter, QPoint(x, y), QRegion(), QWidget.DrawChildren) # No light widget background
+        painter.end()
+        return image
+
+
+# --- Process pool workers (one QApplication and FrameRenderer per process) ---
+_app = None
+_renderer = None
+
+
+def _init_worker(run, width, height):
+    global _renderer, _app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    _app = QApplication.instance() or QApplication([])
+    _renderer = FrameRenderer(run, width, height)
+
+
+def _render_chunk(chunk, output_dir, compression):
+    """Renders (frame number, step) pairs; writes PNGs to `output_dir`, or returns their bytes if it is None."""
+    encoded = []
+    for number, step in chunk:
+        image = _renderer.render(step)
+        if output_dir is not None:
+            image.save(os.path.join(output_dir, FRAME_NAME.format(number)), "PNG", compression)
+        else:
+            data = QByteArray()
+            buffer = QBuffer(data)
+            buffer.open(QIODevice.WriteOnly)
+            image.save(buffer, "PNG", compression)
+            encoded.append((number, bytes(data)))
+    return len(chunk), encoded
+
+
+def export_frames(run, steps, output, width=1280, height=960, workers=None, chunk_size=64, compression=80):
+    """
+    Renders `steps` of `run` to `output`: a directory of numbered PNGs, or a
+    .zip archive of them. Returns the export summary.
+    `compression` is Qt's PNG quality (0-100, higher = faster and larger).
+    """
+    archive = output.endswith(".zip")
+    output_dir = None
+    if archive:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    else:
+        output_dir = output
+        os.makedirs(output_dir, exist_ok=True)
+
+    frames = list(enumerate(steps))
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, min(chunk_size, math.ceil(len(frames) / workers))) # Every worker gets a share
+    chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+    workers = max(1, min(workers, len(chunks)))
+
+    start = time.perf_counter()
+    done = 0
+    zip_file = zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) if archive else None # PNGs are compressed already
+    try:
+        # Spawned workers: a forked Qt process is not safe to use
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                 initargs=(run, width, height)) as pool:
+            for count, encoded in pool.map(_render_chunk, chunks, [output_dir] * len(chunks),
+                                           [compression] * len(chunks)):
+                for number, data in encoded:
+                    zip_file.writestr(FRAME_NAME.format(number), data)
+                done += count
+                elapsed = time.perf_counter() - start
+                print(f"EXPORT: {done}/{len(frames)} frames, {done / elapsed:.1f} frames/s")
+    finally:
+        if zip_file is not None:
+            zip_file.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": len(frames),
+        "first_step": steps[0] if steps else None,
+        "last_step": steps[-1] if steps else None,
+        "workers": workers,
+        "wall_seconds": elapsed,
+        "frames_per_second": len(frames) / elapsed if elapsed > 0 else 0,
+        "output": output,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render heatmap and trend frames of a recorded batch run offscreen.")
+    parser.add_argument("run", help="CSV of a 'simulation.batch --record-racks' run.")
+    parser.add_argument("--output", default=None, help="Directory for numbered PNGs, or a .zip archive "
+                                                       "(default: <run>_frames/).")
+    parser.add_argument("--start", default=None, help="First time to render, ISO format (default: start of the run).")
+    parser.add_argument("--hours", type=float, default=None, help="Duration to render (default: to the end).")
+    parser.add_argument("--stride", type=int, default=1, help="Render every N-th step.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count).")
+    args = parser.parse_args(argv)
+
+    run = load_run(args.run)
+    steps = select_steps(run, args.start, args.hours, max(1, args.stride))
+    if not steps:
+        print("EXPORT: No steps in the selected range.")
+        return
+    output = args.output or os.path.splitext(args.run)[0] + "_frames"
+    print(f"EXPORT: Rendering {len(steps)} frames ({run.timestamps[steps[0]]} to {run.timestamps[steps[-1]]})...")
+
+    summary = export_frames(run, steps, output, args.width, args.height, args.workers)
+    print(f"EXPORT: Done in {summary['wall_seconds']:.1f}s with {summary['workers']} worker(s), "
+          f"{summary['frames_per_second']:.1f} frames/s. Frames in '{output}'.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,175 @@
+"""
+NumPy heatmap rasterizer for the rack grid.
+
+The colormap is baked into a 1024-entry ARGB32 lookup table once; each
+frame is a box smoothing pass on the visible part of the rack grid,
+separable bilinear upsampling to the output size and one LUT gather,
+written straight into a NumPy buffer that backs the returned QImage (no
+per-pixel Qt calls). Large grids are drawn from a min/max/mean pyramid.
+"""
+import numpy as np
+from PyQt5.QtGui import QImage
+
+LUT_SIZE = 1024
+
+
+def build_colormap_lut(color_stops, size=LUT_SIZE):
+    """
+    (size,) uint32 ARGB32 table for sorted (temperature, QColor) stops,
+    spanning the first to the last stop (temperatures outside are clamped).
+    """
+    temps = np.array([t for t, _ in color_stops], dtype=np.float64)
+    channels = np.array([(c.alpha(), c.red(), c.green(), c.blue()) for _, c in color_stops], dtype=np.float64)
+
+    samples = np.linspace(temps[0], temps[-1], size)
+    argb = np.stack([np.interp(samples, temps, channels[:, i]) for i in range(4)], axis=1)
+    argb = argb.astype(np.uint32) # Truncates like the QColor interpolation did
+    return (argb[:, 0] << 24) | (argb[:, 1] << 16) | (argb[:, 2] << 8) | argb[:, 3]
+
+
+def smooth_grid(grid, radius=1):
+    """
+    Mean of each cell and its in-bounds neighbours within `radius` (edge
+    cells average fewer), from a summed-area table: O(1) per cell for any radius.
+    """
+    rows, cols = grid.shape
+    sat = np.zeros((rows + 1, cols + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(grid, axis=0, dtype=np.float64), axis=1, out=sat[1:, 1:])
+
+    r0 = np.clip(np.arange(rows) - radius, 0, rows)
+    r1 = np.clip(np.arange(rows) + radius + 1, 0, rows)
+    c0 = np.clip(np.arange(cols) - radius, 0, cols)
+    c1 = np.clip(np.arange(cols) + radius + 1, 0, cols)
+    total = sat[np.ix_(r1, c1)] - sat[np.ix_(r0, c1)] - sat[np.ix_(r1, c0)] + sat[np.ix_(r0, c0)]
+    return (total / np.outer(r1 - r0, c1 - c0)).astype(grid.dtype)
+
+
+def _halve(values, reduce):
+    """2x2 block reduction; odd edges are padded by repeating the last row/column."""
+    rows, cols = values.shape
+    if rows % 2 or cols % 2:
+        values = np.pad(values, ((0, rows % 2), (0, cols % 2)), mode="edge")
+    blocks = values.reshape(values.shape[0] // 2, 2, values.shape[1] // 2, 2)
+    return reduce(blocks, axis=(1, 3))
+
+
+class GridPyramid:
+    """
+    Min/max/mean level-of-detail pyramid of a rack grid. Level L aggregates
+    2^L x 2^L racks; levels are built on demand from the one below.
+    """
+    STATISTICS = ("mean", "min", "max")
+    REDUCERS = {"mean": np.mean, "min": np.min, "max": np.max}
+
+    def __init__(self, grid):
+        self.levels = [{stat: grid for stat in self.STATISTICS}]
+        self.max_level = int(np.ceil(np.log2(max(grid.shape)))) if max(grid.shape) > 1 else 0
+
+    def level(self, index, statistic="mean"):
+        index = min(index, self.max_level)
+        while len(self.levels) <= index:
+            below = self.levels[-1]
+            self.levels.append({stat: _halve(below[stat], self.REDUCERS[stat]) for stat in self.STATISTICS})
+        return self.levels[index][statistic]
+
+
+class HeatmapRasterizer:
+    """
+    Renders per-rack temperatures as a smooth (width x height) ARGB32 image.
+
+    A `viewport` (x0, y0, x1, y1, in rack cells) selects the visible part of
+    the grid. The pyramid level is picked so that a pixel covers at most
+    about one (aggregated) cell, and only the visible patch of that level is
+    smoothed and interpolated, so cost follows the output size rather than
+    the rack count. The pyramid is cached for the last temperature array.
+    """
+
+    def __init__(self, rows, cols, color_stops, fill_temp=25.0, lut_size=LUT_SIZE, smoothing_radius=1):
+        self.rows, self.cols = rows, cols
+        self.fill_temp = fill_temp
+        self.smoothing_radius = smoothing_radius
+        self.lut = build_colormap_lut(color_stops, lut_size)
+        self.t_min = float(color_stops[0][0])
+        self.lut_scale = (lut_size - 1) / (float(color_stops[-1][0]) - self.t_min)
+        self._source = None # (temps, shape) the cached pyramid was built from
+        self._pyramid = None
+
+    def temperature_grid(self, temps, shape=None):
+        """(rows, cols) float32 grid of the rack temperatures, padded with `fill_temp`."""
+        rows, cols = shape or (self.rows, self.cols)
+        grid = np.full(rows * cols, self.fill_temp, dtype=np.float32)
+        values = np.asarray(temps, dtype=np.float32)[:grid.size]
+        grid[:values.size] = values
+        return grid.reshape(rows, cols)
+
+    def pyramid_for(self, temps, shape=None):
+        shape = tuple(shape or (self.rows, self.cols))
+        if self._source is None or self._source[0] is not temps or self._source[1] != shape:
+            self._pyramid = GridPyramid(self.temperature_grid(temps, shape))
+            self._source = (temps, shape)
+        return self._pyramid
+
+    def _axis(self, start, end, pixels, scale, cells):
+        """Pixel centres in level-cell-centre coordinates, and the cell range they touch."""
+        pos = (start + (np.arange(pixels, dtype=np.float32) + 0.5) * ((end - start) / pixels)) / scale - 0.5
+        margin = self.smoothing_radius + 1
+        lo = max(0, int(np.floor(pos[0])) - margin)
+        hi = min(cells, int(np.floor(pos[-1])) + 2 + margin)
+        return pos, lo, hi
+
+    @staticmethod
+    def _index(pos, lo, cells):
+        """Left/top patch cell and fraction for each pixel, clamped to the patch."""
+        local = pos - lo
+        i0 = np.clip(np.floor(local).astype(np.intp), 0, max(cells - 2, 0))
+        return i0, np.clip(local - i0, 0, 1)
+
+    def render_pixels(self, temps, width, height, shape=None, viewport=None, statistic="mean"):
+        """(height, width) uint32 ARGB32 pixels, or None if there is nothing to draw."""
+        rows, cols = shape or (self.rows, self.cols)
+        if rows < 1 or cols < 1 or width < 2 or height < 2:
+            return None
+        vx0, vy0, vx1, vy1 = viewport or (0, 0, cols, rows)
+        pyramid = self.pyramid_for(temps, (rows, cols))
+
+        # Level of detail: about one aggregated cell per pixel at most
+        cells_per_pixel = max((vx1 - vx0) / width, (vy1 - vy0) / height)
+        level = int(np.floor(np.log2(cells_per_pixel))) if cells_per_pixel > 1 else 0
+        grid = pyramid.level(level, statistic)
+        scale = float(2 ** min(level, pyramid.max_level))
+
+        xs, xlo, xhi = self._axis(vx0, vx1, width, scale, grid.shape[1])
+        ys, ylo, yhi = self._axis(vy0, vy1, height, scale, grid.shape[0])
+        patch = smooth_grid(grid[ylo:yhi, xlo:xhi], self.smoothing_radius)
+        if patch.shape[0] < 2 or patch.shape[1] < 2: # Single row/column: interpolate against itself
+            patch = np.pad(patch, ((0, patch.shape[0] < 2), (0, patch.shape[1] < 2)), mode="edge")
+        x0, fx = self._index(xs, xlo, patch.shape[1])
+        y0, fy = self._index(ys, ylo, patch.shape[0])
+
+        # LUT index space is linear in temperature, so convert on the small patch
+        patch = (patch - self.t_min) * self.lut_scale
+
+        # Separable bilinear: along x on the patch, then along y at full size
+        across = patch[:, x0] * (1 - fx) + patch[:, x0 + 1] * fx # (patch rows, width)
+        step = across[1:] - across[:-1]
+        field = np.multiply(step.take(y0, axis=0), fy[:, None])
+        field += across.take(y0, axis=0) # (height, width)
+
+        np.clip(field, 0, len(self.lut) - 1, out=field)
+        return self.lut[field.astype(np.intp)] # C-contiguous
+
+    def render(self, temps, width, height, **kwargs):
+        pixels = self.render_pixels(temps, width, height, **kwargs)
+        return QImage() if pixels is None else pixels_to_qimage(pixels)
+
+
+def pixels_to_qimage(pixels):
+    """
+    Wraps a (height, width) uint32 ARGB32 array as a QImage without copying.
+    The image references the array, so keep the returned wrapper (not a
+    copy of it, e.g. one sent through a queued signal) for as long as it is drawn.
+    """
+    height, width = pixels.shape
+    image = QImage(pixels.data, width, height, width * 4, QImage.Format_ARGB32)
+    image.ndarray = pixels # Keeps the buffer alive as long as this wrapper
+    return image
@@ -0,0 +1,51 @@
+"""
+Cached pixmap layers for custom-painted widgets.
+
+A widget splits its painting into layers: static ones (frames, grids,
+titles, rasterized history) are drawn once into a QPixmap and blitted on
+every repaint, and only the dynamic parts (needle, latest value, tooltip)
+are painted live. A layer is redrawn when the widget's size, its device
+pixel ratio or the layer's own key changes.
+"""
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QPixmap
+
+
+class LayerCache:
+    """Named pixmap layers of one widget (at its full size and device pixel ratio)."""
+
+    def __init__(self, widget, antialiasing=True):
+        self.widget = widget
+        self.antialiasing = antialiasing
+        self.stats = {"hits": 0, "redraws": 0}
+        self._layers = {} # name -> (key, pixmap)
+
+    def layer(self, name, draw, *key):
+        """The `name` layer for `key`, calling `draw(painter)` on a transparent pixmap if it is stale."""
+        widget = self.widget
+        dpr = widget.devicePixelRatioF()
+        full_key = (widget.width(), widget.height(), dpr, *key)
+        cached = self._layers.get(name)
+        if cached is not None and cached[0] == full_key:
+            self.stats["hits"] += 1
+            return cached[1]
+
+        pixmap = QPixmap(max(1, int(widget.width() * dpr)), max(1, int(widget.height() * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        if self.antialiasing:
+            painter.setRenderHint(QPainter.Antialiasing)
+        draw(painter)
+        painter.end()
+
+        self._layers[name] = (full_key, pixmap)
+        self.stats["redraws"] += 1
+        return pixmap
+
+    def invalidate(self, name=None):
+        """Forgets one layer, or all of them."""
+        if name is None:
+            self._layers.clear()
+        else:
+            self._layers.pop(name, None)
@@ -5,33 +5,58 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QTabWidget,
                              QSizePolicy, QComboBox)
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QPainter, QColor, QFont, QBrush, QPen, QPalette
-from ui.dashboard_widgets import MetricGauge, TrendChart, AlertPanel, EnhancedHeatmap
+import numpy as np
+
+from alert_engine import AlertEngine
+from ui.dashboard_widgets import (MetricGauge, TrendChart, AlertPanel, EnhancedHeatmap, HeatmapRenderService,
+                                  HistoryChart)
+from ui.view_model import DashboardBinding, set_style_property, thermal_stats
+
+TREND_HISTORY_POINTS = 100_000 # Ticks kept per trend chart (~40 h at 1.5 s per tick)
+
+# Recorded history view: selector label -> (store metric, colour), and range buttons
+HISTORY_METRICS = {
+    "PUE": ("pue", "#4D96FF"),
+    "Max Outlet Temp (°C)": ("max_temp", "#E74C3C"),
+    "Total Power (kW)": ("power", "#2ECC71"),
+    "Daily Cost (USD)": ("cost", "#F1C40F"),
+}
+HISTORY_RANGES = [("1H", 3600), ("1D", 86400), ("1W", 7 * 86400), ("1M", 30 * 86400), ("1Y", 365 * 86400)]
 
 
 class StatusIndicator(QLabel):
-    """Custom label with status icon and color coding."""
+    """Custom label with status icon and color coding; the `status` property selects the style."""
+    STYLE = """
+        QLabel { font-family: 'Segoe UI'; font-size: 11px; font-weight: bold; }
+        QLabel[status="good"] { color: #2ECC71; }
+        QLabel[status="warning"] { color: #F39C12; }
+        QLabel[status="critical"] { color: #E74C3C; }
+        QLabel[status="neutral"] { color: #7F8C8D; font-weight: normal; }
+    """
 
     def __init__(self, text="", status="neutral"):
         super().__init__(text)
-        self.status = status
+        self.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        self.setStyleSheet(self.STYLE) # Parsed once; statuses only switch the property
+        self.status = None
         self.update_status(status, text)
 
     def update_status(self, status, text=None):
-        self.status = status
-        if text is not None:
+        if text is not None and text != self.text():
             self.setText(text)
+        if status != self.status:
+            self.status = status
+            set_style_property(self, "status", status)
 
-        font = QFont("Segoe UI", 11, QFont.Bold)
-        self.setFont(font)
 
-        if status == "good":
-            self.setStyleSheet("font-family: 'Segoe UI'; color: #2ECC71; font-weight: bold; font-size: 11px;")
-        elif status == "warning":
-            self.setStyleSheet("font-family: 'Segoe UI'; color: #F39C12; font-weight: bold; font-size: 11px;")
-        elif status == "critical":
-            self.setStyleSheet("font-family: 'Segoe UI'; color: #E74C3C; font-weight: bold; font-size: 11px;")
-        else:
-            self.setStyleSheet("font-family: 'Segoe UI'; color: #7F8C8D; font-weight: normal; font-size: 11px;")
+# Thermal tab counters: base style plus per-status colours, switched through the `status` property
+THERMAL_VALUE_STYLE = """
+    QLabel { font-size: 11px; color: #FFFFFF; font-weight: bold; }
+    QLabel[status="normal"] { color: #ECF0F1; }
+    QLabel[status="good"] { color: #2ECC71; }
+    QLabel[status="warning"] { color: #F39C12; }
+    QLabel[status="critical"] { color: #E74C3C; }
+"""
 
 
 class MainWindow(QMainWindow):
@@ -39,6 +64,7 @@ class MainWindow(QMainWindow):
     simulation_requested = pyqtSignal()
     suggest_tweaks_requested = pyqtSignal()
     auto_optimize_requested = pyqtSignal()
+    first_frame_shown = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -139,6 +165,15 @@ class MainWindow(QMainWindow):
         self.central_widget = QWidget()
         self.central_widget.setStyleSheet("background-color: #0F0F1E;") # Force dark background
         self.setCentralWidget(self.central_widget)
+
+        # Tick scheduler health (step time, interval, overruns)
+        self.tick_stats_label = QLabel("Simulation starting...")
+        self.tick_stats_label.setStyleSheet("font-size: 10px; color: #7F8C8D; padding: 0 6px;")
+        self.statusBar().setStyleSheet("background-color: #0F0F1E;")
+        self.statusBar().addPermanentWidget(self.tick_stats_label)
+        self.heatmap_stats_label = QLabel("")
+        self.heatmap_stats_label.setStyleSheet("font-size: 10px; color: #7F8C8D; padding: 0 6px;")
+        self.statusBar().addPermanentWidget(self.heatmap_stats_label)
         
         self.main_layout = QVBoxLayout(self.central_widget)
         self.main_layout.setSpacing(10)
@@ -148,10 +183,37 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
         self.main_layout.addWidget(self.tabs)
 
+        # One heatmap render pipeline shared by the overview and thermal tabs
+        self.heatmap_service = HeatmapRenderService(rows=20, cols=35, parent=self)
+        self.heatmap_service.stats_changed.connect(self.show_heatmap_stats)
+
         # Create different views
         self._create_overview_tab()
         self._create_analytics_tab()
         self._create_thermal_tab()
+        self._bind_view_model()
+
+        self._first_frame_emitted = False
+
+    def _bind_view_model(self):
+        """Binding keys for everything update_dashboard writes as text or status."""
+        self.view_binding = binding = DashboardBinding()
+        for name, label in self.result_labels.items():
+            binding.bind_text(f"result:{name}", label)
+        for name, (indicator, _) in self.status_indicators.items():
+            binding.bind(f"status:{name}", lambda value, indicator=indicator: indicator.update_status(*value))
+        for name, label in self.thermal_stats_labels.items():
+            if name != "Predicted Critical": # Written by show_rack_forecast
+                binding.bind_text(f"thermal:{name}", label)
+        binding.bind_property("thermal_status:Racks in Warning", self.thermal_stats_labels["Racks in Warning"])
+        binding.bind_property("thermal_status:Racks Critical", self.thermal_stats_labels["Racks Critical"])
+        binding.bind_text("insights", self.insights_label)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_frame_emitted:
+            self._first_frame_emitted = True
+            self.first_frame_shown.emit()
 
     def _create_overview_tab(self):
         """Main overview dashboard with key metrics and controls."""
@@ -200,6 +262,7 @@ class MainWindow(QMainWindow):
         summary_panel = self._create_summary_panel()
         middle_row.addWidget(summary_panel, 1)
         
+        self.alert_engine = AlertEngine()
         self.alert_panel = AlertPanel()
         middle_row.addWidget(self.alert_panel, 1)
         
@@ -212,7 +275,7 @@ class MainWindow(QMainWindow):
         heatmap_title.setStyleSheet("font-family: 'Segoe UI'; font-size: 13px; font-weight: bold; color: #4D96FF; margin-bottom: 10px;")
         heatmap_layout.addWidget(heatmap_title)
         
-        self.overview_heatmap = EnhancedHeatmap(rows=20, cols=35)
+        self.overview_heatmap = EnhancedHeatmap(rows=20, cols=35, render_service=self.heatmap_service)
         heatmap_layout.addWidget(self.overview_heatmap)
         
         layout.addWidget(heatmap_frame)
@@ -290,6 +353,10 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(self.optimize_button)
         
         layout.addLayout(button_layout)
+
+        self.closed_loop_checkbox = QCheckBox("Closed-loop: re-apply optimal settings every tick")
+        self.closed_loop_checkbox.setStyleSheet("font-family: 'Segoe UI'; font-size: 11px; color: #BDC3C7;")
+        layout.addWidget(self.closed_loop_checkbox)
         layout.addStretch(1)
         
         panel.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
@@ -408,10 +475,10 @@ class MainWindow(QMainWindow):
         
         # --- UPDATED: Pass static range and goal text to charts ---
         self.pue_chart = TrendChart("PUE Trend", max_points=60, y_label="PUE", color="#4D96FF", 
-                                    forecast_steps=30, goal_text="Lower is Better", y_min=1.0, y_max=2.5)
+                                    forecast_steps=30, history_points=TREND_HISTORY_POINTS, goal_text="Lower is Better", y_min=1.0, y_max=2.5)
         
         self.temp_chart = TrendChart("Temperature Trend", max_points=60, y_label="°C", color="#E74C3C", 
-                                     forecast_steps=30, goal_text="Lower is Better", y_min=30, y_max=50)
+                                     forecast_steps=30, history_points=TREND_HISTORY_POINTS, goal_text="Lower is Better", y_min=30, y_max=50)
         
         top_charts.addWidget(self.pue_chart)
         top_charts.addWidget(self.temp_chart)
@@ -419,16 +486,39 @@ class MainWindow(QMainWindow):
 
         bottom_charts = QHBoxLayout()
         self.power_chart = TrendChart("Total Power Trend", max_points=60, y_label="kW", color="#2ECC71", 
-                                      forecast_steps=30, goal_text="Lower is Better", y_min=1000, y_max=2000)
+                                      forecast_steps=30, history_points=TREND_HISTORY_POINTS, goal_text="Lower is Better", y_min=1000, y_max=2000)
         
         self.cost_chart = TrendChart("Cost Trend", max_points=60, y_label="USD/day", color="#F1C40F", 
-                                     forecast_steps=30, goal_text="Lower is Better", y_min=3000, y_max=6000)
+                                     forecast_steps=30, history_points=TREND_HISTORY_POINTS, goal_text="Lower is Better", y_min=3000, y_max=6000)
         # --- End of Update ---
         
         bottom_charts.addWidget(self.power_chart)
         bottom_charts.addWidget(self.cost_chart)
         layout.addLayout(bottom_charts)
 
+        # --- Recorded history (persisted across restarts, zoomable) ---
+        history_controls = QHBoxLayout()
+        history_title = QLabel("Recorded History")
+        history_title.setStyleSheet("font-size: 12px; font-weight: bold; color: #4D96FF;")
+        history_controls.addWidget(history_title)
+        history_controls.addStretch(1)
+
+        self.history_metric_selector = QComboBox()
+        self.history_metric_selector.addItems(list(HISTORY_METRICS))
+        self.history_metric_selector.currentTextChanged.connect(self._on_history_metric_changed)
+        history_controls.addWidget(self.history_metric_selector)
+        for label, span in HISTORY_RANGES:
+            button = QPushButton(label)
+            button.setFixedWidth(48)
+            button.clicked.connect(lambda _, span=span: self.history_chart.show_last(span))
+            history_controls.addWidget(button)
+        layout.addLayout(history_controls)
+
+        metric, color = HISTORY_METRICS["PUE"]
+        self.history_chart = HistoryChart("PUE", metric=metric, color=color)
+        self.history_chart.setMinimumHeight(320)
+        layout.addWidget(self.history_chart)
+
         insights_frame = QFrame()
         insights_layout = QVBoxLayout(insights_frame)
         insights_title = QLabel("Efficiency Insights")
@@ -487,39 +577,101 @@ class MainWindow(QMainWindow):
         legend_layout.addStretch()
         layout.addLayout(legend_layout)
 
-        self.heatmap = EnhancedHeatmap(rows=20, cols=35)
+        self.heatmap = EnhancedHeatmap(rows=20, cols=35, render_service=self.heatmap_service)
         layout.addWidget(self.heatmap)
 
         stats_frame = QFrame()
         stats_layout = QHBoxLayout(stats_frame)
         self.thermal_stats_labels = {}
-        for stat_name in ["Hottest Rack", "Coldest Rack", "Avg Temp", "Racks in Warning", "Racks Critical"]:
+        for stat_name in ["Hottest Rack", "Coldest Rack", "Avg Temp", "Racks in Warning", "Racks Critical",
+                          "Predicted Critical"]:
             stat_container = QVBoxLayout()
             name_label = QLabel(stat_name)
             name_label.setStyleSheet("font-size: 9px; color: #95A5A6;")
             value_label = QLabel("N/A")
-            value_label.setStyleSheet("font-size: 11px; color: #FFFFFF; font-weight: bold;")
+            value_label.setStyleSheet(THERMAL_VALUE_STYLE)
             stat_container.addWidget(name_label)
             stat_container.addWidget(value_label)
             stats_layout.addLayout(stat_container)
             self.thermal_stats_labels[stat_name] = value_label
         
         layout.addWidget(stats_frame)
+
+        self.rack_forecast_label = QLabel("Rack forecast: collecting data...")
+        self.rack_forecast_label.setStyleSheet("font-size: 10px; color: #BDC3C7; padding: 4px;")
+        self.rack_forecast_label.setWordWrap(True)
+        layout.addWidget(self.rack_forecast_label)
         
         self.tabs.addTab(thermal_tab, "🌡️ Thermal")
 
     def show_calibration_message(self):
         """Displays the 'Calibrating' message on startup."""
-        self.alert_panel.add_alert("ML Engine: CALIBRATING... Please wait.", "info")
-        self.insights_label.setText("ML Engine is calibrating...\nThis may take a moment as it learns 'normal' operations.")
+        self.raise_alert("ML Engine: CALIBRATING... Please wait.", "info")
+        self.view_binding.apply({"insights": "ML Engine is calibrating...\nThis may take a moment as it learns 'normal' operations."})
 
     def hide_calibration_message(self):
         """Hides the 'Calibrating' message and shows 'Online'."""
-        self.alert_panel.add_alert("ML Engine: CALIBRATED. System online.", "good")
+        self.raise_alert("ML Engine: CALIBRATED. System online.", "good")
+
+    def show_rack_anomalies(self, rack_indices, scores):
+        """Highlights the top anomalous racks on both heatmaps and raises an alert."""
+        self.heatmap.set_anomalous_racks(rack_indices)
+        self.overview_heatmap.set_anomalous_racks(rack_indices)
+
+        if rack_indices:
+            racks = ", ".join(f"#{idx + 1}" for idx in rack_indices[:3])
+            more = f" (+{len(rack_indices) - 3} more)" if len(rack_indices) > 3 else ""
+            self.raise_alert(
+                f"[ML INSIGHT] Racks {racks}{more} deviating from normal (z={scores[0]:.1f})", "warning",
+                key="rack_anomalies"
+            )
+
+    def raise_alert(self, message, severity="info", key=None):
+        """Posts an ad-hoc alert; repeats (same `key`, default the message) are rate-limited by the alert engine."""
+        alert = self.alert_engine.post(message, severity, key=key)
+        if alert is not None:
+            self.alert_panel.add_alerts([alert])
+
+    def show_tick_stats(self, stats):
+        """Shows the tick scheduler's timing and overrun counters in the status bar."""
+        self.tick_stats_label.setText(
+            f"Tick {stats['ticks']} | step {stats['compute_ms']:.0f} ms (avg {stats['avg_compute_ms']:.0f}) | "
+            f"interval {stats['interval_ms']:.0f} ms | overruns {stats['overruns']} | "
+            f"skipped {stats['skipped_frames']} | coalesced {stats['coalesced_requests']}"
+        )
+
+    def attach_history_store(self, store, live_time=None):
+        """Connects the recorded-history chart to the persisted tick history (`live_time`: simulated now)."""
+        self.history_chart.set_store(store, live_time)
+
+    def _on_history_metric_changed(self, label):
+        metric, color = HISTORY_METRICS[label]
+        self.history_chart.set_metric(metric, title=label, color=color)
+
+    def show_heatmap_stats(self, stats):
+        """Shows the heatmap render time, display latency and dropped frames in the status bar."""
+        self.heatmap_stats_label.setText(
+            f"Heatmap {stats['render_ms']:.0f} ms | latency {stats['avg_latency_ms']:.0f} ms | "
+            f"dropped {stats['dropped_frames']} | stale {stats['stale_frames']}"
+        )
+
+    def show_rack_forecast(self, rack_indices, ticks_until_critical, horizon, critical_temp):
+        """Shows the racks forecast to cross `critical_temp` within `horizon` ticks on the thermal tab."""
+        count_label = self.thermal_stats_labels["Predicted Critical"]
+        count_label.setText(f"{len(rack_indices)}")
+
+        if not rack_indices:
+            self.rack_forecast_label.setText(
+                f"Rack forecast: no racks predicted to exceed {critical_temp:g}°C in the next {horizon} ticks.")
+            return
+        soonest = ", ".join(f"#{rack + 1} (in {eta})" for rack, eta in zip(rack_indices[:8], ticks_until_critical[:8]))
+        more = f" and {len(rack_indices) - 8} more" if len(rack_indices) > 8 else ""
+        self.rack_forecast_label.setText(f"Predicted to exceed {critical_temp:g}°C within {horizon} ticks: {soonest}{more}")
 
     def update_dashboard(self, results, forecasts={}):
         """
         Update all dashboard elements with new simulation results.
+        Texts and statuses go through the view binding, which only touches widgets whose value changed.
         """
         server_power = results.get('total_server_power_kw', 0)
         cooling_power = results.get('total_cooling_power_kw', 0)
@@ -527,46 +679,18 @@ class MainWindow(QMainWindow):
         pue = results.get('average_pue', 0)
         max_temp = results.get('max_outlet_temp_c', 0)
         daily_cost = results.get('total_daily_cost_usd', 0)
-        compute_output = results.get('total_compute_output', 0)
-        strategy = results.get('cooling_strategy', 'N/A')
         temps = results.get('individual_outlet_temps', [])
         workloads = results.get('individual_workloads', [])
 
-        self.result_labels["Total Server Power (kW)"].setText(f"{server_power:.1f} kW")
-        self.result_labels["Total Cooling Power (kW)"].setText(f"{cooling_power:.1f} kW")
-        self.result_labels["Average PUE"].setText(f"{pue:.2f}")
-        self.result_labels["MAX Outlet Temp (°C)"].setText(f"{max_temp:.1f}°C")
-        self.result_labels["Total Compute Output"].setText(f"{compute_output:,.0f}")
-        self.result_labels["Projected Daily Cost (USD)"].setText(f"${daily_cost:,.0f}")
-        
-        clean_strategy = strategy.replace("[bold red]", "").replace("[bold red]", "")
-        clean_strategy = clean_strategy.replace("[bold yellow]", "").replace("[bold yellow]", "")
-        clean_strategy = clean_strategy.replace("[bold green]", "").replace("[bold green]", "")
-        self.result_labels["Cooling Strategy"].setText(clean_strategy)
+        rack_temps = np.asarray(temps, dtype=np.float64)
+        thermal = thermal_stats(rack_temps)
+        self.view_binding.apply(self._view_values(results, thermal, forecasts))
 
         self.pue_gauge.set_value(pue)
         self.temp_gauge.set_value(max_temp)
         self.power_gauge.set_value(total_power)
 
-        pue_status = "good" if pue < 1.6 else "warning" if pue < 1.9 else "critical"
-        pue_text = "✓ Excellent" if pue_status == "good" else "⚠ Fair" if pue_status == "warning" else "✗ Poor"
-        self.status_indicators["Average PUE"][0].update_status(pue_status, pue_text)
-
-        temp_status = "good" if max_temp < 35.5 else "warning" if max_temp < 37 else "critical"
-        temp_text = "✓ Normal" if temp_status == "good" else "⚠ High" if temp_status == "warning" else "✗ Critical"
-        self.status_indicators["MAX Outlet Temp (°C)"][0].update_status(temp_status, temp_text)
-
-        power_status = "good" if total_power < 1200 else "warning" if total_power < 1600 else "critical"
-        power_text = "✓ Normal" if power_status == "good" else "⚠ High" if power_status == "warning" else "✗ Very High"
-        self.status_indicators["Total Server Power (kW)"][0].update_status(power_status, power_text)
-        self.status_indicators["Total Cooling Power (kW)"][0].update_status(power_status, power_text)
-        
-        self.status_indicators["Total Compute Output"][0].update_status("neutral", "")
-        self.status_indicators["Projected Daily Cost (USD)"][0].update_status("neutral", "")
-        self.status_indicators["Cooling Strategy"][0].update_status("neutral", "")
-
-        self.heatmap.update_data(temps, workloads)
-        self.overview_heatmap.update_data(temps, workloads)
+        self.heatmap_service.update_data(temps, workloads) # Renders once for both heatmaps
 
         self.pue_chart.add_data_point(pue)
         self.temp_chart.add_data_point(max_temp)
@@ -574,64 +698,80 @@ class MainWindow(QMainWindow):
         self.cost_chart.add_data_point(daily_cost)
 
         if forecasts:
-            self.pue_chart.update_forecast_data(forecasts.get('pue', []))
-            self.temp_chart.update_forecast_data(forecasts.get('temp', []))
-            self.power_chart.update_forecast_data(forecasts.get('power', []))
-            self.cost_chart.update_forecast_data(forecasts.get('cost', []))
-
-        if temps:
-            avg_temp = sum(temps) / len(temps) if temps else 0
-            hottest_idx = temps.index(max(temps)) if temps else 0
-            coldest_idx = temps.index(min(temps)) if temps else 0
-            warning_count = sum(1 for t in temps if 35.5 <= t < 37.0)
-            critical_count = sum(1 for t in temps if t >= 37.0)
-
-            self.thermal_stats_labels["Hottest Rack"].setText(f"#{hottest_idx + 1} ({max(temps) if temps else 'N/A':.1f}°C)")
-            self.thermal_stats_labels["Coldest Rack"].setText(f"#{coldest_idx + 1} ({min(temps) if temps else 'N/A':.1f}°C)")
-            self.thermal_stats_labels["Avg Temp"].setText(f"{avg_temp:.1f}°C")
-            
-            warning_label = self.thermal_stats_labels["Racks in Warning"]
-            warning_label.setText(f"{warning_count}")
-            warning_label.setStyleSheet(f"font-size: 11px; color: {'#F39C12' if warning_count > 50 else '#ECF0F1'}; font-weight: bold;")
-            
-            critical_label = self.thermal_stats_labels["Racks Critical"]
-            critical_label.setText(f"{critical_count}")
-            if critical_count > 20:
-                critical_label.setStyleSheet("font-size: 11px; color: #E74C3C; font-weight: bold;")
-            elif critical_count > 0:
-                critical_label.setStyleSheet("font-size: 11px; color: #F39C12; font-weight: bold;")
-            else:
-                critical_label.setStyleSheet("font-size: 11px; color: #2ECC71; font-weight: bold;")
-
-        if pue > 2.0: self.alert_panel.add_alert(f"PUE critical at {pue:.2f} - Cooling inefficient", "critical")
-        elif pue > 1.9: self.alert_panel.add_alert(f"PUE elevated at {pue:.2f} - Review cooling", "warning")
-        if max_temp > 40.0: self.alert_panel.add_alert(f"Extreme temperature: {max_temp:.1f}°C - Immediate action required", "critical")
-        elif max_temp > 37.0: self.alert_panel.add_alert(f"Critical temperature: {max_temp:.1f}°C", "critical")
-        elif max_temp > 35.5: self.alert_panel.add_alert(f"Temperature elevated: {max_temp:.1f}°C", "warning")
-        if critical_count > 50: self.alert_panel.add_alert(f"{critical_count} racks critical - System overload", "critical")
-        elif critical_count > 20: self.alert_panel.add_alert(f"{critical_count} racks in critical state", "warning")
-        if total_power > 1800: self.alert_panel.add_alert(f"Power consumption very high: {total_power:.0f} kW", "critical")
-        elif total_power > 1600: self.alert_panel.add_alert(f"Power consumption elevated: {total_power:.0f} kW", "warning")
-
-        if hasattr(self, 'insights_label'):
-             # Logic to update insights label
-            if "ML Engine is calibrating" in self.insights_label.text() and len(forecasts) > 0:
-                 self.insights_label.setText("ML Engine is online. Analyzing performance...")
-            
-            if len(forecasts) > 0: # Only show insights if ML is running
-                efficiency_score = 100 - ((pue - 1.0) * 50)
-                thermal_score = 100 - max(0, (max_temp - 30) * 5)
-                overall_score = (efficiency_score + thermal_score) / 2
-
-                insights = f"Overall Efficiency Score: {overall_score:.0f}/100\n\n"
-                insights += f"• PUE Efficiency: {efficiency_score:.0f}/100 "
-                insights += f"({'Excellent' if pue < 1.6 else 'Good' if pue < 1.8 else 'Needs Improvement'})\n"
-                insights += f"• Thermal Management: {thermal_score:.0f}/100 "
-                insights += f"({'Optimal' if max_temp < 35 else 'Acceptable' if max_temp < 37 else 'Critical'})\n"
-                insights += f"• Estimated Annual Cost: ${daily_cost * 365:,.0f}\n\n"
-                
-                if pue > 1.8: insights += "💡 Recommendation: Reduce cooling overhead or optimize airflow.\n"
-                if max_temp > 36: insights += "💡 Recommendation: Increase cooling capacity or reduce workload on hot racks.\n"
-                if overall_score > 80: insights += "✓ Datacenter is operating efficiently!"
-                
-                self.insights_label.setText(insights)
\ No newline at end of file
+            bands = forecasts.get('bands', {})
+            for key, chart in (('pue', self.pue_chart), ('temp', self.temp_chart),
+                               ('power', self.power_chart), ('cost', self.cost_chart)):
+                lower, upper = bands.get(key, (None, None))
+                chart.update_forecast_data(forecasts.get(key, []), lower, upper)
+
+        alerts = self.alert_engine.evaluate({
+            "pue": pue, "power": total_power, "rack_outlet_temp": rack_temps,
+            "critical_racks": thermal.critical_count if thermal else 0,
+        })
+        self.alert_panel.add_alerts(alerts)
+
+    @staticmethod
+    def _view_values(results, thermal, forecasts):
+        """The tick's formatted texts and statuses, keyed like the bindings in _bind_view_model."""
+        server_power = results.get('total_server_power_kw', 0)
+        cooling_power = results.get('total_cooling_power_kw', 0)
+        total_power = server_power + cooling_power
+        pue = results.get('average_pue', 0)
+        max_temp = results.get('max_outlet_temp_c', 0)
+        daily_cost = results.get('total_daily_cost_usd', 0)
+
+        clean_strategy = results.get('cooling_strategy', 'N/A')
+        for markup in ("[bold red]", "[bold yellow]", "[bold green]"):
+            clean_strategy = clean_strategy.replace(markup, "")
+
+        pue_status = "good" if pue < 1.6 else "warning" if pue < 1.9 else "critical"
+        temp_status = "good" if max_temp < 35.5 else "warning" if max_temp < 37 else "critical"
+        power_status = "good" if total_power < 1200 else "warning" if total_power < 1600 else "critical"
+        power_text = {"good": "✓ Normal", "warning": "⚠ High", "critical": "✗ Very High"}[power_status]
+
+        values = {
+            "result:Total Server Power (kW)": f"{server_power:.1f} kW",
+            "result:Total Cooling Power (kW)": f"{cooling_power:.1f} kW",
+            "result:Average PUE": f"{pue:.2f}",
+            "result:MAX Outlet Temp (°C)": f"{max_temp:.1f}°C",
+            "result:Total Compute Output": f"{results.get('total_compute_output', 0):,.0f}",
+            "result:Projected Daily Cost (USD)": f"${daily_cost:,.0f}",
+            "result:Cooling Strategy": clean_strategy,
+            "status:Average PUE": (pue_status, {"good": "✓ Excellent", "warning": "⚠ Fair", "critical": "✗ Poor"}[pue_status]),
+            "status:MAX Outlet Temp (°C)": (temp_status, {"good": "✓ Normal", "warning": "⚠ High", "critical": "✗ Critical"}[temp_status]),
+            "status:Total Server Power (kW)": (power_status, power_text),
+            "status:Total Cooling Power (kW)": (power_status, power_text),
+            "status:Total Compute Output": ("neutral", ""),
+            "status:Projected Daily Cost (USD)": ("neutral", ""),
+            "status:Cooling Strategy": ("neutral", ""),
+        }
+
+        if thermal is not None:
+            values.update({
+                "thermal:Hottest Rack": f"#{thermal.hottest + 1} ({thermal.hottest_temp:.1f}°C)",
+                "thermal:Coldest Rack": f"#{thermal.coldest + 1} ({thermal.coldest_temp:.1f}°C)",
+                "thermal:Avg Temp": f"{thermal.avg_temp:.1f}°C",
+                "thermal:Racks in Warning": f"{thermal.warning_count}",
+                "thermal_status:Racks in Warning": "warning" if thermal.warning_count > 50 else "normal",
+                "thermal:Racks Critical": f"{thermal.critical_count}",
+                "thermal_status:Racks Critical": ("critical" if thermal.critical_count > 20 else
+                                                  "warning" if thermal.critical_count > 0 else "good"),
+            })
+
+        if forecasts: # Only show insights if ML is running
+            efficiency_score = 100 - ((pue - 1.0) * 50)
+            thermal_score = 100 - max(0, (max_temp - 30) * 5)
+            overall_score = (efficiency_score + thermal_score) / 2
+
+            insights = f"Overall Efficiency Score: {overall_score:.0f}/100\n\n"
+            insights += f"• PUE Efficiency: {efficiency_score:.0f}/100 "
+            insights += f"({'Excellent' if pue < 1.6 else 'Good' if pue < 1.8 else 'Needs Improvement'})\n"
+            insights += f"• Thermal Management: {thermal_score:.0f}/100 "
+            insights += f"({'Optimal' if max_temp < 35 else 'Acceptable' if max_temp < 37 else 'Critical'})\n"
+            insights += f"• Estimated Annual Cost: ${daily_cost * 365:,.0f}\n\n"
+
+            if pue > 1.8: insights += "💡 Recommendation: Reduce cooling overhead or optimize airflow.\n"
+            if max_temp > 36: insights += "💡 Recommendation: Increase cooling capacity or reduce workload on hot racks.\n"
+            if overall_score > 80: insights += "✓ Datacenter is operating efficiently!"
+            values["insights"] = insights
+        return values
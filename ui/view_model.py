@@ -0,0 +1,85 @@
+"""
+View-model layer between a tick's results and the dashboard widgets.
+
+Each tick is turned into a flat mapping of binding key -> formatted value
+(label texts, status names). A DashboardBinding remembers what it pushed
+last time and only calls the widget setters whose value changed, so a
+steady tick touches no widgets at all. Colours follow a dynamic property
+("status") matched by selectors in a stylesheet set once at creation;
+switching it re-polishes the widget without parsing a stylesheet.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+WARNING_TEMP_C = 35.5
+CRITICAL_TEMP_C = 37.0
+
+_UNSET = object()
+
+
+class ThermalStats(NamedTuple):
+    count: int
+    hottest: int
+    hottest_temp: float
+    coldest: int
+    coldest_temp: float
+    avg_temp: float
+    warning_count: int # WARNING_TEMP_C <= t < CRITICAL_TEMP_C
+    critical_count: int # t >= CRITICAL_TEMP_C
+
+
+def thermal_stats(temps) -> Optional[ThermalStats]:
+    """Rack temperature summary from one array conversion and NumPy reductions; None without racks."""
+    temps = np.asarray(temps, dtype=np.float64)
+    if temps.size == 0:
+        return None
+    hottest, coldest = int(temps.argmax()), int(temps.argmin())
+    # Bands 0 (normal), 1 (warning), 2 (critical) counted in one bincount
+    bands = np.bincount(np.searchsorted((WARNING_TEMP_C, CRITICAL_TEMP_C), temps, side="right"), minlength=3)
+    return ThermalStats(temps.size, hottest, float(temps[hottest]), coldest, float(temps[coldest]),
+                        float(temps.mean()), int(bands[1]), int(bands[2]))
+
+
+def set_style_property(widget, name, value):
+    """Switches a stylesheet-selector property and re-polishes just this widget."""
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+
+
+class DashboardBinding:
+    """
+    Key -> widget setter bindings. `apply(values)` pushes only the values
+    that differ from the last ones pushed for the same key.
+    """
+
+    def __init__(self):
+        self._setters = {}
+        self._last = {}
+        self.stats = {"applied": 0, "changed": 0, "unchanged": 0}
+
+    def bind(self, key, setter):
+        self._setters[key] = setter
+        self._last[key] = _UNSET
+        return self
+
+    def bind_text(self, key, label):
+        return self.bind(key, label.setText)
+
+    def bind_property(self, key, widget, name="status"):
+        return self.bind(key, lambda value: set_style_property(widget, name, value))
+
+    def apply(self, values):
+        """Pushes changed values; returns the number of setters called."""
+        changed = 0
+        for key, value in values.items():
+            if self._last[key] != value:
+                self._setters[key](value)
+                self._last[key] = value
+                changed += 1
+        self.stats["applied"] += 1
+        self.stats["changed"] += changed
+        self.stats["unchanged"] += len(values) - changed
+        return changed
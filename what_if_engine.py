@@ -1,67 +1,177 @@
+import time
+PROCESS_START = time.perf_counter() # Reference point for the startup trace
+
 import sys
-import random
-import math
 import warnings
+from datetime import datetime
+from types import MappingProxyType
+import numpy as np
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer # Removed QThread
 
 # --- ML/Data Imports ---
-import pandas as pd
 warnings.filterwarnings("ignore")
 
 # --- Import from our project files ---
+# (heavy ML libraries are imported lazily by MLEngine, off the UI thread)
 from ui.main_window import MainWindow
 from data_pipeline import ScenarioCombinator, DataIngestor
-from twin.digital_twin_engine import compute_results
+from twin.digital_twin_engine import compute_results_batch
 from simulation.dynamics import StateRandomizer
+from simulation.batch import aggregate_step
 from ml_engine import MLEngine            
+from ml.policy_cache import PolicyCache
+from startup import StartupTrace, BackgroundLoader, load_last_known_state, save_last_known_state
+from tick_scheduler import TickScheduler, ControlSnapshot, TickSnapshot
+from db.history_store import TickHistoryStore
 # from ml_worker import MLCalibrationWorker # REMOVED
 
 class WhatIfEngineController:
     
     # CALIBRATION_STEPS = 200 # REMOVED
+    LAST_STATE_SAVE_INTERVAL = 10 # ticks
     
-    def __init__(self):
+    def __init__(self, startup_trace=None):
         print("Initializing components...")
+        self.startup_trace = startup_trace or StartupTrace(PROCESS_START)
         self.combinator = ScenarioCombinator()
-        self.ingestor = DataIngestor()
-        self.randomizer = StateRandomizer()
+        self.randomizer = StateRandomizer(grid_shape=(20, 35)) # Same rack layout as the heatmaps
         self.current_ambient_temp = 25.0 
         
+        # --- Loaded in the background (see _on_component_loaded) ---
+        self.ingestor = None
+        self.ml_engine = None
+        self.policy_cache = None
+        self.last_results = None
+        
         # --- ML State Attributes ---
         self.simulation_step = 0
-        forecast_features = ['average_pue', 'max_outlet_temp_c', 'total_power', 'total_daily_cost_usd']
-        anomaly_features = ['average_pue', 'max_outlet_temp_c', 'total_power', 'total_compute_output']
+        self.forecast_features = ['average_pue', 'max_outlet_temp_c', 'total_power', 'total_daily_cost_usd']
+        self.anomaly_features = ['average_pue', 'max_outlet_temp_c', 'total_power', 'total_compute_output']
+        self._applying_snapshot = False
+        self._policy_error_shown = None
         
-        self.ml_engine = MLEngine(forecast_features, anomaly_features)
-        
-        # --- UI Setup ---
+        # --- UI Setup (first, so the window paints before anything heavy loads) ---
         self.view = MainWindow()
         self.view.simulation_requested.connect(self.run_simulation)
         self.view.suggest_tweaks_requested.connect(self.on_suggest_tweaks)
         self.view.auto_optimize_requested.connect(self.on_auto_optimize)
+        self.view.first_frame_shown.connect(self._on_first_frame)
         
-        # self.view.show_calibration_message() # REMOVED
+        self._set_optimizer_controls_enabled(False)
+        self.view.suggestion_label.setText("AI co-pilot is starting up...")
         
-        # --- Enable Optimizer buttons if models were loaded ---
-        if self.ml_engine.optimizer_ready:
-            self.view.suggest_button.setEnabled(True)
-            self.view.optimize_button.setEnabled(True)
-            self.view.profile_selector.setEnabled(True)
-            self.view.suggestion_label.setText("AI co-pilot is ready. Select a profile.")
-        else:
-            self.view.suggestion_label.setText("Optimizer models not found. Run train_optimizer.py")
-            self.view.suggest_button.setEnabled(False)
-            self.view.optimize_button.setEnabled(False)
-            self.view.profile_selector.setEnabled(False)
+        # --- Render the last known state while the twin starts ---
+        last_state = load_last_known_state()
+        if last_state:
+            self.view.update_dashboard(last_state, {})
+            self.view.raise_alert("Showing last known state - live simulation starting...", "info")
+        self.startup_trace.mark("window_built")
+
+        # --- Persisted tick history behind the zoomable history chart ---
+        try:
+            self.history_store = TickHistoryStore()
+            # History is stamped with simulated time, which runs ahead of the wall clock:
+            # continue after the last recorded tick so timestamps keep increasing
+            extent = self.history_store.extent().result()
+            clock = self.randomizer.clock
+            if extent is not None and extent[1] > clock.now.timestamp():
+                clock.now = datetime.fromtimestamp(extent[1]).replace(minute=0, second=0, microsecond=0) + clock.step
+            self.view.attach_history_store(self.history_store, clock.now.timestamp())
+        except Exception as e:
+            self.history_store = None
+            print(f"HISTORY: Tick history unavailable: {e}")
             
-        # --- Simulation Timer ---
-        self.simulation_timer = QTimer()
-        self.simulation_timer.setInterval(1500)
-        self.simulation_timer.timeout.connect(self.run_simulation)
-        self.run_simulation() 
-        self.simulation_timer.start()
-        print("Continuous simulation started.")
+        # --- Tick scheduler (started once the data is loaded) ---
+        # Controls are read here, the step runs on a worker, snapshots come back here
+        self.scheduler = TickScheduler(self._read_controls, self._compute_tick, base_interval_ms=1500)
+        self.scheduler.snapshot_ready.connect(self._apply_snapshot)
+        self.scheduler.stats_changed.connect(self.view.show_tick_stats)
+        
+        # --- Staged loading: data and ML load in parallel, off the UI thread ---
+        self.loader = BackgroundLoader(max_workers=2)
+        self._settled_components = set()
+        self.loader.loaded.connect(self._on_component_loaded)
+        self.loader.failed.connect(self._on_component_failed)
+        self.loader.submit("data", DataIngestor)
+        self.loader.submit("ml", self._build_ml_engine)
+
+    def _build_ml_engine(self):
+        """Runs on a loader thread: builds the engine and preloads heavy imports."""
+        # "auto": the backend reports/optimizer_evaluation.json selects (physics without a report)
+        engine = MLEngine(self.forecast_features, self.anomaly_features, optimizer_mode="auto")
+        engine.warm_up()
+        return engine
+
+    def _on_first_frame(self):
+        self.startup_trace.mark("first_frame")
+
+    def _on_component_loaded(self, name, component):
+        if name == "data":
+            self.ingestor = component
+            self.startup_trace.mark("data_ready")
+            self.scheduler.start()
+            print("Continuous simulation started.")
+        elif name == "ml":
+            self.ml_engine = component
+            self.policy_cache = PolicyCache(self.ml_engine)
+            self.startup_trace.mark("ml_ready")
+            
+            # --- Enable Optimizer buttons if models were loaded ---
+            if self.ml_engine.optimizer_ready:
+                self._set_optimizer_controls_enabled(True)
+                self.view.suggestion_label.setText("AI co-pilot is ready. Select a profile.")
+                self.policy_cache.start() # Precompute the policy table in the background
+            else:
+                self.view.suggestion_label.setText("Optimizer models not found. Run train_optimizer.py")
+
+        self._on_component_settled(name)
+
+    def _on_component_failed(self, name, error):
+        print(f"STARTUP: Failed to load {name}: {error}")
+        if name == "data":
+            QApplication.quit() # Nothing to simulate without the rack data
+        else:
+            self.view.suggestion_label.setText(f"ML engine failed to start: {error}")
+        self._on_component_settled(name)
+
+    def _on_component_settled(self, name):
+        """Saves the startup trace and frees the loader once every component loaded or failed."""
+        self._settled_components.add(name)
+        if self._settled_components >= {"data", "ml"}:
+            self.startup_trace.save()
+            self.loader.shutdown()
+
+    def _show_policy_cache_state(self):
+        """Reports (once per failure) that the policy precompute was abandoned, so closed loop is off."""
+        cache = self.policy_cache
+        error = cache.error if cache is not None and cache.is_abandoned else None
+        if error == self._policy_error_shown:
+            return
+        self._policy_error_shown = error
+        self.view.closed_loop_checkbox.setEnabled(error is None and self.ml_engine.optimizer_ready)
+        if error is not None:
+            self.view.closed_loop_checkbox.setChecked(False)
+            self.view.raise_alert(f"Policy precompute abandoned: {error} Closed loop is unavailable.", "warning")
+            self.view.suggestion_label.setText("Policy table unavailable - Suggest searches on demand; closed loop is off.")
+
+    def _set_optimizer_controls_enabled(self, enabled):
+        self.view.suggest_button.setEnabled(enabled)
+        self.view.optimize_button.setEnabled(enabled)
+        self.view.profile_selector.setEnabled(enabled)
+        self.view.closed_loop_checkbox.setEnabled(enabled)
+
+    def shutdown(self):
+        """Stops the tick loop (waiting for an in-flight step), saves the state and closes the history."""
+        self.scheduler.stop()
+        self.save_state()
+        if self.history_store is not None:
+            self.history_store.close()
+            self.history_store = None
+
+    def save_state(self):
+        """Persists the latest results so the next start can render them immediately."""
+        if self.last_results is not None:
+            save_last_known_state(dict(self.last_results))
 
     # --- MODIFIED: Optimizer Button Handlers ---
     
@@ -77,12 +187,12 @@ class WhatIfEngineController:
 
     def on_suggest_tweaks(self):
         """Finds the best settings and displays them as a suggestion."""
-        if not self.ml_engine.optimizer_ready:
+        if self.ml_engine is None or not self.ml_engine.optimizer_ready:
             self.view.suggestion_label.setText("ML Optimizer is not ready. (models/ not found?)")
             return
             
         profile = self._get_selected_profile()
-        suggestion = self.ml_engine.find_best_settings(self.current_ambient_temp, profile=profile)
+        suggestion = self.policy_cache.lookup(self.current_ambient_temp, profile)
         
         if suggestion:
             text = f"[ML SUGGESTION ({profile.upper()})]: Set Inlet to {suggestion['inlet']}°C " \
@@ -94,13 +204,13 @@ class WhatIfEngineController:
 
     def on_auto_optimize(self):
         """Finds the best settings, suggests them, AND applies them."""
-        if not self.ml_engine.optimizer_ready:
+        if self.ml_engine is None or not self.ml_engine.optimizer_ready:
             self.view.suggestion_label.setText("ML Optimizer is not ready. (models/ not found?)")
             return
             
-        # 1. Get the suggestion
+        # 1. Get the suggestion (a policy table lookup once the cache is warm)
         profile = self._get_selected_profile()
-        suggestion = self.ml_engine.find_best_settings(self.current_ambient_temp, profile=profile)
+        suggestion = self.policy_cache.lookup(self.current_ambient_temp, profile)
         
         if suggestion:
             text = f"[ML AUTO-PILOT ({profile.upper()})]: Set Inlet to {suggestion['inlet']}°C " \
@@ -108,109 +218,159 @@ class WhatIfEngineController:
             self.view.suggestion_label.setText(text)
             
             # 2. Apply the suggestion to the UI
-            self.view.inlet_slider['slider'].setValue(suggestion['inlet'])
-            self.view.inlet_slider['checkbox'].setChecked(True)
-            
-            self.view.workload_slider['slider'].setValue(suggestion['workload'])
-            self.view.workload_slider['checkbox'].setChecked(True)
+            self._apply_suggestion(suggestion)
             
             # 3. Manually trigger a simulation run to show the new state
-            self.run_simulation()
+            self.scheduler.request()
         else:
             self.view.suggestion_label.setText("Could not find an optimal solution.")
 
-    # --- ML Training Thread ---
-    # --- ALL CALIBRATION METHODS REMOVED ---
-    # _start_ml_calibration REMOVED
-    # on_calibration_complete REMOVED
+    def _apply_suggestion(self, suggestion):
+        """Moves the inlet/workload sliders to the suggested settings and enables them."""
+        self.view.inlet_slider['slider'].setValue(suggestion['inlet'])
+        self.view.inlet_slider['checkbox'].setChecked(True)
+        
+        self.view.workload_slider['slider'].setValue(suggestion['workload'])
+        self.view.workload_slider['checkbox'].setChecked(True)
 
+    def _closed_loop_suggestion(self, ambient_temp, profile):
+        """Closed-loop mode: the cached policy for the current ambient, re-applied every tick."""
+        if self.policy_cache is None or not self.policy_cache.is_ready:
+            return None
+        return self.policy_cache.lookup(ambient_temp, profile)
 
     # --- Main Simulation Loop ---
-    
-    # --- REPLACED the entire run_simulation method ---
+    # Each tick: _read_controls (UI thread) -> _compute_tick (worker) -> _apply_snapshot (UI thread)
+
     def run_simulation(self):
-        
+        """Manual trigger (sliders, checkboxes); coalesced by the scheduler."""
+        if self._applying_snapshot or self.ingestor is None:
+            return # Slider moves made by the closed-loop policy are not user requests
+        self.scheduler.request()
+
+    def _read_controls(self):
+        view = self.view
+        return ControlSnapshot(
+            ambient_override=view.ambient_slider['slider'].value() if view.ambient_slider['checkbox'].isChecked() else None,
+            workload_override=view.workload_slider['slider'].value() if view.workload_slider['checkbox'].isChecked() else None,
+            inlet_override=view.inlet_slider['slider'].value() if view.inlet_slider['checkbox'].isChecked() else None,
+            closed_loop=view.closed_loop_checkbox.isChecked(),
+            profile=self._get_selected_profile(),
+        )
+
+    def _compute_tick(self, controls):
+        """Runs on the tick worker: simulation + ML for one step. Must not touch widgets."""
         self.simulation_step += 1
-        
-        plan = self.combinator.generate_random_combination_plan()
-        baseline_state = self.ingestor.get_state_from_plan(plan)
-        baseline_payloads = [rack['payload'] for rack in baseline_state]
-        varied_payloads = self.randomizer.apply_natural_variation(baseline_payloads)
-
-        is_workload_override = self.view.workload_slider['checkbox'].isChecked()
-        is_inlet_override = self.view.inlet_slider['checkbox'].isChecked()
-        is_ambient_override = self.view.ambient_slider['checkbox'].isChecked()
-        
-        override_workload = self.view.workload_slider['slider'].value()
-        override_inlet = self.view.inlet_slider['slider'].value()
-        override_ambient = self.view.ambient_slider['slider'].value()
-        
-        if is_ambient_override:
-            self.current_ambient_temp = override_ambient
+        ml_engine = self.ml_engine
+
+        sim_time = self.randomizer.clock.now.timestamp() # vary_arrays advances the clock
+        plan = self.combinator.generate_plan_array(self.randomizer.rng)
+        baseline = self.ingestor.get_arrays_from_plan(plan)
+        workload, ambient = self.randomizer.vary_arrays(baseline['server_workload_percent'], baseline['ambient_temp_c'])
+        inlet = baseline['inlet_temp_c']
+
+        if controls.ambient_override is not None:
+            ambient_temp = float(controls.ambient_override)
+            ambient = np.full_like(ambient, ambient_temp)
         else:
-            if varied_payloads: # Ensure list is not empty
-                self.current_ambient_temp = sum(p['ambient_temp_c'] for p in varied_payloads) / len(varied_payloads)
-
-        final_payloads = []
-        for payload in varied_payloads:
-            if is_workload_override: payload['server_workload_percent'] = max(0, min(100, override_workload + random.uniform(-2, 2)))
-            if is_inlet_override: payload['inlet_temp_c'] = override_inlet
-            if is_ambient_override: payload['ambient_temp_c'] = override_ambient
-            final_payloads.append(payload)
-
-        individual_results = [compute_results(p) for p in final_payloads]
-        if not individual_results: return
-        
-        total_server_power_w = sum(r['calculated_server_power_watts'] for r in individual_results)
-        total_cooling_power_w = sum(r['cooling_unit_power_watts'] for r in individual_results)
-        total_facility_power_w = total_server_power_w + total_cooling_power_w
-        avg_pue = total_facility_power_w / total_server_power_w if total_server_power_w > 0 else 0
-        
-        # These lines are now in the correct order
-        max_outlet_temp = max(r['outlet_temp_c'] for r in individual_results)
-        hottest_result = max(individual_results, key=lambda r: r['temp_deviation_c'])
-        strategy = hottest_result.get('cooling_strategy', "STABLE")
-        total_compute_output = sum(r['compute_output'] for r in individual_results)
-
-        aggregated_results = {
-            "total_server_power_kw": total_server_power_w / 1000,
-            "total_cooling_power_kw": total_cooling_power_w / 1000,
-            "average_pue": avg_pue,
-            "max_outlet_temp_c": max_outlet_temp, # <-- THIS IS THE FIX
-            "total_daily_cost_usd": (total_facility_power_w / 1000 * 0.12 * 24),
-            "cooling_strategy": strategy,
-            "individual_outlet_temps": [r['outlet_temp_c'] for r in individual_results],
-            "individual_workloads": [p['server_workload_percent'] for p in final_payloads],
-            "total_compute_output": total_compute_output
-        }
+            ambient_temp = float(ambient.mean())
+        self.current_ambient_temp = ambient_temp
+
+        # Closed loop acts like the user moving the inlet/workload sliders
+        workload_override, inlet_override = controls.workload_override, controls.inlet_override
+        suggestion = self._closed_loop_suggestion(ambient_temp, controls.profile) if controls.closed_loop else None
+        if suggestion:
+            workload_override, inlet_override = suggestion['workload'], suggestion['inlet']
+
+        if workload_override is not None:
+            workload = np.clip(workload_override + self.randomizer.rng.uniform(-2, 2, workload.shape), 0, 100)
+        if inlet_override is not None:
+            inlet = np.full_like(inlet, inlet_override)
+
+        payload = {'server_workload_percent': workload, 'inlet_temp_c': inlet, 'ambient_temp_c': ambient}
+        results = compute_results_batch(inlet, workload, ambient)
+        aggregated_results = aggregate_step(payload, results)
+        aggregated_results["individual_outlet_temps"] = results['outlet_temp_c'].tolist()
+        aggregated_results["individual_workloads"] = workload.tolist()
         
-        # --- NEW ML LOGIC ---
-        # 1. Update models with the latest data
-        self.ml_engine.update_and_refit(aggregated_results)
+        snapshot = dict(step=self.simulation_step, controls=controls, ambient_temp=ambient_temp, sim_time=sim_time,
+                        closed_loop_suggestion=suggestion, forecasts={})
         
-        # 2. Prepare data for inference
-        current_features_df = pd.DataFrame([{
-            'average_pue': aggregated_results['average_pue'],
-            'max_outlet_temp_c': aggregated_results['max_outlet_temp_c'],
-            'total_power': aggregated_results['total_server_power_kw'] + aggregated_results['total_cooling_power_kw'],
-            'total_compute_output': aggregated_results['total_compute_output']
-        }])[self.ml_engine.anomaly_features] 
-            
-        # 3. Run Anomaly Inference
-        prediction = self.ml_engine.infer_anomaly(current_features_df)
+        # --- NEW ML LOGIC (skipped until the engine has finished loading) ---
+        if ml_engine is not None:
+            # 0. Pick up a newly activated optimizer model version (between ticks)
+            new_version = ml_engine.check_for_model_updates()
+            if new_version is not None:
+                if ml_engine.optimizer_mode != "physics": # The physics policy does not depend on the models
+                    self.policy_cache.invalidate()
+                snapshot['new_model_version'] = new_version
+
+            # 1. Update models with the latest data
+            ml_engine.update_and_refit(aggregated_results)
             
-        if prediction == -1: 
-            if not (is_workload_override or is_inlet_override or is_ambient_override):
-                self.view.alert_panel.add_alert(
+            # 2. Run Anomaly Inference (scores the tick just added to the history)
+            snapshot['anomaly'] = ml_engine.infer_anomaly()
+
+            # 3. Per-rack anomalies (overrides shift every rack at once, so skip those)
+            if not controls.any_override:
+                snapshot['rack_anomalies'] = ml_engine.infer_rack_anomalies()
+
+            # 4. Run Forecast Inference (facility metrics + racks about to go critical)
+            snapshot['forecasts'] = ml_engine.infer_forecasts()
+            snapshot['critical_racks'] = ml_engine.infer_critical_racks()
+        # --- END NEW ML LOGIC ---
+
+        return TickSnapshot(results=MappingProxyType(aggregated_results), **snapshot)
+
+    def _apply_snapshot(self, snapshot):
+        """Runs on the UI thread: paints one published tick."""
+        self._applying_snapshot = True
+        try:
+            if snapshot.step == 1:
+                self.startup_trace.mark("first_tick")
+                self.startup_trace.save()
+
+            if snapshot.closed_loop_suggestion:
+                suggestion = snapshot.closed_loop_suggestion
+                self._apply_suggestion(suggestion)
+                self.view.suggestion_label.setText(
+                    f"[ML CLOSED-LOOP ({snapshot.controls.profile.upper()})]: Holding Inlet at {suggestion['inlet']}°C "
+                    f"and Workload at {suggestion['workload']}% for {snapshot.ambient_temp:.1f}°C ambient."
+                )
+            if snapshot.new_model_version is not None:
+                self.view.raise_alert(f"Optimizer models updated to {snapshot.new_model_version}.", "info")
+            self._show_policy_cache_state()
+
+            if snapshot.anomaly == -1 and not snapshot.controls.any_override:
+                self.view.raise_alert(
                     "[ML INSIGHT] System operating outside normal parameters!", "warning"
                 )
+            if self.ml_engine is not None:
+                self.view.show_rack_anomalies(*snapshot.rack_anomalies)
+                self.view.show_rack_forecast(*snapshot.critical_racks, horizon=self.ml_engine.forecast_steps,
+                                             critical_temp=self.ml_engine.RACK_CRITICAL_TEMP_C)
 
-        # 4. Run Forecast Inference
-        forecast_results = self.ml_engine.infer_forecasts()
-        # --- END NEW ML LOGIC ---
-        
-        # 5. Update UI
-        self.view.update_dashboard(aggregated_results, forecast_results)
+            # 5. Update UI
+            self.view.update_dashboard(snapshot.results, snapshot.forecasts)
+        finally:
+            self._applying_snapshot = False
+
+        self.last_results = snapshot.results
+        self._record_history(snapshot.results, snapshot.sim_time)
+        if snapshot.step % self.LAST_STATE_SAVE_INTERVAL == 0:
+            self.save_state()
+
+    def _record_history(self, results, sim_time):
+        """Appends the tick at its simulated time to the persisted history (written on the store's thread)."""
+        if self.history_store is None:
+            return
+        self.history_store.append(sim_time, {
+            "pue": results['average_pue'],
+            "max_temp": results['max_outlet_temp_c'],
+            "power": results['total_server_power_kw'] + results['total_cooling_power_kw'],
+            "cost": results['total_daily_cost_usd'],
+        })
+        self.view.history_chart.refresh(sim_time)
 
 
 if __name__ == "__main__":
@@ -218,6 +378,7 @@ if __name__ == "__main__":
     app.setStyle('Fusion')
     controller = WhatIfEngineController()
     controller.view.showMaximized() # Use showMaximized() for fullscreen
+    app.aboutToQuit.connect(controller.shutdown)
     sys.exit(app.exec_())
 
 # --- MLCalibrationWorker class is REMOVED ---
\ No newline at end of file